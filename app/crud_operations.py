@@ -1,13 +1,22 @@
 import json
+import os
 from ast import literal_eval
 from decimal import Decimal
 
-import pandas as pd
 import streamlit as st
 
 from app.insights import convert_to_title
-from crud.crud_handler import CRUDHandler
+from crud.crud_handler import FILTER_OPERATORS, CRUDHandler
+from crud.table_exporter import (
+    CSV_COMPRESSIONS,
+    EXPORT_FORMATS,
+    PARQUET_COMPRESSIONS,
+    export_jobs,
+)
+from crud.table_importer import IMPORT_FORMATS, IMPORT_METHODS, TableImporter
 from db.schema_manager import SchemaManager
+from insights.rollup_manager import RollupManager
+from insights.sample_manager import SAMPLED_TABLES, SampleManager
 
 
 def data_operations_page(schema_manager, connection, operation):
@@ -17,21 +26,121 @@ def data_operations_page(schema_manager, connection, operation):
     table_name = st.selectbox("Table name", options=tables)
     if operation == "Read Records":
         st.header("View Records")
+        column_names = [col["Field"] for col in schema_manager.get_table_columns(table_name)]
+        selected_columns = st.multiselect("Columns", options=column_names, default=column_names)
+
+        filters = []
+        filter_count = st.number_input("Number of filters", min_value=0, value=0)
+        for idx in range(filter_count):
+            col1, col2, col3 = st.columns(3)
+            filter_column = col1.selectbox(f"Filter Column {idx + 1}", column_names, key=f"filter_col_{idx}")
+            filter_operator = col2.selectbox(f"Operator {idx + 1}", FILTER_OPERATORS, key=f"filter_op_{idx}")
+            filter_value = col3.text_input(f"Value {idx + 1}", key=f"filter_val_{idx}",
+                                           help="Comma-separated for IN and BETWEEN")
+            if filter_operator in ("IN", "BETWEEN"):
+                filter_value = [value.strip() for value in filter_value.split(",")]
+            filters.append((filter_column, filter_operator, filter_value))
+
+        col1, col2 = st.columns(2)
+        sort_column = col1.selectbox("Order By", ["(none)"] + column_names)
+        sort_direction = col2.radio("Direction", ["ASC", "DESC"], horizontal=True)
+        order_by = [(sort_column, sort_direction)] if sort_column != "(none)" else None
+
         per_page = st.number_input("Records per page", min_value=1, value=10)
         page = st.number_input("Page number", min_value=1, value=1)
+
+        crud_handler = CRUDHandler(connection, table_name)
+        try:
+            # An instant estimate unless an exact count is cached; the COUNT(*) scan only runs on request.
+            total_rows, is_exact = crud_handler.count_records(filters=filters)
+            col_count, col_exact = st.columns([3, 1])
+            if not is_exact and col_exact.button("Count Exactly",
+                                                 help="Runs COUNT(*) once and caches it; this scans the table."):
+                with st.spinner("Counting rows..."):
+                    total_rows, is_exact = crud_handler.count_records(filters=filters, exact=True)
+            total_pages = max(-(-total_rows // per_page), 1)
+            prefix = "" if is_exact else "~"
+            col_count.caption(f"{prefix}{total_rows:,} rows, {prefix}{total_pages:,} pages")
+        except Exception as e:
+            st.warning(f"Could not count records: {e}")
+
         if st.button("Load Records"):
             try:
-                crud_handler = CRUDHandler(connection, table_name)
                 offset = (page - 1) * per_page
-                records, columns = crud_handler.read_records(limit=per_page, offset=offset)
-                if records:
-                    df = pd.DataFrame(records, columns=columns)
+                df = crud_handler.read_records_frame(limit=per_page, offset=offset,
+                                                     columns=selected_columns or None,
+                                                     filters=filters, order_by=order_by)
+                if not df.empty:
                     st.dataframe(df)
                 else:
                     st.info("No records found.")
             except Exception as e:
                 st.error(f"Error loading records: {e}")
 
+    elif operation == "Export Table":
+        st.header("Export Table")
+        col1, col2 = st.columns(2)
+        file_format = col1.radio("Format", EXPORT_FORMATS, horizontal=True,
+                                 format_func=lambda fmt: fmt.upper())
+        compressions = CSV_COMPRESSIONS if file_format == "csv" else PARQUET_COMPRESSIONS
+        compression = col2.selectbox("Compression", compressions, format_func=lambda codec: codec or "none")
+
+        if st.button("Start Export"):
+            # The session's previous export (and its file) is no longer reachable from the page.
+            if st.session_state.get("export_job_id"):
+                export_jobs.discard(st.session_state.export_job_id)
+            st.session_state.export_job_id = export_jobs.start(
+                st.session_state.db_connector.new_connection, table_name, file_format, compression)
+
+        job_id = st.session_state.get("export_job_id")
+        job = export_jobs.status(job_id) if job_id else None
+        if job:
+            st.write(f"Exporting **{job['table_name']}**: {job['rows']:,} rows "
+                     f"({job['rows_per_second']:,.0f} rows/s) - {job['state']}")
+            if job["state"] == "running":
+                st.button("Refresh Progress")
+            elif job["state"] == "failed":
+                st.error(f"Export failed: {job['error']}")
+            else:
+                with open(job["path"], "rb") as export_file:
+                    # The button holds the file's content, so the file can go once it is downloaded.
+                    st.download_button("Download Export", export_file, file_name=os.path.basename(job["path"]),
+                                       on_click=export_jobs.discard, args=(job_id,))
+
+    elif operation == "Import File":
+        st.header("Import Records from File")
+        uploaded_file = st.file_uploader("CSV or Parquet file", type=list(IMPORT_FORMATS))
+        method = st.radio("Load Method", IMPORT_METHODS, horizontal=True,
+                          format_func=lambda name: "Batched INSERT" if name == "insert" else "LOAD DATA LOCAL INFILE",
+                          help="LOAD DATA requires local_infile to be enabled on the MySQL server.")
+
+        if uploaded_file is not None and st.button("Import"):
+            file_format = "parquet" if uploaded_file.name.lower().endswith(".parquet") else "csv"
+            progress = st.empty()
+            import_connection = st.session_state.db_connector.new_connection(local_infile=method == "load_data")
+            try:
+                stats = TableImporter(import_connection, table_name).import_file(
+                    uploaded_file, file_format, method=method,
+                    progress_callback=lambda read, loaded, rejected: progress.write(
+                        f"Read {read:,} rows: {loaded:,} loaded, {rejected:,} rejected"))
+                st.success(f"Imported {stats['rows_loaded']:,} of {stats['rows_read']:,} rows "
+                           f"in {stats['seconds']:.1f}s.")
+                if table_name == "orders" and stats["rows_loaded"]:
+                    RollupManager(import_connection).refresh()
+                if table_name in SAMPLED_TABLES and stats["rows_loaded"]:
+                    SampleManager(import_connection, table_name).refresh()
+                if stats["ignored_columns"]:
+                    st.info(f"Ignored columns not in '{table_name}': {', '.join(map(str, stats['ignored_columns']))}")
+                if stats["error_path"]:
+                    st.warning(f"{stats['rows_rejected']:,} rows were rejected.")
+                    with open(stats["error_path"], "rb") as error_file:
+                        st.download_button("Download Rejected Rows", error_file,
+                                           file_name=os.path.basename(stats["error_path"]))
+            except Exception as e:
+                st.error(f"Error importing file: {e}")
+            finally:
+                import_connection.close()
+
     elif operation == "Create Record":
         st.header("Create a New Record")
 
@@ -86,7 +195,8 @@ def data_operations_page(schema_manager, connection, operation):
     elif operation == "Update Record":
         st.header("Update an Existing Record")
 
-        id_columns = schema_manager.get_primary_keys(table_name)
+        columns = schema_manager.get_table_columns(table_name)
+        id_columns = [col["Field"] for col in columns if col["Key"].upper() == "PRI"]
         if not id_columns:
             st.error("No primary key found for this table. Updates require a primary key.")
             return
@@ -100,6 +210,9 @@ def data_operations_page(schema_manager, connection, operation):
         # Fetch existing record
         crud_handler = CRUDHandler(connection, table_name)
         record = crud_handler.read_record(primary_key_value, id_column)
+        cache_stats = crud_handler.cache.stats()
+        st.caption(f"Row cache hit ratio: {cache_stats['hit_ratio']:.0%} "
+                   f"({cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['size']} rows cached)")
         if not record:
             st.error("Record not found!")
             return
@@ -110,8 +223,6 @@ def data_operations_page(schema_manager, connection, operation):
         updated_data = {}
 
         if input_mode == "Form Input":
-            columns = schema_manager.get_table_columns(table_name)
-
             for col in columns:
                 col_name = col['Field']
                 col_type = col['Type']
@@ -277,6 +388,7 @@ def table_operations_page(schema_manager: SchemaManager, operation):
                 if st.button("Add Columns from Form"):
                     try:
                         schema_manager.add_column(table_name, new_columns)
+                        CRUDHandler(schema_manager.connection, table_name).invalidate_caches()
                         st.success(f"Columns added successfully to '{table_name}'!")
                     except Exception as e:
                         st.error(f"Invalid JSON format: {e}")
@@ -372,6 +484,7 @@ def table_operations_page(schema_manager: SchemaManager, operation):
 
                 if st.button("Modify Columns from Form") and updated_columns:
                     schema_manager.modify_column(table_name, updated_columns)
+                    CRUDHandler(schema_manager.connection, table_name).invalidate_caches()
                     st.success(f"Modified {len(updated_columns)} columns in '{table_name}' successfully!")
                     st.session_state.selected_table = table_name
                     st.session_state.modify_columns = []  # Reset columns when table changes
@@ -399,6 +512,7 @@ def table_operations_page(schema_manager: SchemaManager, operation):
                     if table_name and drop_col:
                         try:
                             schema_manager.drop_column(table_name, drop_col)
+                            CRUDHandler(schema_manager.connection, table_name).invalidate_caches()
                             st.success(f"Column '{drop_col}' dropped from table '{table_name}' successfully.")
                         except Exception as e:
                             st.error(f"Error dropping column: {e}")
@@ -416,6 +530,7 @@ def table_operations_page(schema_manager: SchemaManager, operation):
                     if table_name and new_table_name:
                         try:
                             schema_manager.rename_table(table_name, new_table_name)
+                            CRUDHandler(schema_manager.connection, table_name).invalidate_caches()
                             st.success(f"Table '{table_name}' renamed to table '{new_table_name}' successfully.")
                         except Exception as e:
                             st.error(f"Error renaming column: {e}")
@@ -430,6 +545,7 @@ def table_operations_page(schema_manager: SchemaManager, operation):
                 if table_name:
                     try:
                         schema_manager.truncate_table(table_name)
+                        CRUDHandler(schema_manager.connection, table_name).invalidate_caches()
                         st.success(f"Table '{table_name}' truncated successfully.")
                     except Exception as e:
                         st.error(f"Error truncating table: {e}")
@@ -444,6 +560,7 @@ def table_operations_page(schema_manager: SchemaManager, operation):
                 if table_name:
                     try:
                         schema_manager.drop_table(table_name)
+                        CRUDHandler(schema_manager.connection, table_name).invalidate_caches()
                         st.success(f"Table '{table_name}' dropped successfully.")
                     except Exception as e:
                         st.error(f"Error dropping table: {e}")
@@ -464,6 +581,8 @@ def app():
         "Data: Create Record",
         "Data: Update Record",
         "Data: Delete Record",
+        "Data: Import File",
+        "Data: Export Table",
         "Table: Create Table",
         "Table: Add Column",
         "Table: Modify Column",
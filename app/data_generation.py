@@ -3,6 +3,8 @@ import streamlit as st
 from data.data_generator import DataGenerator
 from db.initialize_tables import create_initial_tables
 from db.schema_manager import SchemaManager
+from insights.rollup_manager import RollupManager
+from insights.sample_manager import SAMPLED_TABLES, SampleManager, refresh_samples
 
 
 def app():
@@ -34,6 +36,52 @@ def app():
             connection = st.session_state.db_connector.get_connection()
             generator = DataGenerator(record_count=record_count)
             generator.insert_data(connection)
+            refresh = RollupManager(connection).refresh()
+            samples = refresh_samples(connection)
             st.success("Data generated and inserted successfully!")
+            st.caption(f"Rollups refreshed ({refresh['mode']}, {refresh['days']} day(s)) in {refresh['seconds']:.2f}s.")
+            st.caption("Samples refreshed: " + ", ".join(
+                f"{table_name} {sample['sample_rows']:,} of {sample['population']:,} rows"
+                for table_name, sample in samples.items()) + ".")
         except Exception as e:
             st.error(f"Error generating data: {e}")
+
+    st.markdown("---")
+
+    st.header("Rollups")
+    st.markdown("The daily and monthly order rollups behind the time-series insights are refreshed "
+                "incrementally after every ingest.")
+    col_check, col_rebuild = st.columns(2)
+    with col_check:
+        if st.button("Check Rollup Consistency"):
+            try:
+                rollup_manager = RollupManager(connection)
+                rollup_manager.refresh()
+                mismatches = rollup_manager.check_consistency()
+                if mismatches:
+                    st.warning(f"{len(mismatches)} mismatching measure(s) found. Rebuild the rollups to repair them.")
+                    st.dataframe(mismatches)
+                else:
+                    st.success("Rollups match the orders table.")
+            except Exception as e:
+                st.error(f"Error checking rollups: {e}")
+    with col_rebuild:
+        if st.button("Rebuild Rollups"):
+            try:
+                refresh = RollupManager(connection).rebuild()
+                st.success(f"Rollups rebuilt in {refresh['seconds']:.2f}s.")
+            except Exception as e:
+                st.error(f"Error rebuilding rollups: {e}")
+
+    st.markdown("---")
+
+    st.header("Samples")
+    st.markdown("Uniform samples of the orders and deliveries tables back the approximate insight previews. "
+                "They are maintained by reservoir sampling after every ingest.")
+    if st.button("Rebuild Samples"):
+        try:
+            for table_name in SAMPLED_TABLES:
+                SampleManager(connection, table_name).rebuild()
+            st.success("Samples rebuilt.")
+        except Exception as e:
+            st.error(f"Error rebuilding samples: {e}")
@@ -1,7 +1,25 @@
-import pandas as pd
+import datetime
+import time
+import uuid
+
 import streamlit as st
 
-from insights.insights_manager import InsightsManager
+from db.write_versions import write_versions
+from insights.approximate import ApproximateInsights
+from insights.dashboard import DashboardRunner
+from insights.downsampling import downsample_frame
+from insights.filters import GRANULARITIES
+from insights.insights_manager import INSIGHT_SPECS, InsightsManager
+from insights.local_engine import LocalInsightsEngine
+from insights.plan_inspector import PlanInspector, QueryBudgetExceeded
+from insights.prefetcher import InsightPrefetcher
+from insights.query_planner import build_query
+from insights.query_runner import QueryRunner
+from insights.result_cache import result_cache, tables_in_query
+from insights.rollup_manager import ROLLUP_TABLES
+
+INSIGHT_OPTIONS = {spec["title"]: name for name, spec in INSIGHT_SPECS.items()}
+VIEW_OPTIONS = ["Data Table", "Chart"]
 
 
 def convert_to_title(snake_str):
@@ -9,6 +27,308 @@ def convert_to_title(snake_str):
     return ' '.join(word.capitalize() for word in snake_str.split('_'))
 
 
+def render_default_chart(df, chart_type):
+    """Render an insight result with its default chart type, falling back to a table."""
+    df = df.rename(columns=convert_to_title)
+    if df.empty or len(df.columns) < 2:
+        st.dataframe(df)
+    elif chart_type == "line_chart":
+        st.line_chart(df.set_index(df.columns[0]))
+    elif chart_type == "bar_chart":
+        st.bar_chart(df.set_index(df.columns[0]))
+    elif chart_type == "scatter_chart":
+        st.scatter_chart(df)
+    else:
+        st.dataframe(df)
+
+
+def filter_controls(insights_manager):
+    """
+    Render the time window, granularity and dimension filter controls.
+
+    Returns:
+        dict: The filters for `InsightsManager.fetch_insights`, or None when none is set.
+    """
+    with st.expander("Filters"):
+        limit_dates = st.checkbox("Limit date range")
+        col_start, col_end = st.columns(2)
+        today = datetime.date.today()
+        with col_start:
+            start = st.date_input("From", value=today - datetime.timedelta(days=30), disabled=not limit_dates)
+        with col_end:
+            end = st.date_input("To (inclusive)", value=today, disabled=not limit_dates)
+        granularity = st.selectbox("Time series granularity", ["Default"] + list(GRANULARITIES),
+                                   format_func=lambda value: value.capitalize())
+        col_status, col_payment = st.columns(2)
+        with col_status:
+            statuses = st.multiselect("Order status", insights_manager.dimension_values("status"))
+        with col_payment:
+            payment_modes = st.multiselect("Payment mode", insights_manager.dimension_values("payment_mode"))
+        restaurant_ids = st.text_input("Restaurant IDs (comma separated)")
+        st.caption("Dimension filters apply to insights over orders and deliveries.")
+
+    filters = {
+        "granularity": None if granularity == "Default" else granularity,
+        "dimensions": {
+            "status": statuses,
+            "payment_mode": payment_modes,
+            "restaurant_id": [int(value) for value in restaurant_ids.split(",") if value.strip().isdigit()],
+        },
+    }
+    if limit_dates:
+        filters["start"], filters["end"] = start, end + datetime.timedelta(days=1)
+    if not limit_dates and not filters["granularity"] and not any(filters["dimensions"].values()):
+        return None
+    return filters
+
+
+def render_preview(name, connection, view_option, filters=None):
+    """
+    Render the approximate result of an insight, computed on the table samples, while the exact one runs.
+
+    Returns:
+        The placeholder holding the preview (clear it once the exact result is shown), or None if the
+        insight has no approximate version.
+    """
+    df, sample = ApproximateInsights(connection).fetch_insight(name, filters)
+    if df is None:
+        return None
+    preview = st.empty()
+    with preview.container():
+        st.info(f"Approximate preview from a sample of {sample['sample_rows']:,} of {sample['population']:,} rows "
+                f"(with 95% confidence intervals). Computing the exact result...")
+        if view_option == "Data Table":
+            st.dataframe(df.rename(columns=convert_to_title))
+        else:
+            chart_df = df[[column for column in df.columns if "_ci_" not in column]]
+            render_default_chart(downsample_frame(chart_df, INSIGHT_SPECS[name]), INSIGHT_SPECS[name]["chart_type"])
+    return preview
+
+
+def run_query(compute, timeout_seconds=None):
+    """
+    Run an insight computation on a pooled connection while keeping the page responsive.
+
+    A rerun (e.g. selecting another insight) interrupts the wait, which kills the query on the server and
+    returns its connection to the pool instead of blocking the page until MySQL finishes.
+
+    Args:
+        compute (callable): Takes an `InsightsManager` on the pooled connection and returns the result.
+        timeout_seconds (float): Optional execution time limit of the query.
+
+    Returns:
+        The result of `compute`.
+    """
+    status = st.empty()
+    runner = QueryRunner(st.session_state.db_connector.get_pool(), timeout_seconds)
+    owner = st.session_state.setdefault("query_owner", uuid.uuid4().hex)
+    try:
+        return runner.run(lambda connection: compute(InsightsManager(connection, timeout_seconds)), owner=owner,
+                          on_wait=lambda elapsed: status.caption(f"Running query... {elapsed:.1f}s"))
+    finally:
+        status.empty()
+
+
+def exact_computation(name, view_option, filters=None, cost_budget=None):
+    """
+    Return the computation of an insight's exact data for a view, for `run_query` or the prefetcher.
+
+    Returns:
+        callable: Takes an `InsightsManager` and returns the DataFrame with the row count of the full result
+            (None when the DataFrame is the full result).
+    """
+    if view_option == "Chart":
+        # Only the chart's row budget leaves the database, see `InsightsManager.fetch_chart_data`.
+        return lambda manager: manager.fetch_chart_data(name, filters=filters, cost_budget=cost_budget)
+    return lambda manager: (manager.fetch_insight(name, filters, cost_budget), None)
+
+
+def cached_view(insights_manager, name, view_option, filters=None):
+    """
+    Return an insight's data for a view from the result cache, without querying the database.
+
+    Returns:
+        tuple: The DataFrame and the row count of the full result (None when the DataFrame is the full result),
+            or None if it is not cached.
+    """
+    if view_option == "Chart":
+        return insights_manager.cached_chart_data(name, filters=filters)
+    df = insights_manager.cached_insight(name, filters)
+    return None if df is None else (df, None)
+
+
+def result_key(connection, name, view_option=None, filters=None, cost_budget=None):
+    """
+    Return the key of an insight's data for a view, or without a view for the selection as a whole.
+
+    The key changes with the data the insight reads, including the orders behind the rollups.
+    """
+    sql = build_query(InsightsManager.filtered_specs(filters, [name])[name])
+    orders_version = write_versions.get("orders") if set(tables_in_query(sql)) & set(ROLLUP_TABLES) else None
+    return result_cache.make_key(connection, f"{name}@{view_option or 'selection'}", sql,
+                                 (repr(filters), cost_budget, orders_version))
+
+
+def session_prefetcher(timeout_seconds=None):
+    """Return the prefetcher of the current session, creating it on first use."""
+    if "prefetcher" not in st.session_state:
+        st.session_state.prefetcher = InsightPrefetcher(st.session_state.db_connector.get_pool())
+    st.session_state.prefetcher.timeout_seconds = timeout_seconds
+    return st.session_state.prefetcher
+
+
+def render_plan(insights_manager, name, filters=None):
+    """Render the execution plan of an insight with its estimated cost and any plan regression."""
+    inspection = insights_manager.explain_insight(name, filters)
+    col_cost, col_rows = st.columns(2)
+    col_cost.metric("Estimated cost", f"{inspection['query_cost']:,.0f}")
+    col_rows.metric("Estimated rows examined", f"{inspection['estimated_rows']:,}")
+    warnings = [f"full scan of {', '.join(inspection['full_scans'])}"] if inspection["full_scans"] else []
+    warnings += [label for label, used in (("filesort", inspection["filesort"]),
+                                           ("temporary table", inspection["temporary_table"])) if used]
+    if warnings:
+        st.caption("Uses " + ", ".join(warnings) + ".")
+    if inspection["regressed"]:
+        st.warning(f"The plan changed from {inspection['baseline_fingerprint']} to {inspection['fingerprint']} "
+                   f"since it was first captured.")
+        if st.button("Accept Plan"):
+            PlanInspector(insights_manager.connection).accept(name)
+            st.rerun()
+    st.dataframe(inspection["tables"])
+    st.json(inspection["plan"], expanded=False)
+
+    if st.button("Check All Plans"):
+        inspections = insights_manager.explain_insights(filters=filters)
+        st.dataframe([{"insight": INSIGHT_SPECS[insight]["title"], "cost": result["query_cost"],
+                       "rows": result["estimated_rows"], "full scans": ", ".join(result["full_scans"]),
+                       "filesort": result["filesort"], "temporary table": result["temporary_table"],
+                       "regressed": result["regressed"]} for insight, result in inspections.items()])
+
+
+@st.fragment
+def insight_view(name, default_chart_type, load):
+    """
+    Render the selected insight as a table or a chart.
+
+    Runs as a fragment: switching the view or the chart type reruns only this function. The data of each view
+    is loaded once per selection, by `load`, and held in `st.session_state.held_insight`; the table view
+    holds the full result and the chart view only the rows the chart receives.
+
+    Args:
+        name (str): The insight name.
+        default_chart_type (str): The insight's chart type.
+        load (callable): Takes a view option and returns the view's held data, or None if it failed.
+    """
+    if "view_option" not in st.session_state:
+        st.session_state["view_option"] = VIEW_OPTIONS[0]
+
+    view_option = st.radio(
+        "View Option",
+        VIEW_OPTIONS,
+        horizontal=True,
+        key="view_option"
+    )
+
+    st.write("Current View Option:", view_option)
+
+    views = st.session_state.held_insight["views"]
+    if view_option not in views:
+        try:
+            held = load(view_option)
+        except Exception as e:
+            st.error(f"Error executing insight: {e}")
+            return
+        if held is None:
+            return
+        views[view_option] = held
+    held = views[view_option]
+    if held["notice"]:
+        st.warning(held["notice"])
+    df = held["df"]
+    if view_option == "Chart" and len(df) < held["total_rows"]:
+        st.caption(f"Chart downsampled to {len(df):,} of {held['total_rows']:,} rows.")
+    df = df.rename(columns=convert_to_title)
+
+    if view_option == "Data Table":
+        st.dataframe(df)
+        return
+
+    chart_options = []
+    if default_chart_type == "line_chart":
+        chart_options = ["Line Chart", "Area Chart"]
+    elif default_chart_type == "bar_chart":
+        chart_options = ["Bar Chart"]
+    elif default_chart_type == "scatter_chart":
+        chart_options = ["Scatter Chart"]
+    else:
+        chart_options = [default_chart_type]
+
+    default_chart = st.session_state.get("selected_chart", chart_options[0])
+    if default_chart not in chart_options:
+        default_chart = chart_options[0]
+
+    selected_chart = st.radio("Select Chart Type", chart_options, index=chart_options.index(default_chart),
+                              horizontal=True, key="chart_type")
+    st.session_state.selected_chart = selected_chart
+
+    df_indexed = df.set_index(df.columns[0])
+    if selected_chart == "Line Chart":
+        st.line_chart(df_indexed)
+    elif selected_chart == "Area Chart":
+        st.area_chart(df_indexed)
+    elif selected_chart == "Bar Chart":
+        st.bar_chart(df_indexed)
+    elif selected_chart == "Scatter Chart":
+        # Scatters aggregated into grid cells are drawn with points sized by their count.
+        st.scatter_chart(df, x=df.columns[0], y=df.columns[1],
+                         size="Points" if "Points" in df.columns else None)
+    else:
+        st.write("Chart type not recognized by Streamlit's built-in charts.")
+
+
+def dashboard(filters=None):
+    """Render every insight on one page, computed concurrently and shown as each result arrives."""
+    col_workers, col_timeout = st.columns(2)
+    with col_workers:
+        max_workers = st.slider("Parallel queries", min_value=1, max_value=8, value=4)
+    with col_timeout:
+        timeout_seconds = st.number_input("Per-query timeout (seconds)", min_value=1, value=30)
+    if not st.button("Refresh Dashboard"):
+        return
+
+    summary = st.empty()
+    panels = {}
+    columns = st.columns(3)
+    for index, (name, spec) in enumerate(INSIGHT_SPECS.items()):
+        with columns[index % 3]:
+            st.subheader(f"{index + 1}. {spec['title']}")
+            panels[name] = st.empty()
+            panels[name].caption("Running...")
+
+    runner = DashboardRunner(st.session_state.db_connector.get_pool(), max_workers=max_workers,
+                             timeout_seconds=timeout_seconds)
+    start = time.monotonic()
+    query_seconds = 0.0
+    queries = 0
+    for outcome in runner.run(filters=filters):
+        queries += 1
+        query_seconds += outcome["seconds"]
+        for name in outcome["names"]:
+            with panels[name].container():
+                if outcome["error"]:
+                    st.error(outcome["error"])
+                else:
+                    render_default_chart(downsample_frame(outcome["results"][name], INSIGHT_SPECS[name]),
+                                         INSIGHT_SPECS[name]["chart_type"])
+                    st.caption(f"{outcome['seconds']:.2f}s")
+        summary.caption(f"{queries} queries done in {time.monotonic() - start:.2f}s")
+
+    wall_seconds = time.monotonic() - start
+    summary.info(f"{len(INSIGHT_SPECS)} insights from {queries} queries in {wall_seconds:.2f}s wall time; "
+                 f"the queries took {query_seconds:.2f}s in total "
+                 f"({query_seconds / wall_seconds if wall_seconds else 0:.1f}x parallel speedup).")
+
+
 def app():
     st.title("Data Insights & Visualisations")
 
@@ -19,40 +339,14 @@ def app():
     connection = st.session_state.db_connector.get_connection()
     insights_manager = InsightsManager(connection)
 
-    insight_options = {
-        "Total orders per day": insights_manager.get_insight_total_orders_per_day,
-        "Total revenue per day": insights_manager.get_insight_total_revenue_per_day,
-        "Average order value per day": insights_manager.get_insight_avg_order_value_per_day,
-        "Total orders per month": insights_manager.get_insight_orders_per_month,
-        "Total revenue per month": insights_manager.get_insight_revenue_per_month,
-        "Top 5 restaurants by order count": insights_manager.get_insight_top_restaurants_by_orders,
-        "Top 5 restaurants by revenue": insights_manager.get_insight_top_restaurants_by_revenue,
-        "Orders distribution by cuisine type": insights_manager.get_insight_orders_by_cuisine,
-        "Average delivery time per restaurant": insights_manager.get_insight_avg_delivery_time_per_restaurant,
-        "Delivery status distribution": insights_manager.get_insight_delivery_status_distribution,
-        "Average feedback rating per restaurant": insights_manager.get_insight_avg_feedback_rating_per_restaurant,
-        "Top 5 customers by order count": insights_manager.get_insight_top_customers_by_orders,
-        "Order status distribution": insights_manager.get_insight_order_status_distribution,
-        "Average discount per payment mode": insights_manager.get_insight_avg_discount_per_payment_mode,
-        "Delivery fee distribution": insights_manager.get_insight_delivery_fee_distribution,
-        "Average order value by customer type": insights_manager.get_insight_avg_order_value_by_customer_type,
-        "Daily customer sign-ups": insights_manager.get_insight_daily_customer_signups,
-        "Orders by payment mode": insights_manager.get_insight_orders_by_payment_mode,
-        "Average feedback rating per day": insights_manager.get_insight_avg_feedback_per_day,
-        "Orders by customer location": insights_manager.get_insight_orders_by_customer_location,
-        "Average delivery distance per order": insights_manager.get_insight_avg_delivery_distance_per_order,
-        "Top 5 delivery persons by deliveries": insights_manager.get_insight_top_delivery_persons_by_deliveries,
-        "Average feedback rating for delivery persons": insights_manager.get_insight_avg_delivery_rating_for_persons,
-        "Order delivery status ratio": insights_manager.get_insight_order_delivery_status_ratio,
-        "Average difference between estimated and actual delivery time": insights_manager.get_insight_avg_delivery_time_difference,
-        "Total revenue by restaurant cuisine type": insights_manager.get_insight_revenue_by_cuisine,
-        "Customer order frequency distribution": insights_manager.get_insight_customer_order_frequency,
-        "Correlation between order value and feedback": insights_manager.get_insight_order_value_vs_feedback,
-        "Comparison of on-time vs delayed deliveries": insights_manager.get_insight_delivery_success_vs_delay,
-        "Daily average delivery time": insights_manager.get_insight_daily_avg_delivery_time
-    }
+    mode = st.radio("Mode", ["Single Insight", "Dashboard"], horizontal=True)
+    filters = filter_controls(insights_manager)
+    if mode == "Dashboard":
+        session_prefetcher().cancel_all()
+        dashboard(filters)
+        return
 
-    insight_keys = list(insight_options.keys())
+    insight_keys = list(INSIGHT_OPTIONS.keys())
     total_insights = len(insight_keys)
 
     if "insight_index" not in st.session_state:
@@ -75,57 +369,111 @@ def app():
             st.session_state.insight_index = (st.session_state.insight_index + 1) % total_insights
             st.rerun()
 
-    view_options = ["Data Table", "Chart"]
-    if "view_option" not in st.session_state:
-        st.session_state["view_option"] = view_options[0]
+    engine = st.radio("Engine", ["MySQL", "In-process"], horizontal=True,
+                      help="In-process computes insights from columnar snapshots of the tables held in memory.")
+    if engine == "In-process":
+        if filters:
+            st.caption("Filters apply to the MySQL engine; the in-process engine covers the full history.")
+        with st.expander("In-process engine"):
+            local_engine = LocalInsightsEngine(connection)
+            if st.button("Reload Snapshots"):
+                local_engine.reload()
+                st.session_state.pop("held_insight", None)
+            usage = local_engine.memory_usage()
+            st.caption(", ".join(f"{table}: {rows:,} rows, {size / 1e6:.1f} MB"
+                                 for table, (rows, size) in usage.items()))
+            if st.button("Verify Against SQL"):
+                report = local_engine.verify()
+                failed = {INSIGHT_SPECS[name]["title"]: problems for name, problems in report.items() if problems}
+                if failed:
+                    st.warning(f"{len(failed)} of {len(report)} insights differ from SQL.")
+                    st.json(failed)
+                else:
+                    st.success(f"All {len(report)} insights match their SQL results.")
+        approximate_preview = False
+        cost_budget = None
+        timeout_seconds = None
+        session_prefetcher().cancel_all()
+    else:
+        approximate_preview = st.checkbox("Approximate preview", value=True,
+                                          help="Show an estimate computed on a sample of the table first, then "
+                                               "replace it with the exact result.")
+        cost_budget = st.number_input("Query cost budget", min_value=0, value=0, step=100000,
+                                      help="Maximum optimizer cost estimate (EXPLAIN) of a query. Over-budget "
+                                           "insights show their approximate result or are refused. 0 disables "
+                                           "the check.") or None
+        timeout_seconds = st.number_input("Query timeout (seconds)", min_value=1, value=30,
+                                          help="Queries running longer are stopped on the server.")
 
-    view_option = st.radio(
-        "View Option",
-        view_options,
-        horizontal=True,
-        key="view_option"
-    )
-    view_option = st.session_state.get("view_option", view_options[0])
+    try:
+        name = INSIGHT_OPTIONS[current_insight]
+        neighbours = [INSIGHT_OPTIONS[insight_keys[(st.session_state.insight_index + step) % total_insights]]
+                      for step in (1, -1)]
+        query, default_chart_type, description = insights_manager.get_insight(name)
 
-    st.write("Current View Option:", view_option)
+        def load(view_option):
+            """Compute the data of one view of the selected insight, see `insight_view`."""
+            notice = None
+            total_rows = None
+            if engine == "In-process":
+                df = LocalInsightsEngine(connection).fetch_insight(name)
+            else:
+                prefetcher = session_prefetcher(timeout_seconds)
+                # After a jump, stop speculating about insights that are no longer next to the current one.
+                key = result_key(connection, name, view_option, filters, cost_budget)
+                prefetcher.retain([key] + [result_key(connection, neighbour, view_option, filters, cost_budget)
+                                           for neighbour in neighbours])
+                status = st.empty()
+                prefetched = prefetcher.take(key, on_wait=lambda elapsed: status.caption(f"Running query... "
+                                                                                          f"{elapsed:.1f}s"))
+                status.empty()
+                try:
+                    ready = prefetched if prefetched is not None else \
+                        cached_view(insights_manager, name, view_option, filters)
+                    if ready is not None:
+                        df, total_rows = ready
+                    else:
+                        preview = render_preview(name, connection, view_option, filters) \
+                            if approximate_preview else None
+                        try:
+                            df, total_rows = run_query(exact_computation(name, view_option, filters, cost_budget),
+                                                       timeout_seconds)
+                        finally:
+                            if preview is not None:
+                                preview.empty()
+                except QueryBudgetExceeded as e:
+                    df, sample = ApproximateInsights(connection).fetch_insight(name, filters)
+                    if df is None:
+                        st.error(f"{e}. The query was refused; narrow the filters or raise the budget.")
+                        return None
+                    notice = (f"{e}. Showing the approximate result from a sample of {sample['sample_rows']:,} "
+                              f"of {sample['population']:,} rows instead.")
+                except TimeoutError as e:
+                    st.error(f"{e}. Narrow the filters or raise the timeout.")
+                    return None
+            if view_option == "Chart":
+                total_rows = total_rows or len(df)
+                df = downsample_frame(df, INSIGHT_SPECS[name])
+            return {"df": df, "total_rows": total_rows, "notice": notice}
 
-    try:
-        query, default_chart_type, description = insight_options[current_insight]()
-        df = pd.read_sql(query, connection)
+        # Views are loaded lazily and held until the selection (or the data it reads) changes, or for as long
+        # as cached results live, which covers writes from other processes; reruns in between reuse them.
+        key = (engine, result_key(connection, name, None, filters, cost_budget))
+        held = st.session_state.get("held_insight", {})
+        if held.get("key") != key or time.monotonic() - held["held_at"] > result_cache.ttl_seconds:
+            st.session_state.held_insight = {"key": key, "views": {}, "held_at": time.monotonic()}
         st.write(description)
-        df.columns = [convert_to_title(col) for col in df.columns]
+        insight_view(name, default_chart_type, load)
 
-        if view_option == "Data Table":
-            st.dataframe(df)
-        else:
-            chart_options = []
-            if default_chart_type == "line_chart":
-                chart_options = ["Line Chart", "Area Chart"]
-            elif default_chart_type == "bar_chart":
-                chart_options = ["Bar Chart"]
-            elif default_chart_type == "scatter_plot":
-                chart_options = ["Scatter Chart"]
-            else:
-                chart_options = [default_chart_type]
-
-            default_chart = st.session_state.get("selected_chart", chart_options[0])
-            if default_chart not in chart_options:
-                default_chart = chart_options[0]
-
-            selected_chart = st.radio("Select Chart Type", chart_options, index=chart_options.index(default_chart), horizontal=True,
-                                      key="chart_type")
-            st.session_state.selected_chart = selected_chart
-
-            df_indexed = df.set_index(df.columns[0])
-            if selected_chart == "Line Chart":
-                st.line_chart(df_indexed)
-            elif selected_chart == "Area Chart":
-                st.area_chart(df_indexed)
-            elif selected_chart == "Bar Chart":
-                st.bar_chart(df_indexed)
-            elif selected_chart == "Scatter Chart":
-                st.scatter_chart(df)
-            else:
-                st.write("Chart type not recognized by Streamlit's built-in charts.")
+        if engine == "MySQL":
+            # Compute the neighbouring insights in the background, so Previous/Next show them at once.
+            view_option = st.session_state.get("view_option", VIEW_OPTIONS[0])
+            session_prefetcher(timeout_seconds).prefetch({
+                result_key(connection, neighbour, view_option, filters, cost_budget):
+                    exact_computation(neighbour, view_option, filters, cost_budget)
+                for neighbour in neighbours if cached_view(insights_manager, neighbour, view_option, filters) is None})
+
+        if engine == "MySQL" and st.toggle("Show query plan"):
+            render_plan(insights_manager, name, filters)
     except Exception as e:
         st.error(f"Error executing insight: {e}")
@@ -0,0 +1,176 @@
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pymysql
+
+from crud.crud_handler import CRUDHandler
+from data.data_generator import DataGenerator
+from db.connection import DatabaseConnector
+from db.initialize_tables import create_tables
+
+# Number of orders (and of rows in every other table, as DataGenerator generates) of each benchmark dataset.
+BENCHMARK_SCALES = (10_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_SEED = 42
+# Generated dates end here instead of at the current time, so a seed always yields the same rows.
+DATASET_END_DATE = datetime(2025, 1, 1)
+# Tables in insertion order (referenced tables first) with their primary keys.
+DATASET_TABLES = {
+    "customers": "customer_id",
+    "restaurants": "restaurant_id",
+    "delivery_persons": "delivery_person_id",
+    "orders": "order_id",
+    "deliveries": "delivery_id",
+}
+
+
+def seeded_generator(record_count, seed=DEFAULT_SEED):
+    """
+    Return a DataGenerator whose output depends only on the record count and the seed.
+
+    Args:
+        record_count (int): Number of records to generate per table.
+        seed (int): Seed of the random and Faker generators.
+
+    Returns:
+        DataGenerator: The generator.
+    """
+    random.seed(seed)
+    generator = DataGenerator(record_count)
+    generator.fake.seed_instance(seed)
+    generator.end_date = DATASET_END_DATE
+    generator.start_date = DATASET_END_DATE - timedelta(days=2 * 365)
+    return generator
+
+
+def generate_dataset(scale, seed=DEFAULT_SEED, profile=None):
+    """
+    Generate a benchmark dataset with DataGenerator.
+
+    Foreign keys are drawn from the primary keys 1..scale, which are filled in explicitly, so the dataset needs
+    no database round trip between tables and loads into MySQL with the same keys.
+
+    Args:
+        scale (int): Number of rows per table.
+        seed (int): Seed of the generators.
+        profile (dict): Optional dict receiving, per table, the "generation_seconds" and, while tracemalloc is
+            tracing, the "generation_peak_bytes" allocated.
+
+    Returns:
+        dict: Table name -> DataFrame, in DATASET_TABLES order, with the primary key as the first column.
+    """
+    generator = seeded_generator(scale, seed)
+    keys = np.arange(1, scale + 1)
+    generate = {
+        "customers": generator.generate_customers,
+        "restaurants": generator.generate_restaurants,
+        "delivery_persons": generator.generate_delivery_persons,
+        "orders": lambda: generator.generate_orders(keys, keys),
+        "deliveries": lambda: generator.generate_deliveries(keys, keys),
+    }
+    frames = {}
+    for table_name, primary_key in DATASET_TABLES.items():
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        frames[table_name] = generate[table_name]()
+        frames[table_name].insert(0, primary_key, keys[: len(frames[table_name])])
+        if profile is not None:
+            profile[table_name] = {"generation_seconds": time.perf_counter() - start}
+            if tracemalloc.is_tracing():
+                profile[table_name]["generation_peak_bytes"] = (
+                    tracemalloc.get_traced_memory()[1]
+                )
+    return frames
+
+
+def as_snapshot_frames(frames):
+    """
+    Convert generated tables to the column types the in-process engine reads from MySQL.
+
+    Args:
+        frames (dict): Table name -> DataFrame, see `generate_dataset`.
+
+    Returns:
+        dict: Table name -> DataFrame with datetime date columns.
+    """
+    frames = dict(frames)
+    frames["customers"] = frames["customers"].assign(
+        signup_date=pd.to_datetime(frames["customers"]["signup_date"])
+    )
+    frames["orders"] = frames["orders"].assign(
+        order_date=pd.to_datetime(frames["orders"]["order_date"]),
+        delivery_time=pd.to_datetime(frames["orders"]["delivery_time"]),
+    )
+    return frames
+
+
+def dataset_database(prefix, scale, seed=DEFAULT_SEED):
+    """Return the name of the database holding a benchmark dataset, one per scale and seed."""
+    return f"{prefix}_{scale}_{seed}"
+
+
+def open_dataset_database(host, port, user, password, prefix, scale, seed=DEFAULT_SEED):
+    """
+    Connect to the database of a benchmark dataset, creating the database if needed.
+
+    Args:
+        host (str): MySQL host.
+        port (int): MySQL port.
+        user (str): MySQL user.
+        password (str): MySQL password.
+        prefix (str): Prefix of the benchmark database names.
+        scale (int): Number of rows per table.
+        seed (int): Seed of the dataset.
+
+    Returns:
+        DatabaseConnector: The connector.
+    """
+    return DatabaseConnector(
+        host, port, user, password, dataset_database(prefix, scale, seed)
+    )
+
+
+def dataset_loaded(connection, scale):
+    """
+    Return whether a database already holds a complete benchmark dataset of the given scale.
+
+    Args:
+        connection (pymysql.connections.Connection): Connection to the dataset database.
+        scale (int): Number of rows per table.
+
+    Returns:
+        bool: True if the deliveries table (loaded last) holds `scale` rows.
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM deliveries;")
+            return cursor.fetchone()[0] == scale
+    except pymysql.MySQLError:
+        return False
+
+
+def load_dataset(connection, frames):
+    """
+    Create the application tables in an empty database and insert a generated dataset.
+
+    Rows go through CRUDHandler, like DataGenerator.insert_data, so the change log, rollups and samples see
+    them.
+
+    Args:
+        connection (pymysql.connections.Connection): Connection to the empty dataset database.
+        frames (dict): Table name -> DataFrame, see `generate_dataset`.
+    """
+    create_tables(connection)
+    for table_name, frame in frames.items():
+        if table_name == "orders":
+            frame = frame.assign(
+                order_date=frame["order_date"].astype(str),
+                delivery_time=frame["delivery_time"].astype(str),
+            )
+        CRUDHandler(connection, table_name).bulk_create_records(
+            frame.to_dict("records")
+        )
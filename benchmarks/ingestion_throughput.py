@@ -0,0 +1,342 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.datasets import DATASET_TABLES, DEFAULT_SEED, generate_dataset
+from crud.crud_handler import DEFAULT_BATCH_SIZE
+from db.connection import DatabaseConnector
+from db.initialize_tables import create_tables
+
+INGESTION_PATHS = ("executemany", "batched", "bulk_load", "parallel")
+DEFAULT_INGESTION_SCALES = (10_000, 100_000)
+# Generated columns DataGenerator.insert_data converts to strings before inserting.
+STRINGIFIED_COLUMNS = {"orders": ["order_date", "delivery_time"]}
+
+
+def _insert_statement(table_name, columns, rows=1):
+    row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {', '.join([row_placeholder] * rows)};"  # noqa: S608  # benchmark tables and columns
+
+
+class IngestionBenchmark:
+    """
+    Measures how fast generated data gets into MySQL, stage by stage, for every insert path.
+
+    Per table and path it records the DataFrame-to-parameter conversion (`astype(str)` of the datetime columns,
+    like `DataGenerator.insert_data`, then `.values.tolist()`, or writing the CSV file for LOAD DATA), the time
+    spent sending and executing the statements, the time spent committing, and the peak memory allocated by
+    Python (tracemalloc) while doing so. The paths are:
+
+    - "executemany": one `cursor.executemany` of a single-row INSERT, which PyMySQL rewrites into multi-row
+      statements, in one transaction;
+    - "batched": multi-row INSERTs of `batch_size` rows, each in its own transaction, as `CRUDHandler` does;
+    - "bulk_load": `LOAD DATA LOCAL INFILE` of a CSV file, in one transaction;
+    - "parallel": the batched path split over `writers` connections inserting disjoint slices concurrently.
+
+    Rows are inserted straight through the cursor, without the change log, so the numbers isolate the insert
+    path itself.
+    """
+
+    def __init__(
+        self, connector, batch_size: int = DEFAULT_BATCH_SIZE, writers: int = 4
+    ):
+        """
+        Initialize the benchmark.
+
+        Args:
+            connector (DatabaseConnector): Connector to the (dedicated) benchmark database; its tables are
+                truncated before every path.
+            batch_size (int): Rows per INSERT statement of the batched and parallel paths.
+            writers (int): Number of concurrent connections of the parallel path.
+        """
+        self.connector = connector
+        self.batch_size = batch_size
+        self.writers = writers
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def prepare_tables(self, connection):
+        """Create the application tables if needed and empty the dataset tables."""
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW TABLES LIKE 'deliveries';")
+            exists = cursor.fetchone() is not None
+        if not exists:
+            create_tables(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
+            for table_name in reversed(list(DATASET_TABLES)):
+                cursor.execute(f"TRUNCATE TABLE {table_name};")
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+
+    @staticmethod
+    def to_parameters(table_name, frame):
+        """
+        Convert a generated DataFrame to statement parameters, timing both steps.
+
+        Args:
+            table_name (str): The table the rows belong to.
+            frame (pd.DataFrame): The generated rows.
+
+        Returns:
+            tuple: The rows (lists of values) and a dict with the "stringify_seconds" and "tolist_seconds".
+        """
+        start = time.perf_counter()
+        columns = STRINGIFIED_COLUMNS.get(table_name, [])
+        if columns:
+            frame = frame.assign(
+                **{column: frame[column].astype(str) for column in columns}
+            )
+        stringified = time.perf_counter()
+        rows = frame.values.tolist()
+        return rows, {
+            "stringify_seconds": stringified - start,
+            "tolist_seconds": time.perf_counter() - stringified,
+        }
+
+    def _insert_executemany(self, connection, table_name, columns, rows):
+        start = time.perf_counter()
+        connection.begin()
+        with connection.cursor() as cursor:
+            cursor.executemany(_insert_statement(table_name, columns), rows)
+        inserted = time.perf_counter()
+        connection.commit()
+        return inserted - start, time.perf_counter() - inserted
+
+    def _insert_batched(self, connection, table_name, columns, rows):
+        insert_seconds = commit_seconds = 0.0
+        for offset in range(0, len(rows), self.batch_size):
+            batch = rows[offset : offset + self.batch_size]
+            start = time.perf_counter()
+            connection.begin()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    _insert_statement(table_name, columns, len(batch)),
+                    [value for row in batch for value in row],
+                )
+            inserted = time.perf_counter()
+            connection.commit()
+            insert_seconds += inserted - start
+            commit_seconds += time.perf_counter() - inserted
+        return insert_seconds, commit_seconds
+
+    def _insert_parallel(self, table_name, columns, rows):
+        def write(part):
+            connection = self.connector.new_connection()
+            try:
+                return self._insert_batched(connection, table_name, columns, part)
+            finally:
+                connection.close()
+
+        size = -(-len(rows) // self.writers)
+        parts = [rows[offset : offset + size] for offset in range(0, len(rows), size)]
+        with ThreadPoolExecutor(
+            max_workers=self.writers, thread_name_prefix="writer"
+        ) as executor:
+            timings = list(executor.map(write, parts))
+        # Summed over the writers: the time spent inserting and committing, not the elapsed time.
+        return sum(insert for insert, _ in timings), sum(
+            commit for _, commit in timings
+        )
+
+    def _bulk_load(self, connection, table_name, frame):
+        start = time.perf_counter()
+        columns = STRINGIFIED_COLUMNS.get(table_name, [])
+        frame = frame.assign(
+            **{column: frame[column].astype(str) for column in columns}
+        )
+        frame = frame.assign(
+            **{
+                column: frame[column].astype(np.int8)
+                for column in frame.columns
+                if frame[column].dtype == bool
+            }
+        )
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        os.close(handle)
+        try:
+            frame.to_csv(
+                path, header=False, index=False, na_rep="\\N", lineterminator="\n"
+            )
+            written = time.perf_counter()
+            connection.begin()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {table_name} FIELDS TERMINATED BY ',' "
+                    f"OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' "
+                    f"({', '.join(frame.columns)});",
+                    (path,),
+                )
+            loaded = time.perf_counter()
+            connection.commit()
+            return {
+                "conversion_seconds": written - start,
+                "insert_seconds": loaded - written,
+                "commit_seconds": time.perf_counter() - loaded,
+            }
+        finally:
+            os.remove(path)
+
+    def run_path(self, path, frames):
+        """
+        Insert a dataset into the emptied tables through one insert path.
+
+        Args:
+            path (str): One of INGESTION_PATHS.
+            frames (dict): Table name -> DataFrame, see `datasets.generate_dataset`.
+
+        Returns:
+            dict: Table name -> the "rows", "conversion_seconds" (with "stringify_seconds" and "tolist_seconds"
+                for the INSERT paths), "insert_seconds", "commit_seconds", "total_seconds", "rows_per_second"
+                and, while tracemalloc is tracing, the "peak_bytes" allocated.
+        """
+        if path not in INGESTION_PATHS:
+            raise ValueError(f"Unsupported ingestion path: {path}")
+        connection = self.connector.new_connection(local_infile=path == "bulk_load")
+        try:
+            self.prepare_tables(connection)
+            tables = {}
+            for table_name, frame in frames.items():
+                if tracemalloc.is_tracing():
+                    tracemalloc.reset_peak()
+                start = time.perf_counter()
+                if path == "bulk_load":
+                    stats = self._bulk_load(connection, table_name, frame)
+                else:
+                    rows, stats = self.to_parameters(table_name, frame)
+                    stats["conversion_seconds"] = (
+                        stats["stringify_seconds"] + stats["tolist_seconds"]
+                    )
+                    columns = list(frame.columns)
+                    if path == "executemany":
+                        timings = self._insert_executemany(
+                            connection, table_name, columns, rows
+                        )
+                    elif path == "batched":
+                        timings = self._insert_batched(
+                            connection, table_name, columns, rows
+                        )
+                    else:
+                        timings = self._insert_parallel(table_name, columns, rows)
+                    stats["insert_seconds"], stats["commit_seconds"] = timings
+                stats["total_seconds"] = time.perf_counter() - start
+                stats["rows"] = len(frame)
+                stats["rows_per_second"] = (
+                    len(frame) / stats["total_seconds"]
+                    if stats["total_seconds"]
+                    else None
+                )
+                if tracemalloc.is_tracing():
+                    stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                tables[table_name] = stats
+                self.logger.info(
+                    "%s via %s: %.0f rows/s",
+                    table_name,
+                    path,
+                    stats["rows_per_second"] or 0,
+                )
+            return tables
+        finally:
+            connection.close()
+
+    def run(
+        self, scales=DEFAULT_INGESTION_SCALES, paths=INGESTION_PATHS, seed=DEFAULT_SEED
+    ):
+        """
+        Generate a dataset per scale and insert it through every path.
+
+        Args:
+            scales (list): Numbers of rows per table.
+            paths (list): Insert paths, see INGESTION_PATHS.
+            seed (int): Seed of the generated datasets.
+
+        Returns:
+            dict: The "seed", "batch_size", "writers", "created_at" and, per scale (as a string), the per-table
+                "generation" profile (see `datasets.generate_dataset`) and the per-path table measurements
+                (see `run_path`).
+        """
+        results = {
+            "seed": seed,
+            "batch_size": self.batch_size,
+            "writers": self.writers,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "scales": {},
+        }
+        for scale in scales:
+            self.logger.info("Generating %d rows per table", scale)
+            generation = {}
+            frames = generate_dataset(scale, seed, generation)
+            results["scales"][str(scale)] = {
+                "generation": generation,
+                "paths": {path: self.run_path(path, frames) for path in paths},
+            }
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark data generation and ingestion throughput."
+    )
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=list(DEFAULT_INGESTION_SCALES)
+    )
+    parser.add_argument(
+        "--paths", nargs="+", choices=INGESTION_PATHS, default=list(INGESTION_PATHS)
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--no-trace-memory",
+        action="store_true",
+        help="Skip tracemalloc, which slows down the Python-side stages.",
+    )
+    parser.add_argument("--host", default=os.environ.get("MYSQL_HOST", "localhost"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.environ.get("MYSQL_PORT", 3306))
+    )
+    parser.add_argument("--user", default=os.environ.get("MYSQL_USER", "root"))
+    parser.add_argument("--password", default=os.environ.get("MYSQL_PASSWORD", ""))
+    parser.add_argument("--database", default="zomato_benchmark_ingestion")
+    parser.add_argument(
+        "--output",
+        help="Write the results to this JSON file (default: standard output).",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.no_trace_memory:
+        tracemalloc.start()
+    connector = DatabaseConnector(
+        args.host, args.port, args.user, args.password, args.database
+    )
+    results = IngestionBenchmark(connector, args.batch_size, args.writers).run(
+        args.scales, args.paths, args.seed
+    )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
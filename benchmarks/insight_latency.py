@@ -0,0 +1,362 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.datasets import (
+    BENCHMARK_SCALES,
+    DEFAULT_SEED,
+    as_snapshot_frames,
+    dataset_loaded,
+    generate_dataset,
+    load_dataset,
+    open_dataset_database,
+)
+from insights.insights_manager import INSIGHT_SPECS, InsightsManager
+from insights.local_engine import LOCAL_INSIGHTS, LocalInsightsEngine
+from insights.result_cache import result_cache
+from insights.rollup_manager import RollupManager
+
+BACKENDS = ("mysql", "local")
+# A latency regression must exceed the baseline by this fraction and by this many seconds to be flagged.
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+DEFAULT_MIN_REGRESSION_SECONDS = 0.005
+
+
+def handler_reads(connection):
+    """
+    Return the session's total of `Handler_read_%` status counters.
+
+    These count the rows the storage engine handed to the server, through index lookups and scans.
+
+    Args:
+        connection (pymysql.connections.Connection): The connection.
+
+    Returns:
+        int: The counter total.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%';")
+        return sum(int(value) for _, value in cursor.fetchall())
+
+
+def summarize_timings(seconds):
+    """
+    Summarizes the latencies of repeated runs.
+
+    Args:
+        seconds (list): The latency of every run, cold run first.
+
+    Returns:
+        dict: The "cold_seconds" of the first run and the "p50_seconds", "p95_seconds" and "mean_seconds" of
+            the warm runs (of the cold run when there is no warm run).
+    """
+    warm = seconds[1:] or seconds
+    return {
+        "cold_seconds": seconds[0],
+        "p50_seconds": float(np.percentile(warm, 50)),
+        "p95_seconds": float(np.percentile(warm, 95)),
+        "mean_seconds": float(np.mean(warm)),
+    }
+
+
+def compare_results(
+    results,
+    baseline,
+    threshold=DEFAULT_REGRESSION_THRESHOLD,
+    min_seconds=DEFAULT_MIN_REGRESSION_SECONDS,
+):
+    """
+    Flag insights that got slower, or read more rows, than in a baseline run.
+
+    Args:
+        results (dict): The current results, see `InsightLatencyBenchmark.run`.
+        baseline (dict): Earlier results of the same backend.
+        threshold (float): Relative increase above which a metric regressed.
+        min_seconds (float): Absolute latency increase below which timing noise is ignored.
+
+    Returns:
+        list: Dictionaries with the "scale", "insight", "metric", "baseline" and "current" values.
+    """
+    regressions = []
+    for scale, current_scale in results["scales"].items():
+        baseline_scale = baseline.get("scales", {}).get(scale)
+        if baseline_scale is None:
+            continue
+        for name, current in current_scale["insights"].items():
+            previous = baseline_scale["insights"].get(name)
+            if previous is None:
+                continue
+            for metric in ("p50_seconds", "p95_seconds", "rows_scanned"):
+                old, new = previous.get(metric), current.get(metric)
+                if old is None or new is None:
+                    continue
+                slack = min_seconds if metric.endswith("_seconds") else 0
+                if new > old * (1 + threshold) and new - old > slack:
+                    regressions.append(
+                        {
+                            "scale": scale,
+                            "insight": name,
+                            "metric": metric,
+                            "baseline": old,
+                            "current": new,
+                        }
+                    )
+    return regressions
+
+
+class InsightLatencyBenchmark:
+    """
+    Runs every insight repeatedly against a dataset and records its latency, rows scanned and result size.
+
+    The first run of each insight is the cold run: with the MySQL backend it executes right after the result
+    cache is cleared, with the local backend after the engine's derived frames are dropped. Every following
+    (warm) run clears the result cache again, so each run measures query execution, not a cache hit.
+    """
+
+    def __init__(
+        self, backend="mysql", runs: int = 10, seed: int = DEFAULT_SEED, names=None
+    ):
+        """
+        Initialize the benchmark.
+
+        Args:
+            backend (str): "mysql" or "local", see BACKENDS.
+            runs (int): Number of warm runs per insight, after the cold run.
+            seed (int): Seed of the generated datasets.
+            names (list): The insight names (defaults to every insight the backend supports).
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend}")
+        self.backend = backend
+        self.runs = runs
+        self.seed = seed
+        self.names = list(
+            names or (INSIGHT_SPECS if backend == "mysql" else LOCAL_INSIGHTS)
+        )
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def _measure(self, run_once, reset):
+        seconds, rows_scanned, result = [], None, None
+        for run in range(self.runs + 1):
+            reset(cold=run == 0)
+            result, elapsed, scanned = run_once()
+            seconds.append(elapsed)
+            if rows_scanned is None:
+                rows_scanned = scanned
+        return dict(
+            summarize_timings(seconds),
+            rows_scanned=rows_scanned,
+            result_rows=len(result),
+            result_bytes=int(result.memory_usage(index=True, deep=True).sum()),
+        )
+
+    def run_mysql(self, connection):
+        """
+        Measures every insight through InsightsManager on a loaded dataset database.
+
+        Args:
+            connection (pymysql.connections.Connection): Connection to the dataset database.
+
+        Returns:
+            dict: Insight name -> measurements.
+        """
+        manager = InsightsManager(connection)
+        RollupManager(connection).refresh()
+        # Reading the counters may count a few handler reads itself; subtract that drift.
+        overhead = handler_reads(connection)
+        overhead = handler_reads(connection) - overhead
+
+        def reset(cold):
+            result_cache.clear()
+
+        measurements = {}
+        for name in self.names:
+
+            def run_once(name=name):
+                before = handler_reads(connection)
+                start = time.perf_counter()
+                result = manager.fetch_insights([name])[name]
+                elapsed = time.perf_counter() - start
+                return (
+                    result,
+                    elapsed,
+                    max(handler_reads(connection) - before - overhead, 0),
+                )
+
+            measurements[name] = self._measure(run_once, reset)
+            self.logger.info("%s: p50 %.4fs", name, measurements[name]["p50_seconds"])
+        return measurements
+
+    def run_local(self, frames):
+        """
+        Measures every insight on the in-process engine built from generated DataFrames.
+
+        Rows scanned are the rows of the snapshot tables an insight reads.
+
+        Args:
+            frames (dict): Table name -> DataFrame, see `datasets.generate_dataset`.
+
+        Returns:
+            dict: Insight name -> measurements.
+        """
+        engine = LocalInsightsEngine.from_frames(as_snapshot_frames(frames))
+
+        def reset(cold):
+            engine.snapshot.results = {}
+            if cold:
+                engine.snapshot.derived = {}
+
+        measurements = {}
+        for name in self.names:
+            tables = LOCAL_INSIGHTS[name]["frame"].split("_")
+            rows_scanned = sum(len(engine.snapshot.frames[table]) for table in tables)
+
+            def run_once(name=name, rows_scanned=rows_scanned):
+                start = time.perf_counter()
+                result = engine.fetch_insight(name)
+                return result, time.perf_counter() - start, rows_scanned
+
+            measurements[name] = self._measure(run_once, reset)
+            self.logger.info("%s: p50 %.4fs", name, measurements[name]["p50_seconds"])
+        return measurements
+
+    def run(self, scales=BENCHMARK_SCALES, connect=None):
+        """
+        Generate (or reuse) the dataset of every scale and measure the insights on it.
+
+        Args:
+            scales (list): Numbers of rows per table.
+            connect (callable): For the MySQL backend, takes a scale and returns a DatabaseConnector for the
+                dataset database, see `datasets.open_dataset_database`.
+
+        Returns:
+            dict: The "backend", "seed", "runs", "created_at" and, per scale (as a string), the dataset
+                "load_seconds" (0 when reused) and the per-insight measurements: "cold_seconds", "p50_seconds",
+                "p95_seconds", "mean_seconds", "rows_scanned", "result_rows" and "result_bytes".
+        """
+        results = {
+            "backend": self.backend,
+            "seed": self.seed,
+            "runs": self.runs,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "scales": {},
+        }
+        for scale in scales:
+            self.logger.info(
+                "Benchmarking %d rows per table on the %s backend", scale, self.backend
+            )
+            start = time.perf_counter()
+            if self.backend == "local":
+                frames = generate_dataset(scale, self.seed)
+                load_seconds = time.perf_counter() - start
+                insights = self.run_local(frames)
+            else:
+                connector = connect(scale)
+                connection = connector.get_connection()
+                if not dataset_loaded(connection, scale):
+                    load_dataset(connection, generate_dataset(scale, self.seed))
+                load_seconds = time.perf_counter() - start
+                insights = self.run_mysql(connection)
+                connection.close()
+            results["scales"][str(scale)] = {
+                "load_seconds": load_seconds,
+                "insights": insights,
+            }
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark insight latency on seeded datasets."
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="mysql")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(BENCHMARK_SCALES))
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=10,
+        help="Warm runs per insight, after the cold run.",
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--insights", nargs="+", help="Insight names (defaults to every insight)."
+    )
+    parser.add_argument("--host", default=os.environ.get("MYSQL_HOST", "localhost"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.environ.get("MYSQL_PORT", 3306))
+    )
+    parser.add_argument("--user", default=os.environ.get("MYSQL_USER", "root"))
+    parser.add_argument("--password", default=os.environ.get("MYSQL_PASSWORD", ""))
+    parser.add_argument("--database-prefix", default="zomato_benchmark")
+    parser.add_argument(
+        "--output",
+        help="Write the results to this JSON file (default: standard output).",
+    )
+    parser.add_argument(
+        "--baseline", help="Compare against the results in this JSON file."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLD,
+        help="Relative increase flagged as a regression.",
+    )
+    args = parser.parse_args(argv)
+
+    benchmark = InsightLatencyBenchmark(
+        args.backend, args.runs, args.seed, args.insights
+    )
+    results = benchmark.run(
+        args.scales,
+        lambda scale: open_dataset_database(
+            args.host,
+            args.port,
+            args.user,
+            args.password,
+            args.database_prefix,
+            scale,
+            args.seed,
+        ),
+    )
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare_results(results, json.load(file), args.threshold)
+        results["regressions"] = regressions
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    for regression in regressions:
+        benchmark.logger.warning(
+            "REGRESSION %s at %s rows: %s %.4g -> %.4g",
+            regression["insight"],
+            regression["scale"],
+            regression["metric"],
+            regression["baseline"],
+            regression["current"],
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,15 @@ import logging
 
 import pymysql
 
+from crud.row_cache import row_cache, row_count_cache
+from db.change_log import ChangeLog
+from db.columnar_fetch import fetch_dataframe
+from db.schema_manager import SchemaManager
+from db.write_versions import write_versions
+
+DEFAULT_BATCH_SIZE = 500
+FILTER_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "LIKE", "NOT LIKE", "IN", "BETWEEN", "IS NULL", "IS NOT NULL")
+
 
 class CRUDHandler:
     """
@@ -9,16 +18,27 @@ class CRUDHandler:
     on any given table in the MySQL database.
     """
 
-    def __init__(self, connection, table_name):
+    def __init__(self, connection, table_name, cache=None, manage_transactions=True, capture_changes=True):
         """
         Initializes the CRUDHandler with an active MySQL connection and the target table name.
 
         Args:
             connection (pymysql.connections.Connection): Active MySQL database connection.
             table_name (str): Name of the table on which to perform CRUD operations.
+            cache (RowCache): Row cache used by `read_record` (defaults to the process-wide cache).
+            manage_transactions (bool): Whether each write begins and commits its own transaction. Set to
+                False when the caller, such as a UnitOfWork, owns the enclosing transaction.
+            capture_changes (bool): Whether writes are recorded in the change log (when it is enabled).
         """
         self.connection = connection
         self.table_name = table_name
+        self.cache = cache if cache is not None else row_cache
+        self.manage_transactions = manage_transactions
+        self.change_log = ChangeLog(connection) if capture_changes else None
+        self._primary_key_column = None
+        self._autoinc_lock_mode = None
+        # Writes made in the caller's transaction, applied once it commits, see `apply_pending_writes`.
+        self.pending_writes = []
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
 
@@ -45,34 +65,136 @@ class CRUDHandler:
         values = list(data.values())
 
         try:
-            with self.connection.cursor() as cursor:
-                self.logger.debug("Executing SQL: %s with values %s", sql, values)
-                cursor.execute(sql, values)
-            self.connection.commit()
+            rowcount = self._execute_chunk(sql, values, lambda cursor: self._capture_inserts([data], cursor))
+            self._after_write([], row_delta=rowcount)
             self.logger.info("Record inserted into table '%s'", self.table_name)
-            return cursor.rowcount
+            return rowcount
         except pymysql.MySQLError as e:
             self.logger.error("Error inserting record into table '%s': %s", self.table_name, e)
             raise e
 
-    def read_records(self, limit: int = 10, offset: int = 0):
+    def _get_column_names(self):
         """
-        Retrieves records from the table with pagination support.
+        Retrieve the column names of the table from the schema metadata.
+
+        Returns:
+            list: The column names of the table.
+        """
+        return [col["Field"] for col in SchemaManager(self.connection).get_table_columns(self.table_name)]
+
+    def _validate_columns(self, columns, known_columns):
+        """
+        Ensure that every column name exists in the table.
+
+        Args:
+            columns (iterable): Column names to validate.
+            known_columns (list): The column names of the table.
+
+        Raises:
+            ValueError: If any of the columns does not exist in the table.
+        """
+        unknown = [col for col in columns if col not in known_columns]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for table '{self.table_name}': {', '.join(unknown)}")
+
+    def _build_where_clause(self, filters, known_columns):
+        """
+        Compiles filter predicates into a parameterized WHERE clause.
+
+        Args:
+            filters (list): List of (column, operator, value) tuples. Supported operators are those in
+                FILTER_OPERATORS; `IN` expects a list, `BETWEEN` a (low, high) pair and the NULL checks
+                ignore the value.
+            known_columns (list): The column names of the table.
+
+        Returns:
+            tuple: The WHERE clause (empty string when there are no filters) and its parameters.
+        """
+        if not filters:
+            return "", []
+        predicates = []
+        values = []
+        for column, operator, value in filters:
+            operator = operator.upper()
+            self._validate_columns([column], known_columns)
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if operator in ("IS NULL", "IS NOT NULL"):
+                predicates.append(f"{column} {operator}")
+            elif operator == "IN":
+                value = list(value)
+                if not value:
+                    raise ValueError(f"IN filter on '{column}' requires at least one value")
+                predicates.append(f"{column} IN ({', '.join(['%s'] * len(value))})")
+                values.extend(value)
+            elif operator == "BETWEEN":
+                low, high = value
+                predicates.append(f"{column} BETWEEN %s AND %s")
+                values.extend([low, high])
+            else:
+                predicates.append(f"{column} {operator} %s")
+                values.append(value)
+        return f" WHERE {' AND '.join(predicates)}", values
+
+    def _build_select_query(self, limit, offset, columns, filters, order_by):
+        """
+        Compiles a paginated SELECT with optional projection, filters and sort order.
+
+        Column names are validated against the table's schema metadata, and filter values are always
+        passed as query parameters.
+
+        Returns:
+            tuple: The SQL statement and its parameters.
+        """
+        known_columns = self._get_column_names() if (columns or filters or order_by) else []
+        if columns:
+            self._validate_columns(columns, known_columns)
+            projection = ", ".join(columns)
+        else:
+            projection = "*"
+        sql = f"SELECT {projection} FROM {self.table_name}"  # noqa: S608  # columns checked against the schema
+
+        where_clause, values = self._build_where_clause(filters, known_columns)
+        sql += where_clause
+
+        if order_by:
+            order_terms = []
+            for column, direction in order_by:
+                direction = direction.upper()
+                self._validate_columns([column], known_columns)
+                if direction not in ("ASC", "DESC"):
+                    raise ValueError(f"Unsupported sort direction: {direction}")
+                order_terms.append(f"{column} {direction}")
+            sql += f" ORDER BY {', '.join(order_terms)}"
+
+        sql += " LIMIT %s OFFSET %s;"
+        return sql, values + [limit, offset]
+
+    def read_records(self, limit: int = 10, offset: int = 0, columns: list = None, filters: list = None,
+                     order_by: list = None):
+        """
+        Retrieve records from the table with pagination, projection, filtering and sorting support.
+
+        Column names are validated against the table's schema metadata, and filter values are always
+        passed as query parameters.
 
         Args:
             limit (int): Number of records per page.
             offset (int): Number of records to skip.
+            columns (list): Column names to return (defaults to all columns).
+            filters (list): List of (column, operator, value) tuples combined with AND.
+            order_by (list): List of (column, direction) tuples, where direction is "ASC" or "DESC".
 
         Returns:
             tuple: A tuple containing:
                 - list of fetched records.
                 - list of column names.
         """
-        sql = f"SELECT * FROM {self.table_name} LIMIT %s OFFSET %s;"
+        sql, values = self._build_select_query(limit, offset, columns, filters, order_by)
         try:
             with self.connection.cursor() as cursor:
-                self.logger.debug("Executing SQL: %s with limit=%s and offset=%s", sql, limit, offset)
-                cursor.execute(sql, (limit, offset))
+                self.logger.debug("Executing SQL: %s with values %s", sql, values)
+                cursor.execute(sql, values)
                 records = cursor.fetchall()
                 columns = [desc[0] for desc in cursor.description]
             self.logger.info("Fetched %d records from table '%s'", len(records), self.table_name)
@@ -81,6 +203,83 @@ class CRUDHandler:
             self.logger.error("Error fetching records from table '%s': %s", self.table_name, e)
             raise e
 
+    def read_records_frame(self, limit: int = 10, offset: int = 0, columns: list = None, filters: list = None,
+                           order_by: list = None):
+        """
+        Retrieve records like `read_records`, decoded directly into a columnar DataFrame.
+
+        Args:
+            limit (int): Number of records per page.
+            offset (int): Number of records to skip.
+            columns (list): Column names to return (defaults to all columns).
+            filters (list): List of (column, operator, value) tuples combined with AND.
+            order_by (list): List of (column, direction) tuples, where direction is "ASC" or "DESC".
+
+        Returns:
+            pd.DataFrame: The fetched records.
+        """
+        sql, values = self._build_select_query(limit, offset, columns, filters, order_by)
+        self.logger.debug("Executing SQL: %s with values %s", sql, values)
+        try:
+            records = fetch_dataframe(self.connection, sql, values)
+        except pymysql.MySQLError as e:
+            self.logger.error("Error fetching records from table '%s': %s", self.table_name, e)
+            raise e
+        self.logger.info("Fetched %d records from table '%s'", len(records), self.table_name)
+        return records
+
+    def count_records(self, filters: list = None, exact: bool = False):
+        """
+        Count the records of the table, optionally restricted by filters.
+
+        An exact count is served from the process-wide count cache when available; otherwise it runs
+        `COUNT(*)` and caches the result. An estimate never scans the table: it comes from the table
+        statistics in `information_schema.TABLES`, or from the optimizer's row estimate via `EXPLAIN`
+        when filters are given.
+
+        Args:
+            filters (list): List of (column, operator, value) tuples combined with AND.
+            exact (bool): Whether to compute an exact count when none is cached.
+
+        Returns:
+            tuple: A tuple containing:
+                - int: the number of records.
+                - bool: whether the number is exact.
+        """
+        known_columns = self._get_column_names() if filters else []
+        where_clause, values = self._build_where_clause(filters, known_columns)
+        filter_key = (where_clause, tuple(map(str, values))) if filters else None
+
+        cached = row_count_cache.get(self.table_name, filter_key)
+        if cached is not None:
+            return cached, True
+
+        try:
+            if exact:
+                sql = f"SELECT COUNT(*) FROM {self.table_name}{where_clause};"  # noqa: S608  # columns checked against the schema
+                with self.connection.cursor() as cursor:
+                    self.logger.debug("Executing SQL: %s with values %s", sql, values)
+                    cursor.execute(sql, values)
+                    count = int(cursor.fetchone()[0])
+                row_count_cache.put(self.table_name, count, filter_key)
+                return count, True
+
+            if not filters:
+                return SchemaManager(self.connection).estimate_row_count(self.table_name), False
+
+            sql = f"EXPLAIN SELECT * FROM {self.table_name}{where_clause};"  # noqa: S608  # columns checked against the schema
+            with self.connection.cursor() as cursor:
+                self.logger.debug("Executing SQL: %s with values %s", sql, values)
+                cursor.execute(sql, values)
+                plan = cursor.fetchone()
+                plan_columns = [desc[0] for desc in cursor.description]
+            plan = dict(zip(plan_columns, plan, strict=False))
+            estimate = float(plan.get("rows") or 0) * float(plan.get("filtered") or 100) / 100
+            return int(round(estimate)), False
+        except pymysql.MySQLError as e:
+            self.logger.error("Error counting records in table '%s': %s", self.table_name, e)
+            raise e
+
     def update_record(self, record_id, data: dict, id_column: str = "id"):
         """
         Updates a record in the table.
@@ -98,12 +297,11 @@ class CRUDHandler:
         values = list(data.values()) + [record_id]
 
         try:
-            with self.connection.cursor() as cursor:
-                self.logger.debug("Executing SQL: %s with values %s", sql, values)
-                cursor.execute(sql, values)
-            self.connection.commit()
+            rowcount = self._execute_chunk(sql, values, lambda cursor: self._capture_updates(
+                [(record_id, data)], cursor, id_column))
+            self._after_write(None if id_column in data else [record_id])
             self.logger.info("Updated record '%s' in table '%s'", record_id, self.table_name)
-            return cursor.rowcount
+            return rowcount
         except pymysql.MySQLError as e:
             self.logger.error("Error updating record '%s' in table '%s': %s", record_id, self.table_name, e)
             raise e
@@ -121,12 +319,11 @@ class CRUDHandler:
         """
         sql = f"DELETE FROM {self.table_name} WHERE {id_column} = %s;"
         try:
-            with self.connection.cursor() as cursor:
-                self.logger.debug("Executing SQL: %s with record_id=%s", sql, record_id)
-                cursor.execute(sql, (record_id,))
-            self.connection.commit()
+            rowcount = self._execute_chunk(sql, [record_id], lambda cursor: self._capture(
+                "delete", [record_id] if cursor.rowcount else [], id_column))
+            self._after_write([record_id], row_delta=-rowcount)
             self.logger.info("Deleted record '%s' from table '%s'", record_id, self.table_name)
-            return cursor.rowcount
+            return rowcount
         except pymysql.MySQLError as e:
             self.logger.error("Error deleting record '%s' from table '%s': %s", record_id, self.table_name, e)
             raise e
@@ -142,6 +339,11 @@ class CRUDHandler:
         Returns:
             dict: A dictionary containing the record data if found, otherwise None.
         """
+        cached = self.cache.get(self.table_name, id_column, record_id)
+        if cached is not None:
+            self.logger.debug("Row cache hit for record '%s' in table '%s'", record_id, self.table_name)
+            return cached
+
         sql = f"SELECT * FROM {self.table_name} WHERE {id_column} = %s;"
         try:
             with self.connection.cursor() as cursor:
@@ -152,8 +354,372 @@ class CRUDHandler:
                 if record:
                     # Fetch column names
                     column_names = [desc[0] for desc in cursor.description]
-                    return dict(zip(column_names, record, strict=False))  # Convert tuple to dict
+                    row = dict(zip(column_names, record, strict=False))  # Convert tuple to dict
+                    self.cache.put(self.table_name, id_column, record_id, row)
+                    return row
                 return None  # No record found
         except pymysql.MySQLError as e:
             self.logger.error("Error reading record '%s' from table '%s': %s", record_id, self.table_name, e)
             raise e
+
+    def _after_write(self, record_ids=None, row_delta=0):
+        """
+        Propagates a committed write to the process-local state derived from this table.
+
+        When the handler does not manage transactions, the write is only remembered: the caller's transaction
+        may still roll back, so it applies the write with `apply_pending_writes` after committing.
+
+        Args:
+            record_ids (list): Identifiers of the changed rows, or None when any row may have changed.
+            row_delta (int): The change in the table's row count, or None when it is unknown.
+        """
+        if not self.manage_transactions:
+            self.pending_writes.append((record_ids, row_delta))
+            return
+        self._apply_write(record_ids, row_delta)
+
+    def apply_pending_writes(self):
+        """Propagates the writes made in the caller's transaction, once it committed."""
+        pending, self.pending_writes = self.pending_writes, []
+        for record_ids, row_delta in pending:
+            self._apply_write(record_ids, row_delta)
+
+    def discard_pending_writes(self):
+        """
+        Forgets the writes of a rolled back transaction or savepoint.
+
+        Rows read inside the transaction may have been cached, so the state derived from the table is dropped.
+        """
+        self.pending_writes = []
+        self.invalidate_caches()
+
+    def _apply_write(self, record_ids, row_delta):
+        if record_ids is None:
+            self.cache.invalidate_table(self.table_name)
+        else:
+            self.cache.invalidate(self.table_name, record_ids)
+        row_count_cache.apply_write(self.table_name, row_delta)
+        write_versions.bump(self.table_name)
+
+    def invalidate_caches(self):
+        """
+        Drop all process-local state derived from this table.
+
+        Call this after schema changes or writes made outside of CRUDHandler.
+        """
+        self.cache.invalidate_table(self.table_name)
+        row_count_cache.invalidate_table(self.table_name)
+        write_versions.bump(self.table_name)
+
+    def _capture(self, operation, record_keys, key_column=None, payloads=None):
+        """
+        Record changed rows in the change log, inside the transaction of the write.
+
+        Args:
+            operation (str): The change operation, see `ChangeLog.record`.
+            record_keys (list): Identifier of each changed row.
+            key_column (str): The column the identifiers refer to.
+            payloads (list): Optional payload per row.
+        """
+        if self.change_log is not None and record_keys:
+            self.change_log.record(self.table_name, operation, record_keys, key_column, payloads)
+
+    def _capture_inserts(self, rows, cursor, operation="insert"):
+        """
+        Record inserted rows in the change log.
+
+        The keys are the primary key values in the rows when present and otherwise the auto-increment values
+        InnoDB assigned.
+
+        The ids of a multi-row INSERT are only known to be `lastrowid` onwards when `innodb_autoinc_lock_mode`
+        is below 2; with interleaved locking, concurrent inserts may take ids in between, so the rows are
+        then recorded without keys.
+
+        Args:
+            rows (list): The inserted rows.
+            cursor (pymysql.cursors.Cursor): The cursor that executed the INSERT.
+            operation (str): "insert" or "upsert".
+        """
+        if self.change_log is None or not self.change_log.is_enabled():
+            return
+        if self._primary_key_column is None:
+            primary_keys = SchemaManager(self.connection).get_primary_keys(self.table_name)
+            self._primary_key_column = primary_keys[0] if len(primary_keys) == 1 else ""
+        key_column = self._primary_key_column or None
+        # Read before `_consecutive_ids` runs another statement on the cursor.
+        first_id = cursor.lastrowid
+        if key_column and all(key_column in row for row in rows):
+            record_keys = [row[key_column] for row in rows]
+        elif first_id and operation == "insert" and (len(rows) == 1 or self._consecutive_ids(cursor)):
+            record_keys = [first_id + offset for offset in range(len(rows))]
+        else:
+            record_keys = [None] * len(rows)
+        self._capture(operation, record_keys, key_column)
+
+    def _consecutive_ids(self, cursor):
+        """
+        Tell whether a multi-row INSERT gets consecutive auto-increment values, read once per handler.
+
+        Args:
+            cursor (pymysql.cursors.Cursor): The cursor that executed the INSERT.
+
+        Returns:
+            bool: True when `innodb_autoinc_lock_mode` is 0 (traditional) or 1 (consecutive).
+        """
+        if self._autoinc_lock_mode is None:
+            cursor.execute("SELECT @@innodb_autoinc_lock_mode;")
+            row = cursor.fetchone()
+            self._autoinc_lock_mode = int(row[0]) if row else 2
+        return self._autoinc_lock_mode < 2
+
+    def _capture_updates(self, updates, cursor, id_column):
+        """
+        Record updated rows in the change log, skipping identifiers that matched no row.
+
+        `cursor.rowcount` counts the rows an UPDATE changed, not the rows it matched, so when it falls short of
+        the number of updates, the identifiers that match a row are read back inside the same transaction.
+
+        Args:
+            updates (list): (record identifier, dictionary of new values) pairs.
+            cursor (pymysql.cursors.Cursor): The cursor that executed the UPDATE.
+            id_column (str): The column the identifiers refer to.
+        """
+        if self.change_log is None or not self.change_log.is_enabled():
+            return
+        if cursor.rowcount < len(updates):
+            # Rows whose identifier was updated are found under their new identifier.
+            keys = [data.get(id_column, record_id) for record_id, data in updates]
+            sql = (f"SELECT {id_column} FROM {self.table_name} "  # noqa: S608  # columns checked against the schema
+                   f"WHERE {id_column} IN ({', '.join(['%s'] * len(keys))});")
+            self.logger.debug("Executing SQL: %s with %d parameters", sql, len(keys))
+            cursor.execute(sql, keys)
+            found = {str(row[0]) for row in cursor.fetchall()}
+            updates = [update for update, key in zip(updates, keys, strict=True) if str(key) in found]
+        self._capture("update", [record_id for record_id, _ in updates], id_column, [data for _, data in updates])
+
+    @staticmethod
+    def _chunks(items, batch_size):
+        """
+        Split a sequence into consecutive chunks of at most `batch_size` items.
+
+        Args:
+            items (list): The items to split.
+            batch_size (int): Maximum number of items per chunk.
+
+        Yields:
+            list: The next chunk of items.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        for start in range(0, len(items), batch_size):
+            yield items[start:start + batch_size]
+
+    def _execute_chunk(self, sql, values, capture=None):
+        """
+        Execute a single write statement inside its own transaction.
+
+        The connection is opened with autocommit enabled, so the transaction is started explicitly and
+        either committed as a whole or rolled back on failure. When the handler does not manage
+        transactions, the statement simply joins the caller's transaction.
+
+        Args:
+            sql (str): The statement to execute.
+            values (list): Parameters for the statement.
+            capture (callable): Called with the cursor after the statement, before committing, to record
+                the change in the same transaction.
+
+        Returns:
+            int: The number of affected rows.
+        """
+        if not self.manage_transactions:
+            with self.connection.cursor() as cursor:
+                self.logger.debug("Executing SQL: %s with %d parameters", sql, len(values))
+                cursor.execute(sql, values)
+                rowcount = cursor.rowcount
+                if capture:
+                    capture(cursor)
+                return rowcount
+
+        self.connection.begin()
+        try:
+            with self.connection.cursor() as cursor:
+                self.logger.debug("Executing SQL: %s with %d parameters", sql, len(values))
+                cursor.execute(sql, values)
+                rowcount = cursor.rowcount
+                if capture:
+                    capture(cursor)
+            self.connection.commit()
+            return rowcount
+        except pymysql.MySQLError:
+            self.connection.rollback()
+            raise
+
+    @staticmethod
+    def _normalize_rows(rows):
+        """
+        Validate that all rows share the same columns and return the column list.
+
+        Args:
+            rows (list): List of dictionaries mapping column names to values.
+
+        Returns:
+            list: The column names, in the order of the first row.
+        """
+        columns = list(rows[0].keys())
+        for row in rows:
+            if set(row.keys()) != set(columns):
+                raise ValueError("All rows in a bulk operation must have the same columns")
+        return columns
+
+    def bulk_create_records(self, rows: list, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Insert many records using multi-row INSERT statements.
+
+        Args:
+            rows (list): List of dictionaries where keys are column names; all rows must share the same keys.
+            batch_size (int): Maximum number of rows per INSERT statement and transaction.
+
+        Returns:
+            list: The number of affected rows for each chunk.
+        """
+        if not rows:
+            return []
+        columns = self._normalize_rows(rows)
+        self._validate_columns(columns, self._get_column_names())
+        row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+        counts = []
+
+        try:
+            for chunk in self._chunks(rows, batch_size):
+                sql = (f"INSERT INTO {self.table_name} ({', '.join(columns)}) "  # noqa: S608  # columns checked against the schema
+                       f"VALUES {', '.join([row_placeholder] * len(chunk))};")
+                values = [row[col] for row in chunk for col in columns]
+                counts.append(self._execute_chunk(
+                    sql, values, lambda cursor, rows=chunk: self._capture_inserts(rows, cursor)))
+                self._after_write([], row_delta=counts[-1])
+            self.logger.info("Bulk inserted %d records into table '%s' in %d chunk(s)",
+                             sum(counts), self.table_name, len(counts))
+            return counts
+        except pymysql.MySQLError as e:
+            self.logger.error("Error bulk inserting records into table '%s' after %d chunk(s): %s",
+                              self.table_name, len(counts), e)
+            raise e
+
+    def bulk_upsert_records(self, rows: list, update_columns: list = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Insert many records, updating existing ones on primary or unique key conflicts.
+
+        Uses `INSERT ... AS new ON DUPLICATE KEY UPDATE` with a row alias (MySQL 8.0.19+). Note that MySQL
+        reports 1 affected row per inserted row and 2 per updated row.
+
+        Args:
+            rows (list): List of dictionaries where keys are column names; all rows must share the same keys.
+            update_columns (list): Columns to overwrite on conflict (defaults to every column in the rows).
+            batch_size (int): Maximum number of rows per statement and transaction.
+
+        Returns:
+            list: The number of affected rows for each chunk.
+        """
+        if not rows:
+            return []
+        columns = self._normalize_rows(rows)
+        update_columns = update_columns or columns
+        self._validate_columns([*columns, *update_columns], self._get_column_names())
+        row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+        update_clause = ", ".join([f"{col} = new.{col}" for col in update_columns])
+        counts = []
+
+        try:
+            for chunk in self._chunks(rows, batch_size):
+                sql = (f"INSERT INTO {self.table_name} ({', '.join(columns)}) "  # noqa: S608  # columns checked against the schema
+                       f"VALUES {', '.join([row_placeholder] * len(chunk))} AS new "
+                       f"ON DUPLICATE KEY UPDATE {update_clause};")
+                values = [row[col] for row in chunk for col in columns]
+                counts.append(self._execute_chunk(
+                    sql, values, lambda cursor, rows=chunk: self._capture_inserts(rows, cursor, operation="upsert")))
+                self._after_write(row_delta=None)
+            self.logger.info("Bulk upserted records into table '%s' in %d chunk(s)", self.table_name, len(counts))
+            return counts
+        except pymysql.MySQLError as e:
+            self.logger.error("Error bulk upserting records into table '%s' after %d chunk(s): %s",
+                              self.table_name, len(counts), e)
+            raise e
+
+    def bulk_update_records(self, updates: dict, id_column: str = "id", batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Update many records, each with its own values, using one `UPDATE ... CASE` statement per chunk.
+
+        Args:
+            updates (dict): Mapping of record identifier to a dictionary of column names and new values.
+                Records may update different sets of columns.
+            id_column (str): The name of the column used as the identifier (default is "id").
+            batch_size (int): Maximum number of records per statement and transaction.
+
+        Returns:
+            list: The number of affected rows for each chunk.
+        """
+        if not updates:
+            return []
+        items = list(updates.items())
+        self._validate_columns({id_column, *(col for data in updates.values() for col in data)},
+                               self._get_column_names())
+        counts = []
+
+        try:
+            for chunk in self._chunks(items, batch_size):
+                set_clauses = []
+                values = []
+                columns = sorted({col for _, data in chunk for col in data.keys()})
+                for col in columns:
+                    cases = []
+                    for record_id, data in chunk:
+                        if col in data:
+                            cases.append("WHEN %s THEN %s")
+                            values.extend([record_id, data[col]])
+                    set_clauses.append(f"{col} = CASE {id_column} {' '.join(cases)} ELSE {col} END")
+                id_placeholders = ", ".join(["%s"] * len(chunk))
+                values.extend([record_id for record_id, _ in chunk])
+                sql = (f"UPDATE {self.table_name} SET {', '.join(set_clauses)} "  # noqa: S608  # columns checked against the schema
+                       f"WHERE {id_column} IN ({id_placeholders});")
+                counts.append(self._execute_chunk(sql, values, lambda cursor, items=chunk: self._capture_updates(
+                    items, cursor, id_column)))
+                self._after_write(None if id_column in columns else [record_id for record_id, _ in chunk])
+            self.logger.info("Bulk updated %d records in table '%s' in %d chunk(s)",
+                             sum(counts), self.table_name, len(counts))
+            return counts
+        except pymysql.MySQLError as e:
+            self.logger.error("Error bulk updating records in table '%s' after %d chunk(s): %s",
+                              self.table_name, len(counts), e)
+            raise e
+
+    def bulk_delete_records(self, record_ids: list, id_column: str = "id", batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Delete many records using `DELETE ... WHERE id IN (...)` in bounded chunks.
+
+        Args:
+            record_ids (list): Identifiers of the records to delete.
+            id_column (str): The name of the column used as the identifier (default is "id").
+            batch_size (int): Maximum number of identifiers per statement and transaction.
+
+        Returns:
+            list: The number of affected rows for each chunk.
+        """
+        record_ids = list(record_ids)
+        if not record_ids:
+            return []
+        self._validate_columns([id_column], self._get_column_names())
+        counts = []
+
+        try:
+            for chunk in self._chunks(record_ids, batch_size):
+                sql = f"DELETE FROM {self.table_name} WHERE {id_column} IN ({', '.join(['%s'] * len(chunk))});"  # noqa: S608  # columns checked against the schema
+                counts.append(self._execute_chunk(sql, chunk, lambda cursor, record_keys=chunk: self._capture(
+                    "delete", record_keys, id_column)))
+                self._after_write(chunk, row_delta=-counts[-1])
+            self.logger.info("Bulk deleted %d records from table '%s' in %d chunk(s)",
+                             sum(counts), self.table_name, len(counts))
+            return counts
+        except pymysql.MySQLError as e:
+            self.logger.error("Error bulk deleting records from table '%s' after %d chunk(s): %s",
+                              self.table_name, len(counts), e)
+            raise e
@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class RowCache:
+    """
+    A thread-safe LRU cache of table rows keyed by (table, id column, identifier), with a size and TTL limit.
+
+    The cache is shared by every CRUDHandler in the process so that repeated reads of the same record across
+    Streamlit reruns are served from memory. Writes made through CRUDHandler invalidate the affected entries.
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=300):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size (int): Maximum number of rows kept before the least recently used row is evicted.
+            ttl_seconds (float): Number of seconds after which a cached row is considered stale.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(table_name, id_column, record_id):
+        return table_name, id_column, str(record_id)
+
+    def get(self, table_name, id_column, record_id):
+        """
+        Look up a cached row.
+
+        Args:
+            table_name (str): The table the row belongs to.
+            id_column (str): The column used as the identifier.
+            record_id: The identifier value.
+
+        Returns:
+            dict: A copy of the cached row, or None on a miss or an expired entry.
+        """
+        key = self._key(table_name, id_column, record_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, table_name, id_column, record_id, row):
+        """
+        Store a row, evicting the least recently used rows beyond the size limit.
+
+        Args:
+            table_name (str): The table the row belongs to.
+            id_column (str): The column used as the identifier.
+            record_id: The identifier value.
+            row (dict): The row to cache.
+        """
+        if self.max_size <= 0:
+            return
+        key = self._key(table_name, id_column, record_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), dict(row))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table_name, record_ids):
+        """
+        Remove the cached rows of a table that match any of the given identifiers.
+
+        Rows are removed whatever id column they were cached under.
+
+        Args:
+            table_name (str): The table whose rows changed.
+            record_ids (iterable): Identifiers of the changed rows.
+        """
+        record_ids = {str(record_id) for record_id in record_ids}
+        with self._lock:
+            for key in [
+                k for k in self._entries if k[0] == table_name and k[2] in record_ids
+            ]:
+                del self._entries[key]
+
+    def invalidate_table(self, table_name):
+        """
+        Remove every cached row of a table.
+
+        Args:
+            table_name (str): The table whose rows changed.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == table_name]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove every cached row and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Report the cache statistics.
+
+        Returns:
+            dict: The number of hits, misses, evictions and cached rows, and the hit ratio.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class RowCountCache:
+    """
+    A thread-safe cache of exact row counts keyed by table and filter, with a TTL limit.
+
+    Unfiltered counts are kept up to date by the row deltas of in-process writes, while filtered counts of a
+    table are dropped whenever it is written to.
+    """
+
+    def __init__(self, ttl_seconds=600):
+        """
+        Initialize an empty cache.
+
+        Args:
+            ttl_seconds (float): Number of seconds after which a cached count is considered stale.
+        """
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, table_name, filter_key=None):
+        """
+        Look up a cached count.
+
+        Args:
+            table_name (str): The counted table.
+            filter_key (tuple): Hashable description of the filters, or None for the whole table.
+
+        Returns:
+            int: The cached count, or None on a miss or an expired entry.
+        """
+        key = (table_name, filter_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self._entries.pop(key, None)
+                return None
+            return entry[1]
+
+    def put(self, table_name, count, filter_key=None):
+        """
+        Store an exact count.
+
+        Args:
+            table_name (str): The counted table.
+            count (int): The exact number of rows.
+            filter_key (tuple): Hashable description of the filters, or None for the whole table.
+        """
+        with self._lock:
+            self._entries[(table_name, filter_key)] = (time.monotonic(), count)
+
+    def apply_write(self, table_name, row_delta=0):
+        """
+        Update the counts of a table after a write.
+
+        Args:
+            table_name (str): The table that was written to.
+            row_delta (int): The change in the table's row count, or None when it is unknown.
+        """
+        with self._lock:
+            for key in [
+                k for k in self._entries if k[0] == table_name and k[1] is not None
+            ]:
+                del self._entries[key]
+            total = self._entries.get((table_name, None))
+            if total is None:
+                return
+            if row_delta is None:
+                del self._entries[(table_name, None)]
+            elif row_delta:
+                self._entries[(table_name, None)] = (
+                    total[0],
+                    max(total[1] + row_delta, 0),
+                )
+
+    def invalidate_table(self, table_name):
+        """
+        Remove every cached count of a table.
+
+        Args:
+            table_name (str): The table whose rows changed.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == table_name]:
+                del self._entries[key]
+
+
+# Process-wide caches shared by all CRUDHandler instances and Streamlit sessions.
+row_cache = RowCache()
+row_count_cache = RowCountCache()
@@ -0,0 +1,349 @@
+import bz2
+import csv
+import gzip
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import pymysql
+from pymysql.constants import FIELD_TYPE
+from pymysql.cursors import SSCursor
+
+EXPORT_FORMATS = ("csv", "parquet")
+CSV_COMPRESSIONS = (None, "gzip", "bz2")
+PARQUET_COMPRESSIONS = (None, "snappy", "gzip", "zstd")
+DEFAULT_EXPORT_DIR = os.path.join(tempfile.gettempdir(), "zomato_exports")
+# Seconds a finished export's file is kept for download when nobody discards it.
+EXPORT_RETENTION_SECONDS = 3600
+
+
+def _arrow_type(type_code):
+    """Map a MySQL field type code from `cursor.description` to a pyarrow type."""
+    import pyarrow as pa
+
+    if type_code in (
+        FIELD_TYPE.TINY,
+        FIELD_TYPE.SHORT,
+        FIELD_TYPE.LONG,
+        FIELD_TYPE.INT24,
+        FIELD_TYPE.LONGLONG,
+        FIELD_TYPE.YEAR,
+    ):
+        return pa.int64()
+    if type_code in (
+        FIELD_TYPE.FLOAT,
+        FIELD_TYPE.DOUBLE,
+        FIELD_TYPE.DECIMAL,
+        FIELD_TYPE.NEWDECIMAL,
+    ):
+        return pa.float64()
+    if type_code in (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+        return pa.timestamp("us")
+    if type_code == FIELD_TYPE.DATE:
+        return pa.date32()
+    return pa.string()
+
+
+class TableExporter:
+    """
+    Streams the rows of a table into a CSV or Parquet file in chunks, using constant memory.
+
+    Rows are read through an unbuffered server-side cursor, so the exporter should be given a connection of
+    its own (see `DatabaseConnector.new_connection`) that is not used concurrently by anything else.
+    """
+
+    def __init__(self, connection, table_name, chunk_size: int = 10000):
+        """
+        Initialize the exporter.
+
+        Args:
+            connection (pymysql.connections.Connection): A MySQL connection dedicated to the export.
+            table_name (str): Name of the table to export.
+            chunk_size (int): Number of rows fetched and written at a time.
+        """
+        self.connection = connection
+        self.table_name = table_name
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def _iter_chunks(self, cursor):
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                return
+            yield rows
+
+    def _write_csv(self, cursor, path, compression, on_chunk):
+        if compression == "gzip":
+            handle = gzip.open(path, "wt", newline="", encoding="utf-8")
+        elif compression == "bz2":
+            handle = bz2.open(path, "wt", newline="", encoding="utf-8")
+        else:
+            handle = open(path, "w", newline="", encoding="utf-8")
+        with handle:
+            writer = csv.writer(handle)
+            writer.writerow([desc[0] for desc in cursor.description])
+            for rows in self._iter_chunks(cursor):
+                writer.writerows(rows)
+                on_chunk(len(rows))
+
+    def _write_parquet(self, cursor, path, compression, on_chunk):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export requires the 'pyarrow' package") from e
+
+        schema = pa.schema(
+            [(desc[0], _arrow_type(desc[1])) for desc in cursor.description]
+        )
+        with pq.ParquetWriter(
+            path, schema, compression=compression or "NONE"
+        ) as writer:
+            for rows in self._iter_chunks(cursor):
+                columns = list(zip(*rows, strict=True))
+                arrays = [
+                    pa.array(column, type=field.type)
+                    for column, field in zip(columns, schema, strict=True)
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                on_chunk(len(rows))
+
+    def export(
+        self,
+        path,
+        file_format: str = "csv",
+        compression: str = None,
+        progress_callback=None,
+    ):
+        """
+        Export the whole table to a file.
+
+        Args:
+            path (str): Destination file path.
+            file_format (str): Either "csv" or "parquet".
+            compression (str): For CSV, None, "gzip" or "bz2"; for Parquet, None, "snappy", "gzip" or "zstd".
+            progress_callback (callable): Called after every chunk with the total rows written so far and
+                the current rows-per-second rate.
+
+        Returns:
+            dict: The output path, the number of rows written, the elapsed seconds and the rows per second.
+        """
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {file_format}")
+        allowed = CSV_COMPRESSIONS if file_format == "csv" else PARQUET_COMPRESSIONS
+        if compression not in allowed:
+            raise ValueError(
+                f"Unsupported compression for {file_format}: {compression}"
+            )
+
+        start = time.monotonic()
+        written = 0
+
+        def on_chunk(row_count):
+            nonlocal written
+            written += row_count
+            if progress_callback:
+                elapsed = time.monotonic() - start
+                progress_callback(written, written / elapsed if elapsed else 0.0)
+
+        sql = f"SELECT * FROM {self.table_name};"  # noqa: S608  # table picked from the schema
+        try:
+            with self.connection.cursor(SSCursor) as cursor:
+                self.logger.debug("Executing SQL: %s", sql)
+                cursor.execute(sql)
+                if file_format == "csv":
+                    self._write_csv(cursor, path, compression, on_chunk)
+                else:
+                    self._write_parquet(cursor, path, compression, on_chunk)
+        except pymysql.MySQLError as e:
+            self.logger.error("Error exporting table '%s': %s", self.table_name, e)
+            raise e
+
+        elapsed = time.monotonic() - start
+        self.logger.info(
+            "Exported %d rows from table '%s' to %s in %.2fs",
+            written,
+            self.table_name,
+            path,
+            elapsed,
+        )
+        return {
+            "path": path,
+            "rows": written,
+            "seconds": elapsed,
+            "rows_per_second": written / elapsed if elapsed else 0.0,
+        }
+
+
+class ExportJobManager:
+    """
+    Runs table exports as background jobs and tracks their progress.
+
+    Jobs are kept in memory, so they survive Streamlit reruns and can be polled from any session that knows
+    the job id. A job and its file last until the job is discarded (e.g. once its file was downloaded) or
+    until `retention_seconds` after it finished; the files of failed jobs are deleted right away.
+    """
+
+    def __init__(
+        self,
+        export_dir: str = DEFAULT_EXPORT_DIR,
+        retention_seconds: float = EXPORT_RETENTION_SECONDS,
+    ):
+        """
+        Initialize the job manager.
+
+        Args:
+            export_dir (str): Directory in which exported files are written.
+            retention_seconds (float): Seconds after which finished jobs are discarded along with their file.
+        """
+        self.export_dir = export_dir
+        self.retention_seconds = retention_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        connection_factory,
+        table_name,
+        file_format: str = "csv",
+        compression: str = None,
+    ):
+        """
+        Start exporting a table on a background thread.
+
+        Args:
+            connection_factory (callable): Returns a new connection dedicated to the export.
+            table_name (str): Name of the table to export.
+            file_format (str): Either "csv" or "parquet".
+            compression (str): Compression codec, see `TableExporter.export`.
+
+        Returns:
+            str: The id of the new job.
+        """
+        self._discard_expired()
+        os.makedirs(self.export_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        extension = (
+            {"gzip": ".gz", "bz2": ".bz2"}.get(compression, "")
+            if file_format == "csv"
+            else ""
+        )
+        path = os.path.join(
+            self.export_dir, f"{table_name}_{job_id[:8]}.{file_format}{extension}"
+        )
+        with self._lock:
+            self._jobs[job_id] = {
+                "table_name": table_name,
+                "path": path,
+                "state": "running",
+                "rows": 0,
+                "rows_per_second": 0.0,
+                "error": None,
+                "finished_at": None,
+                "discarded": False,
+            }
+
+        def progress(rows, rows_per_second):
+            self._update(job_id, rows=rows, rows_per_second=rows_per_second)
+
+        def run():
+            connection = None
+            try:
+                connection = connection_factory()
+                result = TableExporter(connection, table_name).export(
+                    path, file_format, compression, progress
+                )
+                self._update(
+                    job_id,
+                    state="done",
+                    rows=result["rows"],
+                    rows_per_second=result["rows_per_second"],
+                    finished_at=time.monotonic(),
+                )
+            except Exception as e:
+                self._update(
+                    job_id, state="failed", error=str(e), finished_at=time.monotonic()
+                )
+                self._remove_file(path)
+            finally:
+                if connection is not None:
+                    connection.close()
+            job = self.status(job_id)
+            if job is not None and job["discarded"]:
+                self.discard(job_id)
+
+        threading.Thread(target=run, name=f"export-{job_id[:8]}", daemon=True).start()
+        return job_id
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def discard(self, job_id):
+        """
+        Forgets a job and deletes its file. A running job is discarded as soon as it finishes.
+
+        Args:
+            job_id (str): The job id returned by `start`.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if job["state"] == "running":
+                job["discarded"] = True
+                return
+            del self._jobs[job_id]
+        self._remove_file(job["path"])
+
+    def _discard_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job["finished_at"] is not None
+                and now - job["finished_at"] > self.retention_seconds
+            ]
+        for job_id in expired:
+            self.discard(job_id)
+
+    def status(self, job_id):
+        """
+        Return a snapshot of a job's progress.
+
+        Args:
+            job_id (str): The job id returned by `start`.
+
+        Returns:
+            dict: The job's table, output path, state ("running", "done" or "failed"), rows written,
+                rows per second and error message, or None for an unknown (or discarded) job.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+
+# Process-wide job manager shared by all Streamlit sessions.
+export_jobs = ExportJobManager()
@@ -0,0 +1,369 @@
+import logging
+import os
+import re
+import tempfile
+import time
+
+import pandas as pd
+import pymysql
+
+from crud.crud_handler import CRUDHandler
+from db.change_log import ChangeLog
+from db.schema_manager import SchemaManager
+
+IMPORT_FORMATS = ("csv", "parquet")
+IMPORT_METHODS = ("insert", "load_data")
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+FALSE_VALUES = {"0", "false", "f", "no", "n"}
+INSERT_BATCH_SIZE = 1000
+
+
+class TableImporter:
+    """
+    Loads a CSV or Parquet file into a table in chunks.
+
+    File columns are matched to table columns by name (case-insensitively). Every chunk is validated and
+    coerced column by column against the table's schema; rows that fail are written to an error file with
+    the reason, while the remaining rows are loaded with batched multi-row inserts or `LOAD DATA LOCAL INFILE`.
+    """
+
+    def __init__(self, connection, table_name, chunk_size: int = 10000):
+        """
+        Initialize the importer.
+
+        Args:
+            connection (pymysql.connections.Connection): Active MySQL database connection. The "load_data"
+                method requires a connection opened with `local_infile=True`.
+            table_name (str): Name of the table to load into.
+            chunk_size (int): Number of file rows processed at a time.
+        """
+        self.connection = connection
+        self.table_name = table_name
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def _iter_chunks(self, source, file_format):
+        if file_format == "csv":
+            yield from pd.read_csv(
+                source,
+                chunksize=self.chunk_size,
+                dtype=str,
+                keep_default_na=False,
+                na_values=[""],
+            )
+        else:
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise RuntimeError(
+                    "Parquet import requires the 'pyarrow' package"
+                ) from e
+            for batch in pq.ParquetFile(source).iter_batches(
+                batch_size=self.chunk_size
+            ):
+                yield batch.to_pandas()
+
+    def map_columns(self, file_columns):
+        """
+        Match file columns to table columns.
+
+        Args:
+            file_columns (list): Column names found in the file.
+
+        Returns:
+            tuple: A tuple containing:
+                - dict: file column name -> table column description (as returned by `get_table_columns`).
+                - list: file columns that do not exist in the table and will be ignored.
+
+        Raises:
+            ValueError: If a required table column (NOT NULL, no default, not auto-increment) is missing.
+        """
+        table_columns = {
+            col["Field"].lower(): col
+            for col in SchemaManager(self.connection).get_table_columns(self.table_name)
+        }
+        mapping = {}
+        ignored = []
+        for file_column in file_columns:
+            col = table_columns.get(str(file_column).strip().lower())
+            if col is None:
+                ignored.append(file_column)
+            else:
+                mapping[file_column] = col
+
+        mapped = {col["Field"] for col in mapping.values()}
+        missing = [
+            col["Field"]
+            for col in table_columns.values()
+            if col["Field"] not in mapped
+            and col["Null"] == "NO"
+            and col["Default"] is None
+            and "auto_increment" not in (col["Extra"] or "").lower()
+        ]
+        if missing:
+            raise ValueError(
+                f"Missing required column(s) for table '{self.table_name}': {', '.join(missing)}"
+            )
+        return mapping, ignored
+
+    @staticmethod
+    def coerce_column(series, column_type):
+        """
+        Convert a column of raw file values to the given MySQL column type.
+
+        Args:
+            series (pd.Series): The raw values.
+            column_type (str): The MySQL type as reported by DESCRIBE, e.g. "int", "varchar(255)".
+
+        Returns:
+            tuple: A tuple containing:
+                - pd.Series: the converted values, with missing values as None.
+                - pd.Series: a boolean mask of values that could not be converted.
+        """
+        column_type = column_type.lower()
+        present = series.notna()
+        as_text = series.astype(object).where(present, None)
+
+        if column_type.startswith(("tinyint(1)", "bool")):
+            lowered = as_text.map(
+                lambda value: str(value).strip().lower(), na_action="ignore"
+            )
+            converted = lowered.map(
+                lambda value: (
+                    1 if value in TRUE_VALUES else 0 if value in FALSE_VALUES else None
+                ),
+                na_action="ignore",
+            ).astype("Int64")
+        elif re.match(
+            r"^(tinyint|smallint|mediumint|int|integer|bigint)\b", column_type
+        ):
+            numeric = pd.to_numeric(series, errors="coerce")
+            integral = numeric.notna() & (numeric % 1 == 0)
+            converted = numeric.where(integral).astype("Int64")
+        elif re.match(r"^(float|double|decimal|numeric|real)\b", column_type):
+            converted = pd.to_numeric(series, errors="coerce")
+        elif column_type.startswith(("datetime", "timestamp", "date")):
+            converted = pd.to_datetime(series, errors="coerce", format="mixed")
+            if column_type.startswith("date") and not column_type.startswith(
+                "datetime"
+            ):
+                converted = converted.dt.date
+        else:
+            converted = as_text.map(str, na_action="ignore")
+            length = re.match(r"^(?:var)?char\((\d+)\)", column_type)
+            if length:
+                too_long = converted.map(len, na_action="ignore") > int(length.group(1))
+                converted = converted.where(~too_long, None)
+
+        invalid = present & converted.isna()
+        converted = converted.astype(object).where(converted.notna(), None)
+        return converted, invalid
+
+    def _validate_chunk(self, chunk, mapping):
+        valid_columns = {}
+        errors = pd.Series("", index=chunk.index, dtype=object)
+        for file_column, col in mapping.items():
+            converted, invalid = self.coerce_column(chunk[file_column], col["Type"])
+            errors = errors.where(
+                ~invalid, errors + f"invalid {col['Type']} for {col['Field']}; "
+            )
+            if (
+                col["Null"] == "NO"
+                and "auto_increment" not in (col["Extra"] or "").lower()
+            ):
+                missing = converted.isna() & ~invalid
+                errors = errors.where(
+                    ~missing, errors + f"{col['Field']} is required; "
+                )
+            valid_columns[col["Field"]] = converted
+        rejected = errors != ""
+        return pd.DataFrame(valid_columns)[~rejected], chunk[rejected].assign(
+            _error=errors[rejected]
+        )
+
+    def _load_with_insert(self, frame):
+        columns = list(frame.columns)
+        values = zip(*[frame[col].tolist() for col in columns], strict=True)
+        rows = [dict(zip(columns, row, strict=True)) for row in values]
+        return sum(
+            CRUDHandler(self.connection, self.table_name).bulk_create_records(
+                rows, batch_size=len(rows)
+            )
+        )
+
+    @staticmethod
+    def _load_data_field(value):
+        # With `OPTIONALLY ENCLOSED BY '"'`, an unquoted NULL is read as NULL, while quoted values (including the
+        # text "NULL") are taken literally; `ESCAPED BY ''` keeps backslashes as they are.
+        if value is None:
+            return "NULL"
+        return '"' + str(value).replace('"', '""') + '"'
+
+    def _load_with_load_data(self, frame):
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        try:
+            with os.fdopen(handle, "w", newline="", encoding="utf-8") as temp_file:
+                for row in zip(
+                    *[frame[col].tolist() for col in frame.columns], strict=True
+                ):
+                    temp_file.write(
+                        ",".join(self._load_data_field(value) for value in row) + "\n"
+                    )
+            sql = (
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.table_name} "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' LINES TERMINATED BY '\\n' "
+                f"({', '.join(frame.columns)});"
+            )
+            self.connection.begin()
+            try:
+                with self.connection.cursor() as cursor:
+                    self.logger.debug("Executing SQL: %s", sql)
+                    cursor.execute(sql, (path,))
+                    loaded = cursor.rowcount
+                    ChangeLog(self.connection).record(
+                        self.table_name, "load", [None], payloads=[{"rows": loaded}]
+                    )
+                self.connection.commit()
+            except Exception:
+                # The connection is shared by the app, so the transaction must not stay open.
+                self.connection.rollback()
+                raise
+            CRUDHandler(self.connection, self.table_name).invalidate_caches()
+            return loaded
+        finally:
+            os.remove(path)
+
+    def _load_rows(self, frame, load):
+        """
+        Load validated rows, isolating the ones the database rejects.
+
+        `load` runs in a single transaction, so a batch failing with an integrity error (e.g. a duplicate key or
+        a missing foreign key) leaves nothing behind and is retried in halves, down to single rows.
+
+        Args:
+            frame (pd.DataFrame): The validated rows, indexed like the file chunk they come from.
+            load (callable): Loads a DataFrame and returns the number of rows loaded.
+
+        Returns:
+            tuple: A tuple containing:
+                - int: the number of rows loaded.
+                - dict: chunk index -> MySQL error message of every rejected row.
+        """
+        try:
+            return load(frame), {}
+        except pymysql.IntegrityError as e:
+            if len(frame) == 1:
+                return 0, {frame.index[0]: e.args[-1]}
+            middle = len(frame) // 2
+            loaded, errors = self._load_rows(frame.iloc[:middle], load)
+            more_loaded, more_errors = self._load_rows(frame.iloc[middle:], load)
+            return loaded + more_loaded, {**errors, **more_errors}
+
+    def import_file(
+        self,
+        source,
+        file_format: str = "csv",
+        error_path: str = None,
+        method: str = "insert",
+        progress_callback=None,
+    ):
+        """
+        Import a file into the table.
+
+        Args:
+            source (str | file-like): Path or file object of the file to import.
+            file_format (str): Either "csv" or "parquet".
+            error_path (str): CSV file receiving the rejected rows and their errors (a temporary file if omitted).
+            method (str): "insert" for batched multi-row inserts or "load_data" for `LOAD DATA LOCAL INFILE`.
+            progress_callback (callable): Called after every chunk with the rows read, loaded and rejected so far.
+
+        Returns:
+            dict: Rows read, loaded and rejected, the ignored file columns, the error file path (None when
+                nothing was rejected) and the elapsed seconds.
+        """
+        if file_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format: {file_format}")
+        if method not in IMPORT_METHODS:
+            raise ValueError(f"Unsupported import method: {method}")
+        if error_path is None:
+            handle, error_path = tempfile.mkstemp(
+                prefix=f"{self.table_name}_rejected_", suffix=".csv"
+            )
+            os.close(handle)
+
+        start = time.monotonic()
+        stats = {
+            "rows_read": 0,
+            "rows_loaded": 0,
+            "rows_rejected": 0,
+            "ignored_columns": [],
+            "error_path": None,
+        }
+        mapping = None
+        load = (
+            self._load_with_insert if method == "insert" else self._load_with_load_data
+        )
+        batch_size = INSERT_BATCH_SIZE if method == "insert" else self.chunk_size
+
+        try:
+            for chunk in self._iter_chunks(source, file_format):
+                if mapping is None:
+                    mapping, stats["ignored_columns"] = self.map_columns(
+                        list(chunk.columns)
+                    )
+                valid, rejected = self._validate_chunk(chunk, mapping)
+                for start in range(0, len(valid), batch_size):
+                    loaded, errors = self._load_rows(
+                        valid.iloc[start : start + batch_size], load
+                    )
+                    stats["rows_loaded"] += loaded
+                    if errors:
+                        refused = chunk.loc[list(errors)].assign(
+                            _error=[f"{error}; " for error in errors.values()]
+                        )
+                        rejected = pd.concat([rejected, refused])
+                if not rejected.empty:
+                    rejected.to_csv(
+                        error_path,
+                        mode="a",
+                        index=False,
+                        header=stats["rows_rejected"] == 0,
+                    )
+                    stats["rows_rejected"] += len(rejected)
+                stats["rows_read"] += len(chunk)
+                if progress_callback:
+                    progress_callback(
+                        stats["rows_read"], stats["rows_loaded"], stats["rows_rejected"]
+                    )
+        except pymysql.MySQLError as e:
+            self.logger.error(
+                "Error importing into table '%s' after %d rows: %s",
+                self.table_name,
+                stats["rows_read"],
+                e,
+            )
+            raise e
+
+        if stats["rows_rejected"]:
+            stats["error_path"] = error_path
+        else:
+            os.remove(error_path)
+        stats["seconds"] = time.monotonic() - start
+        self.logger.info(
+            "Imported %d of %d rows into table '%s' (%d rejected)",
+            stats["rows_loaded"],
+            stats["rows_read"],
+            self.table_name,
+            stats["rows_rejected"],
+        )
+        return stats
@@ -0,0 +1,415 @@
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from crud.crud_handler import DEFAULT_BATCH_SIZE, CRUDHandler
+from db.schema_manager import SchemaManager
+
+SAVEPOINT_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def order_tables_by_dependency(tables, dependencies):
+    """
+    Orders tables so that every table comes after the tables it references.
+
+    Args:
+        tables (iterable): The table names to order.
+        dependencies (dict): Mapping of table name to the set of table names it references.
+
+    Returns:
+        list: The ordered table names. Tables involved in a reference cycle keep their original order.
+    """
+    remaining = list(dict.fromkeys(tables))
+    ordered = []
+    while remaining:
+        ready = [
+            t
+            for t in remaining
+            if not (dependencies.get(t, set()) - {t}) & set(remaining)
+        ]
+        if not ready:
+            ready = remaining[:1]
+        for table_name in ready:
+            remaining.remove(table_name)
+            ordered.append(table_name)
+    return ordered
+
+
+class UnitOfWork:
+    """
+    Buffers CRUD operations across tables and writes them as batched statements in a single transaction.
+
+    Inserts and updates are flushed with referenced tables first and deletes with referencing tables first,
+    so foreign key constraints hold. Within a flush, all inserts run before updates and updates before
+    deletes. Use it as a context manager to commit on success and roll back on error:
+
+        with UnitOfWork(connection) as uow:
+            uow.create("customers", {...})
+            uow.update("orders", 42, {"status": "Delivered"}, id_column="order_id")
+    """
+
+    def __init__(
+        self,
+        connection,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        dependencies: dict = None,
+    ):
+        """
+        Initialize an empty unit of work.
+
+        Args:
+            connection (pymysql.connections.Connection): Active MySQL database connection.
+            batch_size (int): Maximum number of rows per batched statement.
+            dependencies (dict): Foreign key dependencies between tables (read from the schema when omitted).
+        """
+        self.connection = connection
+        self.batch_size = batch_size
+        self.dependencies = dependencies
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+        self._inserts = {}
+        self._updates = {}
+        self._deletes = {}
+        # Table name -> the handler its operations were written with, holding the writes until the commit.
+        self._handlers = {}
+        self._active = False
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def begin(self):
+        """Start the transaction that all buffered operations are written in."""
+        self.connection.begin()
+        self._active = True
+
+    def create(self, table_name, data: dict):
+        """
+        Buffers the insertion of a record.
+
+        Args:
+            table_name (str): The target table.
+            data (dict): Dictionary of column names and values.
+        """
+        self._inserts.setdefault(table_name, []).append(dict(data))
+
+    def update(self, table_name, record_id, data: dict, id_column: str = "id"):
+        """
+        Buffers the update of a record. Repeated updates of the same record are merged.
+
+        Args:
+            table_name (str): The target table.
+            record_id: The identifier of the record to update.
+            data (dict): Dictionary of column names and their new values.
+            id_column (str): The name of the column used as the identifier (default is "id").
+        """
+        pending = self._updates.setdefault((table_name, id_column), {})
+        pending.setdefault(record_id, {}).update(data)
+
+    def delete(self, table_name, record_id, id_column: str = "id"):
+        """
+        Buffers the deletion of a record.
+
+        Args:
+            table_name (str): The target table.
+            record_id: The identifier of the record to delete.
+            id_column (str): The name of the column used as the identifier (default is "id").
+        """
+        self._deletes.setdefault((table_name, id_column), []).append(record_id)
+
+    def _handler(self, table_name):
+        if table_name not in self._handlers:
+            self._handlers[table_name] = CRUDHandler(
+                self.connection, table_name, manage_transactions=False
+            )
+        return self._handlers[table_name]
+
+    def _table_order(self, tables):
+        if len(set(tables)) > 1 and self.dependencies is None:
+            self.dependencies = SchemaManager(self.connection).get_table_dependencies()
+        return order_tables_by_dependency(tables, self.dependencies or {})
+
+    def flush(self):
+        """
+        Write all buffered operations to the database without committing.
+
+        Returns:
+            dict: The number of affected rows per table.
+        """
+        if not self._active:
+            self.begin()
+        counts = {}
+        tables = (
+            list(self._inserts)
+            + [t for t, _ in self._updates]
+            + [t for t, _ in self._deletes]
+        )
+        order = self._table_order(tables)
+
+        for table_name in order:
+            rows_by_columns = {}
+            for row in self._inserts.get(table_name, []):
+                rows_by_columns.setdefault(tuple(sorted(row)), []).append(row)
+            for rows in rows_by_columns.values():
+                affected = self._handler(table_name).bulk_create_records(
+                    rows, batch_size=self.batch_size
+                )
+                counts[table_name] = counts.get(table_name, 0) + sum(affected)
+
+        for table_name in order:
+            for (update_table, id_column), updates in self._updates.items():
+                if update_table != table_name:
+                    continue
+                affected = self._handler(table_name).bulk_update_records(
+                    updates, id_column=id_column, batch_size=self.batch_size
+                )
+                counts[table_name] = counts.get(table_name, 0) + sum(affected)
+
+        for table_name in reversed(order):
+            for (delete_table, id_column), record_ids in self._deletes.items():
+                if delete_table != table_name:
+                    continue
+                affected = self._handler(table_name).bulk_delete_records(
+                    record_ids, id_column=id_column, batch_size=self.batch_size
+                )
+                counts[table_name] = counts.get(table_name, 0) + sum(affected)
+
+        self._clear_pending()
+        self.logger.debug("Flushed unit of work: %s", counts)
+        return counts
+
+    def _clear_pending(self):
+        self._inserts = {}
+        self._updates = {}
+        self._deletes = {}
+
+    def _execute(self, sql):
+        with self.connection.cursor() as cursor:
+            self.logger.debug("Executing SQL: %s", sql)
+            cursor.execute(sql)
+
+    @staticmethod
+    def _validate_savepoint(name):
+        if not SAVEPOINT_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid savepoint name: {name}")
+
+    def savepoint(self, name):
+        """
+        Flushes buffered operations and sets a named savepoint.
+
+        Args:
+            name (str): The savepoint name.
+        """
+        self._validate_savepoint(name)
+        self.flush()
+        self._execute(f"SAVEPOINT {name};")
+
+    def rollback_to_savepoint(self, name):
+        """
+        Discards buffered operations and rolls the transaction back to a named savepoint.
+
+        Args:
+            name (str): The savepoint name.
+        """
+        self._validate_savepoint(name)
+        self._clear_pending()
+        self._execute(f"ROLLBACK TO SAVEPOINT {name};")
+        for handler in self._handlers.values():
+            # Which of the remembered writes survive is unknown, so the commit drops the derived state instead.
+            handler.discard_pending_writes()
+            handler._after_write(row_delta=None)
+
+    def release_savepoint(self, name):
+        """
+        Remove a named savepoint without affecting the transaction.
+
+        Args:
+            name (str): The savepoint name.
+        """
+        self._validate_savepoint(name)
+        self._execute(f"RELEASE SAVEPOINT {name};")
+
+    def commit(self):
+        """
+        Flushes buffered operations and commits the transaction once.
+
+        Returns:
+            dict: The number of affected rows per table for the final flush.
+        """
+        try:
+            counts = self.flush()
+            self.connection.commit()
+        except Exception as e:
+            self.logger.error("Error committing unit of work: %s", e)
+            self.rollback()
+            raise e
+        self.logger.info(
+            "Committed unit of work touching tables: %s", sorted(self._handlers)
+        )
+        self._finish(committed=True)
+        return counts
+
+    def rollback(self):
+        """Discards buffered operations and rolls back the transaction."""
+        self._clear_pending()
+        try:
+            self.connection.rollback()
+        finally:
+            self._finish(committed=False)
+
+    def _finish(self, committed):
+        self._active = False
+        for handler in self._handlers.values():
+            if committed:
+                handler.apply_pending_writes()
+            else:
+                handler.discard_pending_writes()
+        self._handlers = {}
+
+
+class GroupCommitter:
+    """
+    Coalesces small writes submitted concurrently by several sessions into shared transactions.
+
+    A background thread owns a dedicated connection. It collects writes until `max_batch` writes are queued
+    or `max_delay` seconds have passed since the first one, then applies them as one UnitOfWork and commits
+    once. If the shared transaction fails (e.g. one write violates a constraint), every write of the batch is
+    retried in a transaction of its own, so only the failing writes report an error. Every submitted write
+    returns a Future that resolves when its transaction commits.
+    """
+
+    def __init__(
+        self, connection_factory, max_batch: int = 100, max_delay: float = 0.01
+    ):
+        """
+        Start the background committer thread.
+
+        Args:
+            connection_factory (callable): Returns a new connection dedicated to the committer.
+            max_batch (int): Maximum number of writes per shared transaction.
+            max_delay (float): Maximum number of seconds a write waits for others to join its transaction.
+        """
+        self.connection_factory = connection_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue()
+        self._connection = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="group-committer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, operation, table_name, *args, **kwargs):
+        """
+        Queues a write for the next shared transaction.
+
+        Args:
+            operation (str): One of "create", "update" or "delete".
+            table_name (str): The target table.
+            *args: Positional arguments of the matching UnitOfWork method.
+            **kwargs: Keyword arguments of the matching UnitOfWork method.
+
+        Returns:
+            Future: Resolves to the number of writes committed together (1 if the write was retried alone), or
+                raises the write's error.
+        """
+        if operation not in ("create", "update", "delete"):
+            raise ValueError(f"Unsupported operation: {operation}")
+        if self._stopped.is_set():
+            raise RuntimeError("GroupCommitter is closed")
+        future = Future()
+        self._queue.put((operation, table_name, args, kwargs, future))
+        return future
+
+    def _collect_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, writes):
+        if self._connection is None or not self._connection.open:
+            self._connection = self.connection_factory()
+        with UnitOfWork(self._connection) as uow:
+            for operation, table_name, args, kwargs, _ in writes:
+                getattr(uow, operation)(table_name, *args, **kwargs)
+
+    def _commit_each(self, batch):
+        for write in batch:
+            try:
+                self._commit([write])
+            except Exception as e:
+                self.logger.error(
+                    "Error committing %s on table '%s': %s", write[0], write[1], e
+                )
+                write[-1].set_exception(e)
+            else:
+                write[-1].set_result(1)
+
+    def _run(self):
+        while not (self._stopped.is_set() and self._queue.empty()):
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            try:
+                self._commit(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    self.logger.error(
+                        "Error committing %s on table '%s': %s",
+                        batch[0][0],
+                        batch[0][1],
+                        e,
+                    )
+                    batch[0][-1].set_exception(e)
+                else:
+                    # The batch was rolled back as a whole; retrying each write alone isolates the failing ones.
+                    self.logger.warning(
+                        "Error group-committing %d writes, retrying them one by one: %s",
+                        len(batch),
+                        e,
+                    )
+                    self._commit_each(batch)
+                continue
+            for *_, future in batch:
+                future.set_result(len(batch))
+            self.logger.debug("Group-committed %d writes", len(batch))
+        if self._connection is not None:
+            self._connection.close()
+
+    def close(self):
+        """Commit the writes still queued and stop the background thread."""
+        self._stopped.set()
+        self._thread.join()
@@ -6,6 +6,9 @@ import pandas as pd
 import streamlit as st
 from faker import Faker
 
+from crud.crud_handler import CRUDHandler
+from db.columnar_fetch import fetch_dataframe
+
 
 class DataGenerator:
     """
@@ -170,36 +173,35 @@ class DataGenerator:
             }
         if generation_type == "secondary":
             connection = st.session_state.db_connector.get_connection()
-            with connection.cursor() as cursor:
-                query = "SELECT customer_id FROM customers"
-                cursor.execute(query)
-                data = cursor.fetchall()
-                customer_id_list = [d[0] for d in data]
-
-                query = "SELECT restaurant_id FROM restaurants"
-                cursor.execute(query)
-                data = cursor.fetchall()
-                restaurants_id_list = [d[0] for d in data]
-                return {
-                    "orders": self.generate_orders(customer_id_list, restaurants_id_list)
-                }
+            customer_id_list = fetch_dataframe(connection, "SELECT customer_id FROM customers")["customer_id"]
+            restaurants_id_list = fetch_dataframe(connection, "SELECT restaurant_id FROM restaurants")["restaurant_id"]
+            return {
+                "orders": self.generate_orders(customer_id_list.to_numpy(), restaurants_id_list.to_numpy())
+            }
         if generation_type == "tertiary":
             connection = st.session_state.db_connector.get_connection()
-            with connection.cursor() as cursor:
-                query = "SELECT order_id FROM orders"
-                cursor.execute(query)
-                data = cursor.fetchall()
-                order_id_list = [d[0] for d in data]
-
-                query = "SELECT delivery_person_id FROM delivery_persons"
-                cursor.execute(query)
-                data = cursor.fetchall()
-                delivery_person_id_list = [d[0] for d in data]
-                return {
-                    "deliveries": self.generate_deliveries(order_id_list, delivery_person_id_list)
-                }
+            order_id_list = fetch_dataframe(connection, "SELECT order_id FROM orders")["order_id"]
+            delivery_person_id_list = fetch_dataframe(
+                connection, "SELECT delivery_person_id FROM delivery_persons")["delivery_person_id"]
+            return {
+                "deliveries": self.generate_deliveries(order_id_list.to_numpy(), delivery_person_id_list.to_numpy())
+            }
         return {}
 
+    def _insert_frame(self, connection, table_name, frame):
+        """
+        Insert a generated DataFrame into its table with batched multi-row inserts.
+
+        Going through CRUDHandler keeps the row caches, row counts and change log in step with the new rows.
+
+        Args:
+            connection (pymysql.connections.Connection): Active database connection.
+            table_name (str): The target table; the DataFrame's columns must match its column names.
+            frame (pd.DataFrame): The generated rows.
+        """
+        self.logger.info("Inserting %s into database...", table_name.replace("_", " "))
+        CRUDHandler(connection, table_name).bulk_create_records(frame.to_dict("records"))
+
     def insert_data(self, connection):
         """
         Inserts the generated data into the corresponding database tables.
@@ -210,59 +212,16 @@ class DataGenerator:
             connection (pymysql.connections.Connection): Active database connection.
         """
         data_dict = self.generate_all_data()
-        with connection.cursor() as cursor:
-            self.logger.info("Inserting customers into database...")
-            customer_query = """
-                INSERT INTO customers (name, email, phone, location, signup_date, is_premium, preferred_cuisine, total_orders, average_rating)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            customers = data_dict["customers"]
-            customer_values = customers.values.tolist()
-            cursor.executemany(customer_query, customer_values)
-
-            self.logger.info("Inserting restaurants into database...")
-            restaurant_query = """
-                INSERT INTO restaurants (name, cuisine_type, location, owner_name, average_delivery_time, contact_number, rating, total_orders, is_active)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            restaurants = data_dict["restaurants"]
-            restaurant_values = restaurants.values.tolist()
-            cursor.executemany(restaurant_query, restaurant_values)
-
-            self.logger.info("Inserting delivery persons into database...")
-            dp_query = """
-                INSERT INTO delivery_persons (name, contact_number, vehicle_type, total_deliveries, average_rating, location)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            dps = data_dict["delivery_persons"]
-            dp_values = dps.values.tolist()
-            cursor.executemany(dp_query, dp_values)
+        self._insert_frame(connection, "customers", data_dict["customers"])
+        self._insert_frame(connection, "restaurants", data_dict["restaurants"])
+        self._insert_frame(connection, "delivery_persons", data_dict["delivery_persons"])
 
         data_dict = self.generate_all_data(generation_type="secondary")
-        with connection.cursor() as cursor:
-
-            self.logger.info("Inserting orders into database...")
-            orders_query = """
-                INSERT INTO orders (customer_id, restaurant_id, order_date, delivery_time, status, total_amount, payment_mode, discount_applied, feedback_rating)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            orders = data_dict["orders"]
-            orders['order_date'] = orders['order_date'].astype(str)
-            orders['delivery_time'] = orders['delivery_time'].astype(str)
-            order_values = orders.values.tolist()
-            cursor.executemany(orders_query, order_values)
+        orders = data_dict["orders"]
+        orders['order_date'] = orders['order_date'].astype(str)
+        orders['delivery_time'] = orders['delivery_time'].astype(str)
+        self._insert_frame(connection, "orders", orders)
 
         data_dict = self.generate_all_data(generation_type="tertiary")
-        with connection.cursor() as cursor:
-
-            self.logger.info("Inserting deliveries into database...")
-            deliveries_query = """
-                INSERT INTO deliveries (order_id, delivery_person_id, delivery_status, distance, delivery_time, estimated_time, delivery_fee, vehicle_type)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            deliveries = data_dict["deliveries"]
-            delivery_values = deliveries.values.tolist()
-            cursor.executemany(deliveries_query, delivery_values)
-
-            connection.commit()
-            self.logger.info("Data insertion complete.")
+        self._insert_frame(connection, "deliveries", data_dict["deliveries"])
+        self.logger.info("Data insertion complete.")
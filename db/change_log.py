@@ -0,0 +1,228 @@
+import json
+import logging
+import threading
+import time
+
+import pymysql
+
+CHANGE_LOG_TABLE = "change_log"
+CHANGE_OPERATIONS = ("insert", "update", "upsert", "delete", "load")
+ER_NO_SUCH_TABLE = 1146
+
+
+class ChangeLog:
+    """
+    Records row changes into an append-only `change_log` table and serves them to downstream consumers.
+
+    Every entry gets a monotonically increasing sequence number (`seq`). Entries are written on the same
+    connection and inside the same transaction as the change they describe, so they commit or roll back
+    together with it. Capture is enabled when the `change_log` table exists; see `ensure_table`.
+
+    Sequence numbers are assigned when an entry is written, so a concurrent transaction that commits late
+    can make a lower number visible after a higher one. Consumers that need every change should re-read a
+    small overlap behind their watermark and de-duplicate by `seq`.
+    """
+
+    _enabled = {}
+    _enabled_lock = threading.Lock()
+    ENABLED_CHECK_TTL = 60
+
+    def __init__(self, connection):
+        """
+        Initialize the ChangeLog with an active MySQL database connection.
+
+        Args:
+            connection (pymysql.connections.Connection): Active connection to the MySQL database.
+        """
+        self.connection = connection
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def _database_key(self):
+        return getattr(self.connection, "host", None), getattr(
+            self.connection, "db", None
+        )
+
+    def _set_enabled(self, enabled):
+        with self._enabled_lock:
+            self._enabled[self._database_key()] = (time.monotonic(), enabled)
+
+    def ensure_table(self):
+        """Create the change log table if it does not exist, which enables change capture."""
+        sql = f"""
+            CREATE TABLE IF NOT EXISTS {CHANGE_LOG_TABLE} (
+                seq BIGINT NOT NULL AUTO_INCREMENT,
+                table_name VARCHAR(64) NOT NULL,
+                operation VARCHAR(8) NOT NULL,
+                key_column VARCHAR(64) NULL,
+                record_key VARCHAR(255) NULL,
+                payload JSON NULL,
+                changed_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+                PRIMARY KEY (seq),
+                KEY idx_change_log_table_seq (table_name, seq)
+            );
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql)
+            self.connection.commit()
+            self._set_enabled(True)
+            self.logger.info("Change log table '%s' is ready.", CHANGE_LOG_TABLE)
+        except pymysql.MySQLError as e:
+            self.logger.error("Error creating change log table: %s", e)
+            raise e
+
+    def is_enabled(self):
+        """
+        Check whether change capture is enabled, i.e. whether the change log table exists.
+
+        The answer is cached per database for `ENABLED_CHECK_TTL` seconds.
+
+        Returns:
+            bool: True if changes are being captured.
+        """
+        with self._enabled_lock:
+            cached = self._enabled.get(self._database_key())
+        if cached and time.monotonic() - cached[0] < self.ENABLED_CHECK_TTL:
+            return cached[1]
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SHOW TABLES LIKE %s;", (CHANGE_LOG_TABLE,))
+                enabled = cursor.fetchone() is not None
+        except pymysql.MySQLError as e:
+            self.logger.error("Error checking for the change log table: %s", e)
+            raise e
+        self._set_enabled(enabled)
+        return enabled
+
+    def record(
+        self, table_name, operation, record_keys, key_column=None, payloads=None
+    ):
+        """
+        Append change entries for a write. Must be called inside the transaction of the write itself.
+
+        Args:
+            table_name (str): The table that was written to.
+            operation (str): One of CHANGE_OPERATIONS. "load" marks a bulk load whose individual rows are unknown.
+            record_keys (list): Identifier of each changed row (None where unknown).
+            key_column (str): The column the identifiers refer to.
+            payloads (list): Optional JSON-serializable payload per row, such as the changed columns.
+
+        Returns:
+            int: The number of entries written (0 when capture is disabled).
+        """
+        if operation not in CHANGE_OPERATIONS:
+            raise ValueError(f"Unsupported change operation: {operation}")
+        if table_name == CHANGE_LOG_TABLE or not record_keys or not self.is_enabled():
+            return 0
+        payloads = payloads or [None] * len(record_keys)
+        values = []
+        for record_key, payload in zip(record_keys, payloads, strict=True):
+            values.extend(
+                [
+                    table_name,
+                    operation,
+                    key_column,
+                    None if record_key is None else str(record_key),
+                    None if payload is None else json.dumps(payload, default=str),
+                ]
+            )
+        sql = (
+            f"INSERT INTO {CHANGE_LOG_TABLE} (table_name, operation, key_column, record_key, payload) "  # noqa: S608  # constant table name
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(record_keys))};"
+        )
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql, values)
+                return cursor.rowcount
+        except pymysql.MySQLError as e:
+            if e.args and e.args[0] == ER_NO_SUCH_TABLE:
+                self._set_enabled(False)
+                return 0
+            self.logger.error(
+                "Error recording changes for table '%s': %s", table_name, e
+            )
+            raise e
+
+    def changes_since(
+        self,
+        watermark: int = 0,
+        table_names: list = None,
+        limit: int = 10000,
+        operations: list = None,
+    ):
+        """
+        Return the changes recorded after a watermark, oldest first.
+
+        Args:
+            watermark (int): The last sequence number already processed by the consumer.
+            table_names (list): Restricts the result to these tables (defaults to all tables).
+            limit (int): Maximum number of changes returned; call again with the new watermark for more.
+            operations (list): Restricts the result to these operations (defaults to all operations).
+
+        Returns:
+            tuple: A tuple containing:
+                - list: change dictionaries with seq, table_name, operation, key_column, record_key,
+                  payload (decoded) and changed_at.
+                - int: the new watermark (the highest returned seq, or the given watermark when empty).
+        """
+        sql = (
+            f"SELECT seq, table_name, operation, key_column, record_key, payload, changed_at "  # noqa: S608  # constant table name
+            f"FROM {CHANGE_LOG_TABLE} WHERE seq > %s"
+        )
+        values = [watermark]
+        if table_names:
+            sql += f" AND table_name IN ({', '.join(['%s'] * len(table_names))})"
+            values.extend(table_names)
+        if operations:
+            sql += f" AND operation IN ({', '.join(['%s'] * len(operations))})"
+            values.extend(operations)
+        sql += " ORDER BY seq LIMIT %s;"
+        values.append(limit)
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql, values)
+                columns = [desc[0] for desc in cursor.description]
+                changes = [
+                    dict(zip(columns, row, strict=True)) for row in cursor.fetchall()
+                ]
+        except pymysql.MySQLError as e:
+            self.logger.error("Error reading changes since %s: %s", watermark, e)
+            raise e
+        for change in changes:
+            if change["payload"] is not None:
+                change["payload"] = json.loads(change["payload"])
+        return changes, changes[-1]["seq"] if changes else watermark
+
+    def latest_sequence(self, table_name=None):
+        """
+        Return the highest recorded sequence number, overall or for one table.
+
+        Args:
+            table_name (str): Restricts the lookup to this table.
+
+        Returns:
+            int: The highest sequence number, or 0 when nothing was recorded.
+        """
+        sql = f"SELECT MAX(seq) FROM {CHANGE_LOG_TABLE}"  # noqa: S608  # constant table name
+        values = []
+        if table_name:
+            sql += " WHERE table_name = %s"
+            values.append(table_name)
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql + ";", values)
+                result = cursor.fetchone()
+                return int(result[0] or 0)
+        except pymysql.MySQLError as e:
+            self.logger.error("Error reading the latest change sequence: %s", e)
+            raise e
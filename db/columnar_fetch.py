@@ -0,0 +1,135 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pymysql
+from pymysql.constants import FIELD_TYPE
+
+INTEGER_TYPES = {
+    FIELD_TYPE.TINY,
+    FIELD_TYPE.SHORT,
+    FIELD_TYPE.LONG,
+    FIELD_TYPE.INT24,
+    FIELD_TYPE.LONGLONG,
+    FIELD_TYPE.YEAR,
+}
+FLOAT_TYPES = {
+    FIELD_TYPE.FLOAT,
+    FIELD_TYPE.DOUBLE,
+    FIELD_TYPE.DECIMAL,
+    FIELD_TYPE.NEWDECIMAL,
+}
+DATETIME_TYPES = {FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP, FIELD_TYPE.DATE}
+
+logger = logging.getLogger(__name__)
+
+
+class _ColumnBuffer:
+    """A pre-sized, typed buffer that one result column is decoded into chunk by chunk."""
+
+    def __init__(self, type_code, size):
+        self.type_code = type_code
+        self.mask = None
+        if type_code in INTEGER_TYPES:
+            self.values = np.zeros(size, dtype=np.int64)
+            self.mask = np.zeros(size, dtype=bool)
+        elif type_code in FLOAT_TYPES:
+            self.values = np.empty(size, dtype=np.float64)
+        elif type_code in DATETIME_TYPES:
+            self.values = np.empty(size, dtype="datetime64[us]")
+        else:
+            self.values = np.empty(size, dtype=object)
+
+    def ensure_capacity(self, size):
+        if size > len(self.values):
+            capacity = max(size, 2 * len(self.values))
+            self.values = np.resize(self.values, capacity)
+            if self.mask is not None:
+                self.mask = np.resize(self.mask, capacity)
+
+    def fill(self, start, column):
+        stop = start + len(column)
+        if self.mask is not None:
+            nulls = np.fromiter(
+                (value is None for value in column), dtype=bool, count=len(column)
+            )
+            if nulls.any():
+                self.mask[start:stop] = nulls
+                self.values[start:stop] = [
+                    0 if value is None else value for value in column
+                ]
+            else:
+                self.mask[start:stop] = False
+                self.values[start:stop] = column
+        elif self.values.dtype == object:
+            self.values[start:stop] = column
+        else:
+            self.values[start:stop] = np.array(column, dtype=self.values.dtype)
+
+    def finish(self, size, categorical_threshold):
+        values = self.values[:size]
+        if self.mask is not None:
+            mask = self.mask[:size]
+            return pd.arrays.IntegerArray(values, mask) if mask.any() else values
+        if values.dtype == object and size:
+            uniques = pd.unique(values)
+            if len(uniques) <= categorical_threshold * size:
+                return pd.Categorical(values)
+        return values
+
+
+def fetch_dataframe(
+    connection,
+    sql,
+    params=None,
+    chunk_size: int = 50000,
+    categorical_threshold: float = 0.5,
+):
+    """
+    Execute a query and decode its result set straight into typed column buffers.
+
+    Numeric and datetime columns are written into pre-sized NumPy arrays chunk by chunk, integer columns with
+    NULLs become nullable Int64 arrays, and text columns with few distinct values become categoricals. The
+    DataFrame is then assembled from whole columns, avoiding pandas' per-cell type inference over row tuples.
+
+    Args:
+        connection (pymysql.connections.Connection): Active MySQL database connection.
+        sql (str): The query to execute.
+        params (tuple | list | dict): Query parameters, or None when the query takes none.
+        chunk_size (int): Number of rows decoded per chunk.
+        categorical_threshold (float): Text columns whose distinct-value ratio is at most this become categoricals.
+
+    Returns:
+        pd.DataFrame: The result set.
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description is None:
+                return pd.DataFrame()
+            names = [desc[0] for desc in cursor.description]
+            size = max(cursor.rowcount, 0)
+            buffers = [_ColumnBuffer(desc[1], size) for desc in cursor.description]
+
+            filled = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for buffer, column in zip(
+                    buffers, zip(*rows, strict=True), strict=True
+                ):
+                    buffer.ensure_capacity(filled + len(rows))
+                    buffer.fill(filled, column)
+                filled += len(rows)
+    except pymysql.MySQLError as e:
+        logger.error("Error fetching result set: %s", e)
+        raise e
+
+    return pd.DataFrame(
+        {
+            name: buffer.finish(filled, categorical_threshold)
+            for name, buffer in zip(names, buffers, strict=True)
+        },
+        columns=names,
+    )
@@ -2,6 +2,8 @@ import logging
 
 import pymysql
 
+from db.connection_pool import ConnectionPool
+
 
 class DatabaseConnector:
     """
@@ -32,6 +34,7 @@ class DatabaseConnector:
             self.logger.addHandler(ch)
 
         self.connection = None
+        self.pool = None
 
         self.connect()
 
@@ -101,6 +104,47 @@ class DatabaseConnector:
             self.logger.error("Error creating database: %s", e)
             raise e
 
+    def new_connection(self, **kwargs):
+        """
+        Open an additional, independent connection to the configured database.
+
+        Useful for work that must not share the session connection, such as background threads or
+        long-running streaming reads. The caller is responsible for closing it.
+
+        Args:
+            **kwargs: Extra keyword arguments passed to `pymysql.connect`.
+
+        Returns:
+            pymysql.connections.Connection: The new connection.
+        """
+        try:
+            return pymysql.connect(
+                host=self.host,
+                port=self.port,
+                user=self.user,
+                password=self.password,
+                database=self.database,
+                autocommit=True,
+                **kwargs
+            )
+        except pymysql.MySQLError as e:
+            self.logger.error("Error opening additional connection: %s", e)
+            raise e
+
+    def get_pool(self, max_size: int = 8):
+        """
+        Return the pool of additional connections to the configured database, creating it on first use.
+
+        Args:
+            max_size (int): Maximum number of pooled connections in use at the same time (used on creation only).
+
+        Returns:
+            ConnectionPool: The connection pool.
+        """
+        if self.pool is None:
+            self.pool = ConnectionPool(self.new_connection, max_size=max_size)
+        return self.pool
+
     def get_connection(self):
         """
         Returns the current database connection.
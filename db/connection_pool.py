@@ -0,0 +1,118 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+import pymysql
+
+
+class ConnectionPool:
+    """
+    A thread-safe, bounded pool of MySQL connections.
+
+    At most `max_size` connections are handed out at a time; further callers wait in `acquire`. Idle connections
+    are reused most-recently-released first and are pinged (and reconnected if needed) before being handed out.
+    """
+
+    def __init__(self, connection_factory, max_size: int = 8):
+        """
+        Initialize an empty pool.
+
+        Args:
+            connection_factory (callable): Opens a new connection, e.g. `DatabaseConnector.new_connection`.
+            max_size (int): Maximum number of connections in use at the same time.
+        """
+        self.connection_factory = connection_factory
+        self.max_size = max_size
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = queue.LifoQueue()
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def acquire(self, timeout: float = None):
+        """
+        Take a connection from the pool, opening one if no idle connection is available.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait for a free slot (waits indefinitely if None).
+
+        Returns:
+            pymysql.connections.Connection: The connection; hand it back with `release`.
+
+        Raises:
+            TimeoutError: If no slot became free within `timeout`.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(
+                f"No pooled connection became available within {timeout} seconds"
+            )
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return self.connection_factory()
+                try:
+                    connection.ping(reconnect=True)
+                    return connection
+                except pymysql.MySQLError as e:
+                    self.logger.warning("Discarding broken pooled connection: %s", e)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard: bool = False):
+        """
+        Hands a connection back to the pool.
+
+        Args:
+            connection (pymysql.connections.Connection): A connection obtained from `acquire`.
+            discard (bool): Close the connection instead of keeping it for reuse.
+        """
+        try:
+            if discard or not connection.open:
+                connection.close()
+            else:
+                self._idle.put(connection)
+        except pymysql.MySQLError as e:
+            self.logger.warning("Error closing pooled connection: %s", e)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """
+        Context manager that acquires a connection and releases it on exit.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait for a free slot.
+
+        Yields:
+            pymysql.connections.Connection: The pooled connection.
+        """
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """Close every idle connection. Connections currently in use are closed when released with discard."""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                connection.close()
+            except pymysql.MySQLError as e:
+                self.logger.warning("Error closing pooled connection: %s", e)
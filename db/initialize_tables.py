@@ -1,19 +1,18 @@
 import streamlit as st
 
+from db.change_log import ChangeLog
 from db.schema_manager import SchemaManager
+from insights.rollup_manager import RollupManager
+from insights.sample_manager import SAMPLED_TABLES, SampleManager
 
 
-def create_initial_tables():
-    """
-    Creates the initial set of tables using the current database connection stored in session state.
-    This function relies on the DatabaseConnector (stored as st.session_state.db_connector)
-    and uses SchemaManager to execute the table creation statements.
+def create_tables(connection):
     """
-    if "db_connector" not in st.session_state:
-        st.error("Database not configured. Please go to 'Database Config' page.")
-        return
+    Create the application tables, their indexes and the change log, rollup and sample tables.
 
-    connection = st.session_state.db_connector.get_connection()
+    Args:
+        connection (pymysql.connections.Connection): Active connection to an empty database.
+    """
     schema_manager = SchemaManager(connection)
 
     # Customers Table Schema
@@ -83,12 +82,34 @@ def create_initial_tables():
         {"name": "location", "type": "VARCHAR(255)", "not_null": False}
     ]
 
+    schema_manager.create_table("delivery_persons", delivery_persons_schema)
+    schema_manager.create_table("customers", customers_schema)
+    schema_manager.create_table("restaurants", restaurants_schema)
+    schema_manager.create_table("orders", orders_schema)
+    schema_manager.create_table("deliveries", deliveries_schema)
+    # Indexes for the time window filters of the insights.
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE INDEX idx_orders_order_date ON orders (order_date);")
+        cursor.execute("CREATE INDEX idx_customers_signup_date ON customers (signup_date);")
+    connection.commit()
+    ChangeLog(connection).ensure_table()
+    RollupManager(connection).ensure_tables()
+    for table_name in SAMPLED_TABLES:
+        SampleManager(connection, table_name).ensure_table()
+
+
+def create_initial_tables():
+    """
+    Creates the initial set of tables using the current database connection stored in session state.
+    This function relies on the DatabaseConnector (stored as st.session_state.db_connector)
+    and uses SchemaManager to execute the table creation statements.
+    """
+    if "db_connector" not in st.session_state:
+        st.error("Database not configured. Please go to 'Database Config' page.")
+        return
+
     try:
-        schema_manager.create_table("delivery_persons", delivery_persons_schema)
-        schema_manager.create_table("customers", customers_schema)
-        schema_manager.create_table("restaurants", restaurants_schema)
-        schema_manager.create_table("orders", orders_schema)
-        schema_manager.create_table("deliveries", deliveries_schema)
+        create_tables(st.session_state.db_connector.get_connection())
         st.success("Initial tables created successfully.")
     except Exception as e:
         st.error(f"Error creating initial tables: {e}")
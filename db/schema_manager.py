@@ -86,6 +86,59 @@ class SchemaManager:
             self.logger.error("Error retrieving primary keys for table '%s': %s", table_name, e)
             raise e
 
+    def estimate_row_count(self, table_name):
+        """
+        Return the storage engine's row count estimate for a table without scanning it.
+
+        For InnoDB the value comes from index statistics and can be off by a noticeable margin, so it is
+        meant for display and pagination only.
+
+        Args:
+            table_name (str): The name of the table.
+
+        Returns:
+            int: The estimated number of rows (0 if the table is unknown).
+        """
+        sql = """
+            SELECT TABLE_ROWS
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s;
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql, (table_name,))
+                result = cursor.fetchone()
+                estimate = int(result[0] or 0) if result else 0
+                self.logger.debug("Estimated row count for table '%s': %d", table_name, estimate)
+                return estimate
+        except pymysql.MySQLError as e:
+            self.logger.error("Error estimating row count for table '%s': %s", table_name, e)
+            raise e
+
+    def get_table_dependencies(self):
+        """
+        Retrieve the foreign key dependencies between the tables of the current database.
+
+        Returns:
+            dict: A mapping of each referencing table name to the set of table names it references.
+        """
+        sql = """
+            SELECT TABLE_NAME, REFERENCED_TABLE_NAME
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL;
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql)
+                dependencies = {}
+                for table_name, referenced_table in cursor.fetchall():
+                    dependencies.setdefault(table_name, set()).add(referenced_table)
+                self.logger.debug("Table dependencies: %s", dependencies)
+                return dependencies
+        except pymysql.MySQLError as e:
+            self.logger.error("Error retrieving table dependencies: %s", e)
+            raise e
+
     @staticmethod
     def format_column_definition(col):
         """
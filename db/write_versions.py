@@ -0,0 +1,62 @@
+import threading
+
+
+class WriteVersions:
+    """
+    Per-table write version counters for the current process.
+
+    Every write made through CRUDHandler (and therefore DataGenerator, imports and units of work) bumps the
+    version of the table it touched. Caches of derived results store the versions of the tables they read
+    and are considered stale as soon as any of them changes. Writes made by other processes are not seen,
+    so such caches should also expire after a TTL.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, table_name):
+        """
+        Increments the write version of a table.
+
+        Args:
+            table_name (str): The table that was written to.
+
+        Returns:
+            int: The new version.
+        """
+        with self._lock:
+            self._versions[table_name] = self._versions.get(table_name, 0) + 1
+            return self._versions[table_name]
+
+    def get(self, table_name):
+        """
+        Return the current write version of a table.
+
+        Args:
+            table_name (str): The table name.
+
+        Returns:
+            int: The version (0 if the table was never written to by this process).
+        """
+        with self._lock:
+            return self._versions.get(table_name, 0)
+
+    def snapshot(self, table_names):
+        """
+        Return the current write versions of several tables.
+
+        Args:
+            table_names (iterable): The table names.
+
+        Returns:
+            tuple: (table name, version) pairs, sorted by table name.
+        """
+        with self._lock:
+            return tuple(
+                (name, self._versions.get(name, 0)) for name in sorted(set(table_names))
+            )
+
+
+# Process-wide write versions shared by all connections and Streamlit sessions.
+write_versions = WriteVersions()
@@ -0,0 +1,251 @@
+import logging
+import math
+
+import numpy as np
+
+from db.columnar_fetch import fetch_dataframe
+from insights.filters import apply_filters
+from insights.insights_manager import INSIGHT_SPECS
+from insights.query_planner import build_query, query_params, where_clause
+from insights.result_cache import result_cache
+from insights.sample_manager import SAMPLED_TABLES, SampleManager, sample_table_name
+
+# Two-sided 95% normal quantile, used for the confidence intervals.
+Z_95 = 1.96
+
+
+def sampled_source(spec):
+    """
+    Return the table an insight aggregates over and its FROM clause rewritten to read the sample instead.
+
+    Only the driving (first) table is replaced; joined dimension tables are still read in full, so every
+    sampled row keeps its attributes.
+
+    Args:
+        spec (dict): The insight spec.
+
+    Returns:
+        tuple: (base table, rewritten source), or None if the insight does not read a sampled table.
+    """
+    table, _, rest = spec["source"].partition(" ")
+    if table not in SAMPLED_TABLES:
+        return None
+    return table, f"{sample_table_name(table)} {rest}".strip()
+
+
+def build_sample_query(spec, source):
+    """
+    Build the query computing an insight's sufficient statistics on the sample.
+
+    COUNT needs the matching row count; SUM the sum and the sum of squares; AVG the non-NULL count as well.
+    Other aggregates (MIN, MAX, RATIO and raw expressions) are computed as they are and not scaled.
+
+    Args:
+        spec (dict): The insight spec, see `query_planner.build_query`.
+        source (str): The FROM clause reading the sample.
+
+    Returns:
+        str: The query, taking the spec's `query_params`. Ordering and limits are left to `estimate`, which
+            applies them to the scaled values.
+    """
+    select = [
+        expression if expression == alias else f"{expression} AS {alias}"
+        for alias, expression in spec.get("group_by", []) + spec.get("columns", [])
+    ]
+    for alias, function, argument in spec.get("aggregates", []):
+        if function == "COUNT":
+            select.append(f"COUNT({argument}) AS {alias}__n")
+        elif function in ("SUM", "AVG"):
+            select += [
+                f"COUNT({argument}) AS {alias}__n",
+                f"SUM({argument}) AS {alias}__s",
+                f"SUM(({argument}) * ({argument})) AS {alias}__q",
+            ]
+        elif function is None:
+            select.append(f"{argument} AS {alias}")
+        elif function == "RATIO":
+            numerator, denominator = argument
+            select.append(
+                f"SUM({numerator}) / NULLIF(SUM({denominator}), 0) AS {alias}"
+            )
+        else:
+            select.append(f"{function}({argument}) AS {alias}")
+    sql = f"SELECT {', '.join(select)} FROM {source}"  # noqa: S608  # source from INSIGHT_SPECS
+    if where_clause(spec):
+        sql += f" WHERE {where_clause(spec)}"
+    if spec.get("group_by"):
+        sql += (
+            f" GROUP BY {', '.join(expression for _, expression in spec['group_by'])}"
+        )
+    return sql + ";"
+
+
+def estimate(spec, frame, population, sample_rows, z=Z_95):
+    """
+    Turn the sample statistics of `build_sample_query` into population estimates with confidence intervals.
+
+    With a uniform sample of k out of N rows, a group's COUNT and SUM are estimated as N / k times their sample
+    values, with the standard error of the mean of the per-row contributions (zero outside the group) scaled
+    by N; an AVG is the sample mean of the group, with the standard error s / sqrt(n). All errors include the
+    finite population correction, so a sample holding the whole table yields zero-width intervals.
+
+    Args:
+        spec (dict): The insight spec.
+        frame (pd.DataFrame): The result of the sample query.
+        population (int): N, the number of rows in the base table.
+        sample_rows (int): k, the number of rows in the sample.
+        z (float): The normal quantile of the interval's confidence level.
+
+    Returns:
+        pd.DataFrame: The insight's columns holding the estimates, each estimated aggregate followed by its
+            `<alias>_ci_low` and `<alias>_ci_high` bounds, in the insight's order and row limit.
+    """
+    result = frame[
+        [alias for alias, _ in spec.get("group_by", []) + spec.get("columns", [])]
+    ].copy()
+    scale = population / sample_rows
+    correction = (
+        math.sqrt((population - sample_rows) / (population - 1))
+        if population > 1
+        else 0.0
+    )
+    for alias, function, _ in spec.get("aggregates", []):
+        if function not in ("COUNT", "SUM", "AVG"):
+            result[alias] = frame[alias]
+            continue
+        n = frame[f"{alias}__n"].astype(float).to_numpy()
+        if function == "COUNT":
+            share = n / sample_rows
+            value = n * scale
+            error = population * np.sqrt(share * (1 - share) / sample_rows)
+        else:
+            s = frame[f"{alias}__s"].astype(float).to_numpy()
+            q = frame[f"{alias}__q"].astype(float).to_numpy()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if function == "SUM":
+                    mean = s / sample_rows
+                    variance = (
+                        np.maximum(q / sample_rows - mean * mean, 0)
+                        * sample_rows
+                        / max(sample_rows - 1, 1)
+                    )
+                    value = s * scale
+                    error = population * np.sqrt(variance / sample_rows)
+                else:
+                    value = s / n
+                    variance = np.maximum(q / n - value * value, 0) * n / (n - 1)
+                    error = np.where(n > 1, np.sqrt(variance / n), np.nan)
+        error = error * correction
+        result[alias] = value
+        result[f"{alias}_ci_low"] = value - z * error
+        result[f"{alias}_ci_high"] = value + z * error
+
+    if spec.get("order_by"):
+        # MySQL sorts NULLs first in ascending and last in descending order.
+        result = result.sort_values(
+            [alias for alias, _ in spec["order_by"]],
+            ascending=[ascending for _, ascending in spec["order_by"]],
+            kind="stable",
+            na_position="first" if spec["order_by"][0][1] else "last",
+        )
+    if spec.get("limit"):
+        result = result.head(int(spec["limit"]))
+    return result.reset_index(drop=True)
+
+
+class ApproximateInsights:
+    """
+    Computes approximate insights on the uniform samples maintained by `SampleManager`.
+
+    Counts and sums are scaled up to the population and reported with confidence intervals, so a preview
+    renders in the time it takes to scan the sample rather than the whole table. Insights served from the
+    rollup tables or from small tables are cheap exactly and have no approximate version.
+    """
+
+    def __init__(self, connection, z: float = Z_95):
+        """
+        Initialize the approximate insights.
+
+        Args:
+            connection (pymysql.connections.Connection): Active connection to the MySQL database.
+            z (float): The normal quantile of the confidence intervals (1.96 for 95%).
+        """
+        self.connection = connection
+        self.z = z
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    @staticmethod
+    def supports(name):
+        """Return whether an insight has an approximate version."""
+        return sampled_source(INSIGHT_SPECS[name]) is not None
+
+    def fetch_insight(self, name, filters=None):
+        """
+        Return the approximate result of an insight.
+
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+            filters (dict): Optional filters, see `filters.apply_filters`. Counts and sums are still scaled by
+                the whole table's sampling rate, so they estimate the filtered population.
+
+        Returns:
+            tuple: The estimated DataFrame (see `estimate`; insights without aggregates return the sampled rows)
+                and a dict with the "population" and "sample_rows" it was computed from; (None, None) if the
+                insight has no approximate version or the sample is empty.
+        """
+        spec = apply_filters(INSIGHT_SPECS[name], filters)
+        sampled = sampled_source(spec)
+        if sampled is None:
+            return None, None
+        table, source = sampled
+        population, sample_rows = SampleManager(self.connection, table).get_state()
+        if not sample_rows or not population:
+            return None, None
+
+        if spec.get("histogram"):
+            # Histograms are binned on the sample and their bin counts scaled like COUNT aggregates.
+            sql = build_query(dict(spec, source=source))
+        else:
+            sql = build_sample_query(spec, source)
+        params = query_params(spec)
+        key = result_cache.make_key(
+            self.connection, f"{name}@sample", sql, (population,) + (params or ())
+        )
+        result = result_cache.get(key)
+        if result is None:
+            self.logger.debug(
+                "Estimating insight '%s' from %d of %d rows",
+                name,
+                sample_rows,
+                population,
+            )
+            frame = fetch_dataframe(self.connection, sql, params)
+            if spec.get("histogram"):
+                bins = [
+                    (column, column)
+                    for column in frame.columns
+                    if column != "frequency"
+                ]
+                result = estimate(
+                    {"group_by": bins, "aggregates": [("frequency", "COUNT", "*")]},
+                    frame.rename(columns={"frequency": "frequency__n"}),
+                    population,
+                    sample_rows,
+                    self.z,
+                )
+            elif spec.get("aggregates"):
+                result = estimate(spec, frame, population, sample_rows, self.z)
+            else:
+                result = frame
+            result_cache.put(key, result)
+        return result, {"population": population, "sample_rows": sample_rows}
@@ -0,0 +1,99 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pymysql
+
+from insights.insights_manager import InsightsManager
+from insights.query_planner import plan_insights
+from insights.query_runner import is_timeout
+from insights.rollup_manager import RollupManager
+
+
+class DashboardRunner:
+    """
+    Computes many insights concurrently on a bounded worker pool over pooled connections.
+
+    Work is dispatched per query plan, so insights computed in a single pass stay together. Every query runs
+    with a server-side `MAX_EXECUTION_TIME` limit, and results are yielded as soon as each plan completes.
+    """
+
+    def __init__(self, pool, max_workers: int = 4, timeout_seconds: float = 30):
+        """
+        Initialize the runner.
+
+        Args:
+            pool (ConnectionPool): The pool the workers take their connections from.
+            max_workers (int): Maximum number of queries running at the same time (capped at the pool size).
+            timeout_seconds (float): Per-query execution time limit, also bounding the wait for a pooled connection.
+        """
+        self.pool = pool
+        self.max_workers = max(1, min(max_workers, pool.max_size))
+        self.timeout_seconds = timeout_seconds
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def _run_plan(self, names, filters):
+        start = time.monotonic()
+        with self.pool.connection(self.timeout_seconds) as connection:
+            results = InsightsManager(connection, self.timeout_seconds).fetch_insights(
+                names, filters
+            )
+        return results, time.monotonic() - start
+
+    def run(self, names=None, filters=None):
+        """
+        Compute insights concurrently, yielding each query plan's outcome as soon as it completes.
+
+        Args:
+            names (list): The insight names (defaults to every insight).
+            filters (dict): Optional filters applied to every insight, see `filters.apply_filters`.
+
+        Yields:
+            dict: The insight names served by the plan, their "results" (name -> DataFrame, empty on failure),
+                the "error" message (None on success) and the query "seconds".
+        """
+        specs = InsightsManager.filtered_specs(filters, names)
+        with self.pool.connection(self.timeout_seconds) as connection:
+            RollupManager(connection).refresh_if_stale()
+
+        plans = [
+            [name for name, _ in plan["insights"]] for plan in plan_insights(specs)
+        ]
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="insight"
+        ) as executor:
+            futures = {
+                executor.submit(self._run_plan, plan_names, filters): plan_names
+                for plan_names in plans
+            }
+            for future in as_completed(futures):
+                outcome = {
+                    "names": futures[future],
+                    "results": {},
+                    "error": None,
+                    "seconds": 0.0,
+                }
+                try:
+                    outcome["results"], outcome["seconds"] = future.result()
+                except Exception as e:
+                    # Any failure (a query error, a pool timeout, a refused budget) stays within its own panel.
+                    timed_out = isinstance(e, pymysql.MySQLError) and is_timeout(e)
+                    outcome["error"] = (
+                        f"timed out after {self.timeout_seconds:g}s"
+                        if timed_out
+                        else str(e)
+                    )
+                    self.logger.error(
+                        "Error computing insight(s) %s: %s", futures[future], e
+                    )
+                yield outcome
@@ -0,0 +1,226 @@
+import math
+
+import numpy as np
+
+# Line series are pre-aggregated in SQL into this many buckets per point of the row budget, so LTTB still has
+# the shape of the series to choose from.
+LTTB_OVERSAMPLING = 4
+DOWNSAMPLING_METHODS = ("line", "scatter", "top")
+
+
+def lttb(x, y, threshold):
+    """
+    Downsamples a line series with Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept; every bucket in between contributes the point forming the largest
+    triangle with the previously selected point and the average of the next bucket, which preserves peaks and
+    the visual shape of the series far better than striding.
+
+    Args:
+        x (np.ndarray): The x values, sorted ascending.
+        y (np.ndarray): The y values.
+        threshold (int): The number of points to keep.
+
+    Returns:
+        np.ndarray: The indices of the selected points, ascending.
+    """
+    size = len(x)
+    threshold = max(threshold, 3)
+    if threshold >= size:
+        return np.arange(size)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = np.nanmean(y[stop:next_stop]) if next_stop > stop else y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = (
+            start + int(np.nanargmax(areas)) if not np.all(np.isnan(areas)) else start
+        )
+        selected[bucket + 1] = previous
+    return selected
+
+
+def density_sample(x, y, budget, grid_size: int = 32, seed: int = 0):
+    """
+    Sample scatter points so that the sample keeps the density of the full cloud and its sparse regions.
+
+    Points are assigned to a grid; every occupied cell keeps at least one point (so outliers stay visible) and
+    the rest of the budget is shared between cells in proportion to their point counts.
+
+    Args:
+        x (np.ndarray): The x values.
+        y (np.ndarray): The y values.
+        budget (int): The maximum number of points to keep.
+        grid_size (int): Number of grid cells along each axis.
+        seed (int): Seed of the random generator, so reruns show the same points.
+
+    Returns:
+        np.ndarray: The indices of the selected points, ascending.
+    """
+    size = len(x)
+    if size <= budget:
+        return np.arange(size)
+    cells = _grid_cells(
+        np.asarray(x, dtype=float), grid_size
+    ) * grid_size + _grid_cells(np.asarray(y, dtype=float), grid_size)
+    order = np.random.default_rng(seed).permutation(size)
+    order = order[np.argsort(cells[order], kind="stable")]
+    _, starts, counts = np.unique(cells[order], return_index=True, return_counts=True)
+    quota = np.maximum(1, np.floor(counts * budget / size)).astype(np.int64)
+    if quota.sum() > budget:
+        # More occupied cells than the budget: keep one point of the most populated cells.
+        quota = np.zeros_like(quota)
+        quota[np.argsort(-counts, kind="stable")[:budget]] = 1
+    selected = np.concatenate(
+        [order[start : start + take] for start, take in zip(starts, quota, strict=True)]
+    )
+    return np.sort(selected)
+
+
+def _grid_cells(values, grid_size):
+    low, high = np.nanmin(values), np.nanmax(values)
+    span = high - low if high > low else 1.0
+    return np.clip(
+        np.nan_to_num((values - low) / span * grid_size, nan=0).astype(np.int64),
+        0,
+        grid_size - 1,
+    )
+
+
+def downsample_frame(df, spec, row_budget=None):
+    """
+    Reduces an already fetched insight result to the row budget of its chart.
+
+    Args:
+        df (pd.DataFrame): The insight result.
+        spec (dict): The insight spec; its "downsample" entry holds the "method" (see DOWNSAMPLING_METHODS),
+            the "x" and "y" columns and the default "row_budget".
+        row_budget (int): Overrides the spec's row budget.
+
+    Returns:
+        pd.DataFrame: The result itself when it fits the budget or the insight is not downsampled, otherwise
+            the selected rows.
+    """
+    options = spec.get("downsample")
+    if not options:
+        return df
+    budget = row_budget or options["row_budget"]
+    if len(df) <= budget:
+        return df
+    if options["method"] == "top":
+        return df.head(budget)
+    x, y = (
+        df[options["x"]].to_numpy(dtype=float),
+        df[options["y"]].to_numpy(dtype=float),
+    )
+    if options["method"] == "line":
+        df = df.iloc[np.argsort(x, kind="stable")]
+        return df.iloc[
+            lttb(
+                df[options["x"]].to_numpy(dtype=float),
+                df[options["y"]].to_numpy(dtype=float),
+                budget,
+            )
+        ].reset_index(drop=True)
+    return df.iloc[density_sample(x, y, budget)].reset_index(drop=True)
+
+
+def bucketed_line_query(query, x, y, row_budget, buckets):
+    """
+    Wrap an insight query so the database averages its line series into at most `buckets` x-ranges.
+
+    The row count and the x range come from window functions over the insight query, so one query both
+    measures and reduces the series; a series within `row_budget` rows is returned whole, one row per point.
+
+    Args:
+        query (str): The insight query.
+        x (str): The x column of the result.
+        y (str): The y column of the result.
+        row_budget (int): The number of rows up to which the series is not bucketed.
+        buckets (int): The number of buckets.
+
+    Returns:
+        tuple: The SQL and its parameters; each row holds the first x of a bucket, the average y and the
+            "total_rows" of the full series.
+    """
+    sql = (
+        f"SELECT MIN({x}) AS {x}, AVG({y}) AS {y}, MAX(total_rows) AS total_rows FROM ("  # noqa: S608  # columns from the chart spec
+        f"SELECT {x}, {y}, COUNT(*) OVER () AS total_rows, ROW_NUMBER() OVER (ORDER BY {x}) AS row_index, "
+        f"MIN({x}) OVER () AS x_low, MAX({x}) OVER () AS x_high FROM ({query.rstrip(';')}) AS insight) AS bounded "
+        f"GROUP BY IF(total_rows <= %s, row_index, "
+        f"LEAST(FLOOR(({x} - x_low) / IF(x_high > x_low, (x_high - x_low) / %s, 1)), %s)) ORDER BY {x};"
+    )
+    return sql, (row_budget, buckets, buckets - 1)
+
+
+def binned_scatter_query(query, x, y, budget):
+    """
+    Wrap an insight query so the database aggregates its scatter points into a grid of at most `budget` cells.
+
+    Each row holds the centroid of a cell's points and their count, to be drawn as a point sized by the count.
+    The bounds of the grid come from window functions over the insight query; scatters within the budget are
+    returned whole, one point per row.
+
+    Args:
+        query (str): The insight query.
+        x (str): The x column of the result.
+        y (str): The y column of the result.
+        budget (int): The maximum number of cells.
+
+    Returns:
+        tuple: The SQL and its parameters; every row also holds the "total_rows" of the full result.
+    """
+    cells = max(1, math.isqrt(budget))
+
+    def cell(column, within_budget):
+        # Within the budget, every row is its own group.
+        return (
+            f"IF(total_rows <= %s, {within_budget}, LEAST(FLOOR(({column} - {column}_low) / "
+            f"IF({column}_high > {column}_low, ({column}_high - {column}_low) / %s, 1)), %s))"
+        )
+
+    sql = (
+        f"SELECT AVG({x}) AS {x}, AVG({y}) AS {y}, COUNT(*) AS points, MAX(total_rows) AS total_rows FROM ("  # noqa: S608  # columns from the chart spec
+        f"SELECT {x}, {y}, COUNT(*) OVER () AS total_rows, ROW_NUMBER() OVER () AS row_index, "
+        f"MIN({x}) OVER () AS {x}_low, MAX({x}) OVER () AS {x}_high, "
+        f"MIN({y}) OVER () AS {y}_low, MAX({y}) OVER () AS {y}_high "
+        f"FROM ({query.rstrip(';')}) AS insight) AS bounded "
+        f"GROUP BY {cell(x, 'row_index')}, {cell(y, 0)};"
+    )
+    return sql, (budget, cells, cells - 1) * 2
+
+
+def top_rows_query(query, order_by, budget):
+    """
+    Wrap an insight query so the database returns only its first `budget` rows with the row count of the whole.
+
+    Args:
+        query (str): The insight query.
+        order_by (list): The insight's (column, ascending) ordering, see `query_planner.build_query`.
+        budget (int): The maximum number of rows.
+
+    Returns:
+        tuple: The SQL and its parameters; every row also holds the "total_rows" of the full result.
+    """
+    order = (
+        " ORDER BY "
+        + ", ".join(
+            f"{column} {'ASC' if ascending else 'DESC'}"
+            for column, ascending in order_by
+        )
+        if order_by
+        else ""
+    )
+    sql = f"SELECT insight.*, COUNT(*) OVER () AS total_rows FROM ({query.rstrip(';')}) AS insight{order} LIMIT %s;"  # noqa: S608  # columns from the chart spec
+    return sql, (budget,)
@@ -0,0 +1,202 @@
+import datetime
+
+from insights.rollup_manager import DAILY_ROLLUP_TABLE, MONTHLY_ROLLUP_TABLE
+
+GRANULARITIES = ("hour", "day", "week", "month")
+# Dimensions insights can be filtered on: columns of the orders table.
+FILTER_DIMENSIONS = ("status", "payment_mode", "restaurant_id")
+# The column each source table is windowed on.
+TIME_COLUMNS = {
+    "orders": "order_date",
+    "customers": "signup_date",
+    DAILY_ROLLUP_TABLE: "order_day",
+    MONTHLY_ROLLUP_TABLE: "order_month",
+}
+# Dimensions available in the rollup tables; other dimensions need the orders table.
+ROLLUP_DIMENSIONS = ("status",)
+
+
+def time_bucket(column, granularity):
+    """
+    Return the SQL expression truncating a date or datetime column to a granularity.
+
+    The expressions avoid DATE_FORMAT, whose `%` patterns would clash with the query parameters.
+
+    Args:
+        column (str): The column.
+        granularity (str): One of GRANULARITIES.
+
+    Returns:
+        str: The expression; hours and days are datetimes and dates, weeks the date of their Monday and months
+            "YYYY-MM" strings, matching the monthly rollup.
+    """
+    if granularity == "hour":
+        return f"DATE_ADD(DATE({column}), INTERVAL HOUR({column}) HOUR)"
+    if granularity == "day":
+        return f"DATE({column})"
+    if granularity == "week":
+        return f"DATE_SUB(DATE({column}), INTERVAL WEEKDAY({column}) DAY)"
+    if granularity == "month":
+        return f"LEFT({column}, 7)"
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def _source_tables(source):
+    """Return table -> column prefix ("alias." or "") for the tables of a FROM clause."""
+    tokens = source.split()
+    tables = {}
+    for index, token in enumerate(tokens):
+        if index == 0 or tokens[index - 1].upper() == "JOIN":
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            has_alias = following is not None and following.upper() not in (
+                "JOIN",
+                "ON",
+            )
+            tables[token] = f"{following}." if has_alias else ""
+    return tables
+
+
+def _is_midnight(value):
+    return not isinstance(value, datetime.datetime) or value.time() == datetime.time()
+
+
+def _rollup_fits(table, start, end, granularity, dimensions):
+    """Return whether a rollup table can answer a filtered insight."""
+    if set(dimensions) - set(ROLLUP_DIMENSIONS) or granularity == "hour":
+        return False
+    if not all(_is_midnight(value) for value in (start, end) if value is not None):
+        return False
+    if table == MONTHLY_ROLLUP_TABLE:
+        return granularity in (None, "month") and all(
+            value.day == 1 for value in (start, end) if value is not None
+        )
+    return True
+
+
+def _window(column, start, end, table):
+    """Return the sargable range predicates and parameters of a time window on a column."""
+    if table == MONTHLY_ROLLUP_TABLE:
+        start, end = (
+            value.strftime("%Y-%m") if value is not None else None
+            for value in (start, end)
+        )
+    elif table == DAILY_ROLLUP_TABLE:
+        start, end = (
+            value.date() if isinstance(value, datetime.datetime) else value
+            for value in (start, end)
+        )
+    predicates, params = [], []
+    if start is not None:
+        predicates.append(f"{column} >= %s")
+        params.append(start)
+    if end is not None:
+        predicates.append(f"{column} < %s")
+        params.append(end)
+    return predicates, params
+
+
+def _order_predicates(prefix, start, end, dimensions):
+    predicates, params = _window(f"{prefix}order_date", start, end, "orders")
+    for dimension, values in dimensions.items():
+        predicates.append(f"{prefix}{dimension} IN ({', '.join(['%s'] * len(values))})")
+        params.extend(values)
+    return predicates, params
+
+
+def apply_filters(spec, filters):
+    """
+    Restricts an insight spec to a time window and dimension values, and re-buckets time series.
+
+    The window becomes `column >= %s AND column < %s` range predicates on the source's own date column (or on
+    the orders the rows belong to, through an `order_id IN (...)` semi-join), so they can use an index on the
+    column or prune range partitions instead of scanning the whole history. Time-series insights served from
+    the rollups move to the daily rollup or to the orders table (their "base" definition) when the monthly
+    rollup or any rollup cannot answer the window, granularity or dimensions. Dimension filters do not apply
+    to insights over the customers table, which has none of the dimensions.
+
+    Args:
+        spec (dict): The insight spec, see `query_planner.build_query`.
+        filters (dict): Optional "start" (inclusive) and "end" (exclusive) dates or datetimes, "granularity"
+            (one of GRANULARITIES, for time-series insights) and "dimensions" (dimension -> list of values,
+            see FILTER_DIMENSIONS).
+
+    Returns:
+        dict: The filtered spec, with the predicates and their parameters in its "where" entry; the spec itself
+            when there is nothing to apply.
+    """
+    if not filters:
+        return spec
+    start, end = filters.get("start"), filters.get("end")
+    dimensions = {
+        dimension: list(values)
+        for dimension, values in (filters.get("dimensions") or {}).items()
+        if values
+    }
+    unknown = set(dimensions) - set(FILTER_DIMENSIONS)
+    if unknown:
+        raise ValueError(
+            f"Unsupported filter dimension(s): {', '.join(sorted(unknown))}"
+        )
+    granularity = filters.get("granularity") if spec.get("granularity") else None
+    if (
+        start is None
+        and end is None
+        and not dimensions
+        and granularity in (None, spec.get("granularity"))
+    ):
+        return spec
+
+    spec = dict(spec)
+    table = original_table = spec["source"].split()[0]
+    if table in (DAILY_ROLLUP_TABLE, MONTHLY_ROLLUP_TABLE) and not _rollup_fits(
+        table, start, end, granularity, dimensions
+    ):
+        if _rollup_fits(DAILY_ROLLUP_TABLE, start, end, granularity, dimensions):
+            spec["source"] = table = DAILY_ROLLUP_TABLE
+        else:
+            spec.update(spec["base"])
+            table = spec["source"].split()[0]
+
+    tables = _source_tables(spec["source"])
+    granularity = granularity or spec.get("granularity")
+    if granularity and (granularity != spec["granularity"] or table != original_table):
+        alias, _ = spec["group_by"][0]
+        new_alias = f"{alias.rsplit('_', 1)[0]}_{granularity}"
+        column = f"{tables[table]}{TIME_COLUMNS[table]}"
+        expression = (
+            column
+            if table == MONTHLY_ROLLUP_TABLE
+            else time_bucket(column, granularity)
+        )
+        spec["group_by"] = [(new_alias, expression)] + spec["group_by"][1:]
+        spec["order_by"] = [
+            (new_alias if order_alias == alias else order_alias, ascending)
+            for order_alias, ascending in spec.get("order_by", [])
+        ]
+
+    if "orders" in tables:
+        predicates, params = _order_predicates(tables["orders"], start, end, dimensions)
+    elif table == "deliveries":
+        predicates, params = _order_predicates("", start, end, dimensions)
+        if predicates:
+            predicates = [
+                f"{tables['deliveries']}order_id IN (SELECT order_id FROM orders "  # noqa: S608  # alias prefix from the spec
+                f"WHERE {' AND '.join(predicates)})"
+            ]
+    elif table in TIME_COLUMNS:
+        predicates, params = _window(
+            f"{tables[table]}{TIME_COLUMNS[table]}", start, end, table
+        )
+        if "status" in dimensions and table != "customers":
+            predicates.append(
+                f"status IN ({', '.join(['%s'] * len(dimensions['status']))})"
+            )
+            params.extend(dimensions["status"])
+    else:
+        predicates, params = [], []
+    if table == "orders" and original_table != table and start is None:
+        # The rollups leave out orders without a date.
+        predicates.insert(0, f"{tables['orders']}order_date IS NOT NULL")
+    if predicates:
+        spec["where"] = (" AND ".join(predicates), tuple(params))
+    return spec
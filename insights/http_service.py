@@ -0,0 +1,416 @@
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pymysql
+
+from db.change_log import CHANGE_LOG_TABLE, ChangeLog
+from db.connection import DatabaseConnector
+from db.write_versions import write_versions
+from insights.filters import FILTER_DIMENSIONS, GRANULARITIES
+from insights.insights_manager import INSIGHT_SPECS, InsightsManager
+from insights.plan_inspector import QueryBudgetExceeded
+from insights.query_planner import build_query
+from insights.query_runner import is_timeout
+from insights.result_cache import tables_in_query
+from insights.rollup_manager import ROLLUP_TABLES
+
+RESPONSE_FORMATS = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+INTEGER_DIMENSIONS = ("restaurant_id",)
+
+
+def parse_filters(query):
+    """
+    Turn the query string of an insight request into filters for `InsightsManager`.
+
+    Args:
+        query (dict): Parsed query string (name -> list of values), with optional "start" and "end" ISO dates or
+            datetimes (end exclusive), a "granularity" and comma-separated or repeated dimension values.
+
+    Returns:
+        dict: The filters, see `filters.apply_filters`, or None when none is given.
+
+    Raises:
+        ValueError: If a value is malformed.
+    """
+    filters = {"dimensions": {}}
+    for bound in ("start", "end"):
+        if query.get(bound):
+            filters[bound] = datetime.datetime.fromisoformat(query[bound][-1])
+    if query.get("granularity"):
+        granularity = query["granularity"][-1]
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        filters["granularity"] = granularity
+    for dimension in FILTER_DIMENSIONS:
+        values = [
+            value
+            for item in query.get(dimension, [])
+            for value in item.split(",")
+            if value
+        ]
+        if values:
+            filters["dimensions"][dimension] = (
+                [int(value) for value in values]
+                if dimension in INTEGER_DIMENSIONS
+                else values
+            )
+    if len(filters) == 1 and not filters["dimensions"]:
+        return None
+    return filters
+
+
+def to_arrow(df):
+    """Serialize a DataFrame as an Arrow IPC stream."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError("Arrow responses require the 'pyarrow' package") from e
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class InsightsService:
+    """
+    Serves insights over HTTP as JSON or Arrow, for tools and dashboards other than the Streamlit app.
+
+    Every response carries an ETag and a Last-Modified date derived from the versions of the tables the insight
+    reads: the write versions of this process combined with the latest change log sequence of each table, so
+    writes made by other processes (the app, imports) are seen too. Conditional requests are answered with
+    304 Not Modified before any insight query runs, which makes polling cheap. When the change log shows new
+    writes to a table, its write version is bumped here, so the shared result cache drops the stale results.
+    """
+
+    def __init__(
+        self, connector, timeout_seconds: float = 30, cost_budget: float = None
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            connector (DatabaseConnector): Connector to the database; requests run on its connection pool.
+            timeout_seconds (float): Execution time limit of every insight query, also bounding the wait for a
+                pooled connection (503 when none becomes free).
+            cost_budget (float): Optional maximum estimated query cost, see `InsightsManager.fetch_insights`.
+        """
+        self.pool = connector.get_pool()
+        self.timeout_seconds = timeout_seconds
+        self.cost_budget = cost_budget
+        # Table -> (change log sequence, write version, time the pair was first seen).
+        self._versions = {}
+        self._versions_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    @staticmethod
+    def insight_tables(name, filters=None):
+        """
+        Return the tables whose writes change an insight's result, including `orders` behind the rollups.
+
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+            filters (dict): Optional filters, see `filters.apply_filters`.
+
+        Returns:
+            list: The table names, sorted.
+        """
+        tables = set(
+            tables_in_query(
+                build_query(InsightsManager.filtered_specs(filters, [name])[name])
+            )
+        )
+        if tables & set(ROLLUP_TABLES):
+            tables.add("orders")
+        return sorted(tables)
+
+    def _change_log_state(self, connection, tables):
+        if not ChangeLog(connection).is_enabled():
+            return {}
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT table_name, MAX(seq), UNIX_TIMESTAMP(MAX(changed_at)) FROM {CHANGE_LOG_TABLE} "  # noqa: S608  # constant table name
+                    f"WHERE table_name IN ({', '.join(['%s'] * len(tables))}) GROUP BY table_name;",
+                    tables,
+                )
+                return {
+                    table_name: (int(seq), float(changed_at))
+                    for table_name, seq, changed_at in cursor.fetchall()
+                }
+        except pymysql.MySQLError as e:
+            self.logger.error("Error reading the change log state: %s", e)
+            raise e
+
+    def table_versions(self, connection, tables):
+        """
+        Return the current versions of tables and when the newest of them last changed.
+
+        Args:
+            connection (pymysql.connections.Connection): Connection used to read the change log.
+            tables (list): The table names.
+
+        Returns:
+            tuple: (table, change log sequence, write version) triples and the modification time as a Unix
+                timestamp (for tables without change log entries, when the service first saw their version).
+        """
+        state = self._change_log_state(connection, tables)
+        versions = []
+        with self._versions_lock:
+            for table_name in tables:
+                sequence, changed_at = state.get(table_name, (0, None))
+                known = self._versions.get(table_name)
+                if known is not None and known[0] != sequence:
+                    # Written by another process: results cached by this one are stale.
+                    write_versions.bump(table_name)
+                version = write_versions.get(table_name)
+                if known is None or known[:2] != (sequence, version):
+                    self._versions[table_name] = (
+                        sequence,
+                        version,
+                        changed_at or time.time(),
+                    )
+                versions.append((table_name, sequence, version))
+            modified = max(self._versions[table_name][2] for table_name in tables)
+        return tuple(versions), modified
+
+    def handle(self, path, query, headers):
+        """
+        Answers a GET request.
+
+        Routes: `/insights` lists the insights; `/insights/<name>` returns one, filtered by the query string (see
+        `parse_filters`), as JSON (the default) or as an Arrow stream with `format=arrow` or an
+        `Accept: application/vnd.apache.arrow.stream` header.
+
+        Args:
+            path (str): The request path.
+            query (dict): The parsed query string.
+            headers (Message): The request headers.
+
+        Returns:
+            tuple: The status code, the response headers (dict) and the body (bytes).
+        """
+        try:
+            return self._respond(path, query, headers)
+        except TimeoutError as e:
+            self.logger.warning("No connection available for %s: %s", path, e)
+            return self._error(503, str(e))
+        except Exception as e:
+            self.logger.error("Error handling %s: %s", path, e)
+            return self._error(500, f"Internal error: {e}")
+
+    def _respond(self, path, query, headers):
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        if parts == ["insights"]:
+            listing = [
+                {
+                    "name": name,
+                    "title": spec["title"],
+                    "chart_type": spec["chart_type"],
+                    "description": spec["description"],
+                }
+                for name, spec in INSIGHT_SPECS.items()
+            ]
+            return (
+                200,
+                {"Content-Type": RESPONSE_FORMATS["json"]},
+                json.dumps(listing).encode(),
+            )
+        if len(parts) != 2 or parts[0] != "insights":
+            return self._error(404, f"Not found: {path}")
+        name = parts[1]
+        if name not in INSIGHT_SPECS:
+            return self._error(404, f"Unknown insight: {name}")
+
+        response_format = query.get("format", [None])[-1]
+        if response_format is None:
+            response_format = (
+                "arrow"
+                if RESPONSE_FORMATS["arrow"] in headers.get("Accept", "")
+                else "json"
+            )
+        if response_format not in RESPONSE_FORMATS:
+            return self._error(400, f"Unsupported format: {response_format}")
+        try:
+            filters = parse_filters(query)
+        except ValueError as e:
+            return self._error(400, str(e))
+
+        with self.pool.connection(self.timeout_seconds) as connection:
+            tables = self.insight_tables(name, filters)
+            versions, modified = self.table_versions(connection, tables)
+            identity = json.dumps(
+                [
+                    name,
+                    response_format,
+                    sorted(
+                        (key, value) for key, value in query.items() if key != "format"
+                    ),
+                    versions,
+                ],
+                default=str,
+            )
+            etag = f'"{hashlib.sha1(identity.encode(), usedforsecurity=False).hexdigest()[:20]}"'
+            cache_headers = {
+                "ETag": etag,
+                "Last-Modified": formatdate(modified, usegmt=True),
+                "Cache-Control": "no-cache",
+            }
+            if self._not_modified(headers, etag, modified):
+                return 304, cache_headers, b""
+
+            try:
+                df = InsightsManager(connection, self.timeout_seconds).fetch_insight(
+                    name, filters, self.cost_budget
+                )
+            except QueryBudgetExceeded as e:
+                return self._error(422, str(e))
+            except pymysql.MySQLError as e:
+                if is_timeout(e):
+                    return self._error(
+                        504,
+                        f"Insight '{name}' timed out after {self.timeout_seconds:g} seconds",
+                    )
+                self.logger.error("Error computing insight '%s': %s", name, e)
+                return self._error(500, str(e))
+
+        if response_format == "arrow":
+            try:
+                body = to_arrow(df)
+            except RuntimeError as e:
+                return self._error(406, str(e))
+        else:
+            body = (
+                f'{{"name": {json.dumps(name)}, "title": {json.dumps(INSIGHT_SPECS[name]["title"])}, '
+                f'"rows": {len(df)}, "data": {df.to_json(orient="records", date_format="iso")}}}'
+            ).encode()
+        return (
+            200,
+            dict(cache_headers, **{"Content-Type": RESPONSE_FORMATS[response_format]}),
+            body,
+        )
+
+    @staticmethod
+    def _not_modified(headers, etag, modified):
+        if headers.get("If-None-Match"):
+            return (
+                etag in [tag.strip() for tag in headers["If-None-Match"].split(",")]
+                or headers["If-None-Match"].strip() == "*"
+            )
+        if headers.get("If-Modified-Since"):
+            try:
+                since = parsedate_to_datetime(headers["If-Modified-Since"]).timestamp()
+            except (TypeError, ValueError):
+                return False
+            # HTTP dates have a resolution of one second.
+            return int(modified) <= since
+        return False
+
+    @staticmethod
+    def _error(status, message):
+        return (
+            status,
+            {"Content-Type": RESPONSE_FORMATS["json"]},
+            json.dumps({"error": message}).encode(),
+        )
+
+    def make_server(self, host="127.0.0.1", port=8080):
+        """
+        Create the HTTP server, handling each request on its own thread.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on.
+
+        Returns:
+            ThreadingHTTPServer: The server; call `serve_forever` to run it.
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                status, headers, body = service.handle(
+                    url.path, parse_qs(url.query), self.headers
+                )
+                self.send_response(status)
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                service.logger.info("%s - %s", self.address_string(), format % args)
+
+        return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve insights over HTTP as JSON or Arrow."
+    )
+    parser.add_argument("--listen", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db-host", default=os.environ.get("MYSQL_HOST", "localhost"))
+    parser.add_argument(
+        "--db-port", type=int, default=int(os.environ.get("MYSQL_PORT", 3306))
+    )
+    parser.add_argument("--db-user", default=os.environ.get("MYSQL_USER", "root"))
+    parser.add_argument("--db-password", default=os.environ.get("MYSQL_PASSWORD", ""))
+    parser.add_argument(
+        "--database", default=os.environ.get("MYSQL_DATABASE", "zomato_db")
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="Per-query execution time limit in seconds.",
+    )
+    parser.add_argument(
+        "--cost-budget", type=float, help="Maximum estimated cost of an insight query."
+    )
+    args = parser.parse_args(argv)
+
+    connector = DatabaseConnector(
+        args.db_host, args.db_port, args.db_user, args.db_password, args.database
+    )
+    service = InsightsService(connector, args.timeout, args.cost_budget)
+    server = service.make_server(args.listen, args.port)
+    service.logger.info(
+        "Serving insights on http://%s:%d/insights",
+        args.listen,
+        server.server_address[1],
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,373 +1,707 @@
 import logging
 
+from db.columnar_fetch import fetch_dataframe
+from insights.downsampling import (
+    LTTB_OVERSAMPLING,
+    binned_scatter_query,
+    bucketed_line_query,
+    downsample_frame,
+    lttb,
+    top_rows_query,
+)
+from insights.filters import FILTER_DIMENSIONS, apply_filters
+from insights.plan_inspector import PlanInspector, QueryBudgetExceeded
+from insights.query_planner import (
+    build_query,
+    fan_out,
+    histogram_query,
+    plan_insights,
+    query_params,
+)
+from insights.query_runner import with_max_execution_time
+from insights.result_cache import result_cache, tables_in_query
+from insights.rollup_manager import ROLLUP_TABLES, RollupManager
+
+DELIVERY_MINUTES = "TIMESTAMPDIFF(MINUTE, order_date, delivery_time)"
+ORDERS_WITH_RESTAURANTS = "orders o JOIN restaurants r ON o.restaurant_id = r.restaurant_id"
+ORDERS_WITH_CUSTOMERS = "orders o JOIN customers c ON o.customer_id = c.customer_id"
+
+# Declarative insight definitions, in display order; see `query_planner.build_query` for the spec format.
+# Insights that aggregate the same source by the same keys are computed together in a single pass.
+# Insights returning one row per entity carry a "downsample" entry bounding the rows their chart receives,
+# see `InsightsManager.fetch_chart_data`. Time series name the "granularity" of their first grouping key, and
+# those served from the rollups their "base" definition over the orders table, see `filters.apply_filters`.
+INSIGHT_SPECS = {
+    # 1. Total orders per day
+    "total_orders_per_day": {
+        "title": "Total orders per day",
+        "source": "orders_daily",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("total_orders", "SUM", "order_count")],
+        "order_by": [("order_day", True)],
+        # For a trend over time, we use a line chart.
+        "granularity": "day",
+        "base": {"source": "orders", "aggregates": [("total_orders", "COUNT", "*")]},
+        "chart_type": "line_chart",
+        "description": "Total number of orders per day.",
+    },
+    # 2. Total revenue per day
+    "total_revenue_per_day": {
+        "title": "Total revenue per day",
+        "source": "orders_daily",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("total_revenue", "SUM", "amount_sum")],
+        "order_by": [("order_day", True)],
+        "granularity": "day",
+        "base": {"source": "orders", "aggregates": [("total_revenue", "SUM", "total_amount")]},
+        "chart_type": "line_chart",
+        "description": "Total revenue per day.",
+    },
+    # 3. Average order value per day
+    "avg_order_value_per_day": {
+        "title": "Average order value per day",
+        "source": "orders_daily",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("avg_order_value", "RATIO", ("amount_sum", "amount_count"))],
+        "order_by": [("order_day", True)],
+        "granularity": "day",
+        "base": {"source": "orders", "aggregates": [("avg_order_value", "AVG", "total_amount")]},
+        "chart_type": "line_chart",
+        "description": "Average order value per day.",
+    },
+    # 4. Total orders per month
+    "orders_per_month": {
+        "title": "Total orders per month",
+        "source": "orders_monthly",
+        "group_by": [("order_month", "order_month")],
+        "aggregates": [("total_orders", "SUM", "order_count")],
+        "order_by": [("order_month", True)],
+        "granularity": "month",
+        "base": {"source": "orders", "aggregates": [("total_orders", "COUNT", "*")]},
+        "chart_type": "bar_chart",
+        "description": "Total orders per month.",
+    },
+    # 5. Total revenue per month
+    "revenue_per_month": {
+        "title": "Total revenue per month",
+        "source": "orders_monthly",
+        "group_by": [("order_month", "order_month")],
+        "aggregates": [("total_revenue", "SUM", "amount_sum")],
+        "order_by": [("order_month", True)],
+        "granularity": "month",
+        "base": {"source": "orders", "aggregates": [("total_revenue", "SUM", "total_amount")]},
+        "chart_type": "bar_chart",
+        "description": "Total revenue per month.",
+    },
+    # 6. Top 5 restaurants by order count
+    "top_restaurants_by_orders": {
+        "title": "Top 5 restaurants by order count",
+        "source": "orders",
+        "group_by": [("restaurant_id", "restaurant_id")],
+        "aggregates": [("orders_count", "COUNT", "*")],
+        "order_by": [("orders_count", False)],
+        "limit": 5,
+        "chart_type": "bar_chart",
+        "description": "Top 5 restaurants by order count.",
+    },
+    # 7. Top 5 restaurants by revenue
+    "top_restaurants_by_revenue": {
+        "title": "Top 5 restaurants by revenue",
+        "source": "orders",
+        "group_by": [("restaurant_id", "restaurant_id")],
+        "aggregates": [("revenue", "SUM", "total_amount")],
+        "order_by": [("revenue", False)],
+        "limit": 5,
+        "chart_type": "bar_chart",
+        "description": "Top 5 restaurants by revenue.",
+    },
+    # 8. Orders distribution by cuisine type
+    "orders_by_cuisine": {
+        "title": "Orders distribution by cuisine type",
+        "source": ORDERS_WITH_RESTAURANTS,
+        "group_by": [("cuisine_type", "r.cuisine_type")],
+        "aggregates": [("orders_count", "COUNT", "*")],
+        "chart_type": "bar_chart",
+        "description": "Orders distribution by cuisine type.",
+    },
+    # 9. Average delivery time per restaurant
+    "avg_delivery_time_per_restaurant": {
+        "title": "Average delivery time per restaurant",
+        "source": "orders",
+        "group_by": [("restaurant_id", "restaurant_id")],
+        "aggregates": [("avg_delivery_time", "AVG", DELIVERY_MINUTES)],
+        "filter": "status = 'delivered'",
+        "chart_type": "bar_chart",
+        "description": "Average delivery time per restaurant (in minutes).",
+    },
+    # 10. Delivery status distribution
+    "delivery_status_distribution": {
+        "title": "Delivery status distribution",
+        "source": "deliveries",
+        "group_by": [("delivery_status", "delivery_status")],
+        "aggregates": [("count", "COUNT", "*")],
+        "chart_type": "bar_chart",
+        "description": "Distribution of delivery statuses.",
+    },
+    # 11. Average feedback rating per restaurant
+    "avg_feedback_rating_per_restaurant": {
+        "title": "Average feedback rating per restaurant",
+        "source": "orders",
+        "group_by": [("restaurant_id", "restaurant_id")],
+        "aggregates": [("avg_feedback", "AVG", "feedback_rating")],
+        "chart_type": "bar_chart",
+        "description": "Average feedback rating per restaurant.",
+    },
+    # 12. Top 5 customers by order count
+    "top_customers_by_orders": {
+        "title": "Top 5 customers by order count",
+        "source": "orders",
+        "group_by": [("customer_id", "customer_id")],
+        "aggregates": [("orders_count", "COUNT", "*")],
+        "order_by": [("orders_count", False)],
+        "limit": 5,
+        "chart_type": "bar_chart",
+        "description": "Top 5 customers by order count.",
+    },
+    # 13. Order status distribution
+    "order_status_distribution": {
+        "title": "Order status distribution",
+        "source": "orders",
+        "group_by": [("status", "status")],
+        "aggregates": [("count", "COUNT", "*")],
+        "chart_type": "bar_chart",
+        "description": "Order status distribution.",
+    },
+    # 14. Average discount per payment mode
+    "avg_discount_per_payment_mode": {
+        "title": "Average discount per payment mode",
+        "source": "orders",
+        "group_by": [("payment_mode", "payment_mode")],
+        "aggregates": [("avg_discount", "AVG", "discount_applied")],
+        "chart_type": "bar_chart",
+        "description": "Average discount per payment mode.",
+    },
+    # 15. Delivery fee distribution
+    "delivery_fee_distribution": {
+        "title": "Delivery fee distribution",
+        "source": "deliveries",
+        "histogram": {"expression": "delivery_fee", "bins": 20},
+        "chart_type": "bar_chart",
+        "description": "Delivery fee distribution, in 20 equal-width fee ranges.",
+    },
+    # 16. Average order value by customer type (premium vs non-premium)
+    "avg_order_value_by_customer_type": {
+        "title": "Average order value by customer type",
+        "source": ORDERS_WITH_CUSTOMERS,
+        "group_by": [("is_premium", "c.is_premium")],
+        "aggregates": [("avg_order_value", "AVG", "o.total_amount")],
+        "chart_type": "bar_chart",
+        "description": "Average order value by customer type (premium vs non-premium).",
+    },
+    # 17. Daily customer sign-ups
+    "daily_customer_signups": {
+        "title": "Daily customer sign-ups",
+        "source": "customers",
+        "group_by": [("signup_day", "DATE(signup_date)")],
+        "aggregates": [("signups", "COUNT", "*")],
+        "order_by": [("signup_day", True)],
+        "granularity": "day",
+        "chart_type": "line_chart",
+        "description": "Daily customer sign-ups.",
+    },
+    # 18. Orders by payment mode
+    "orders_by_payment_mode": {
+        "title": "Orders by payment mode",
+        "source": "orders",
+        "group_by": [("payment_mode", "payment_mode")],
+        "aggregates": [("orders_count", "COUNT", "*")],
+        "chart_type": "bar_chart",
+        "description": "Orders by payment mode.",
+    },
+    # 19. Average feedback rating per day
+    "avg_feedback_per_day": {
+        "title": "Average feedback rating per day",
+        "source": "orders_daily",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("avg_feedback", "RATIO", ("rating_sum", "rating_count"))],
+        "order_by": [("order_day", True)],
+        "granularity": "day",
+        "base": {"source": "orders", "aggregates": [("avg_feedback", "AVG", "feedback_rating")]},
+        "chart_type": "line_chart",
+        "description": "Average feedback rating per day.",
+    },
+    # 20. Orders by customer location
+    "orders_by_customer_location": {
+        "title": "Orders by customer location",
+        "source": ORDERS_WITH_CUSTOMERS,
+        "group_by": [("location", "c.location")],
+        "aggregates": [("orders_count", "COUNT", "*")],
+        "order_by": [("orders_count", False)],
+        "chart_type": "bar_chart",
+        "description": "Orders by customer location.",
+    },
+    # 21. Average delivery distance per order
+    "avg_delivery_distance_per_order": {
+        "title": "Average delivery distance per order",
+        "source": "deliveries",
+        "group_by": [("order_id", "order_id")],
+        "aggregates": [("avg_distance", "AVG", "distance")],
+        "downsample": {"method": "line", "x": "order_id", "y": "avg_distance", "row_budget": 2000},
+        "chart_type": "line_chart",
+        "description": "Average delivery distance per order.",
+    },
+    # 22. Top 5 delivery persons by number of deliveries
+    "top_delivery_persons_by_deliveries": {
+        "title": "Top 5 delivery persons by deliveries",
+        "source": "deliveries",
+        "group_by": [("delivery_person_id", "delivery_person_id")],
+        "aggregates": [("total_deliveries", "COUNT", "*")],
+        "order_by": [("total_deliveries", False)],
+        "limit": 5,
+        "chart_type": "bar_chart",
+        "description": "Top 5 delivery persons by number of deliveries.",
+    },
+    # 23. Average feedback rating for delivery persons
+    "avg_delivery_rating_for_persons": {
+        "title": "Average feedback rating for delivery persons",
+        "source": "deliveries d JOIN orders o ON d.order_id = o.order_id",
+        "group_by": [("delivery_person_id", "d.delivery_person_id")],
+        "aggregates": [("avg_rating", "AVG", "o.feedback_rating")],
+        "chart_type": "bar_chart",
+        "description": "Average feedback rating for delivery persons.",
+    },
+    # 24. Order delivery status ratio
+    "order_delivery_status_ratio": {
+        "title": "Order delivery status ratio",
+        "source": "orders",
+        "group_by": [("status", "status")],
+        "aggregates": [("count", "COUNT", "*")],
+        "chart_type": "bar_chart",
+        "description": "Order delivery status ratio.",
+    },
+    # 25. Average difference between estimated and actual delivery time
+    "avg_delivery_time_difference": {
+        "title": "Average difference between estimated and actual delivery time",
+        "source": "deliveries",
+        "group_by": [("order_id", "order_id")],
+        "aggregates": [("time_diff", None, "(SUM(estimated_time) - SUM(delivery_time))")],
+        "downsample": {"method": "line", "x": "order_id", "y": "time_diff", "row_budget": 2000},
+        "chart_type": "line_chart",
+        "description": "Average difference (in minutes) between estimated and actual delivery time.",
+    },
+    # 26. Total revenue by restaurant cuisine type
+    "revenue_by_cuisine": {
+        "title": "Total revenue by restaurant cuisine type",
+        "source": ORDERS_WITH_RESTAURANTS,
+        "group_by": [("cuisine_type", "r.cuisine_type")],
+        "aggregates": [("total_revenue", "SUM", "o.total_amount")],
+        "chart_type": "bar_chart",
+        "description": "Total revenue by restaurant cuisine type.",
+    },
+    # 27. Customer order frequency distribution
+    "customer_order_frequency": {
+        "title": "Customer order frequency distribution",
+        "source": "customers",
+        "histogram": {"expression": "total_orders", "width": 1},
+        "chart_type": "bar_chart",
+        "description": "Customer order frequency distribution: the number of customers per order count.",
+    },
+    # 28. Correlation between order value and feedback
+    "order_value_vs_feedback": {
+        "title": "Correlation between order value and feedback",
+        "source": "orders",
+        "columns": [("total_amount", "total_amount"), ("feedback_rating", "feedback_rating")],
+        "filter": "feedback_rating IS NOT NULL",
+        "downsample": {"method": "scatter", "x": "total_amount", "y": "feedback_rating",
+                       "row_budget": 2500},
+        "chart_type": "scatter_chart",
+        "description": "Correlation between order value and feedback rating (Scatter Chart).",
+    },
+    # 29. Comparison of on-time vs delayed deliveries
+    "delivery_success_vs_delay": {
+        "title": "Comparison of on-time vs delayed deliveries",
+        "source": "orders",
+        "group_by": [("delivery_performance",
+                      f"CASE WHEN {DELIVERY_MINUTES} <= 60 THEN 'On Time' ELSE 'Delayed' END")],
+        "aggregates": [("count", "COUNT", "*")],
+        "filter": "status = 'delivered'",
+        "chart_type": "bar_chart",
+        "description": "Comparison of on-time versus delayed deliveries.",
+    },
+    # 30. Daily average delivery time
+    "daily_avg_delivery_time": {
+        "title": "Daily average delivery time",
+        "source": "orders_daily",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("avg_delivery_time", "RATIO", ("delivery_minutes_sum", "delivery_minutes_count"))],
+        "filter": "status = 'delivered'",
+        "order_by": [("order_day", True)],
+        "granularity": "day",
+        "base": {"source": "orders", "aggregates": [("avg_delivery_time", "AVG", DELIVERY_MINUTES)]},
+        "chart_type": "line_chart",
+        "description": "Daily average delivery time.",
+    },
+}
+
 
 class InsightsManager:
-    def __init__(self, connection):
+    def __init__(self, connection, timeout_seconds: float = None):
         """
         Initialize the insights manager with an active database connection.
+
+        Args:
+            connection (pymysql.connections.Connection): Active connection to the MySQL database.
+            timeout_seconds (float): Optional execution time limit of every query, enforced by the server.
         """
         self.connection = connection
+        self.timeout_seconds = timeout_seconds
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
 
-    # 1. Total orders per day
-    def get_insight_total_orders_per_day(self):
-        query = """
-            SELECT DATE(order_date) AS order_day, COUNT(*) AS total_orders
-            FROM orders
-            GROUP BY DATE(order_date)
-            ORDER BY order_day;
+    def _fetch(self, sql, params=None):
+        return fetch_dataframe(self.connection, with_max_execution_time(sql, self.timeout_seconds), params)
+
+    def get_insight(self, name):
         """
-        # For a trend over time, we use a line chart.
-        chart_type = "line_chart"
-        description = "Total number of orders per day."
-        return query, chart_type, description
+        Return the standalone query of an insight with its chart type and description.
 
-    # 2. Total revenue per day
-    def get_insight_total_revenue_per_day(self):
-        query = """
-            SELECT DATE(order_date) AS order_day, SUM(total_amount) AS total_revenue
-            FROM orders
-            GROUP BY DATE(order_date)
-            ORDER BY order_day;
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+
+        Returns:
+            tuple: The query, the default chart type and the description.
         """
-        chart_type = "line_chart"
-        description = "Total revenue per day."
-        return query, chart_type, description
+        spec = INSIGHT_SPECS[name]
+        return build_query(spec), spec["chart_type"], spec["description"]
 
-    # 3. Average order value per day
-    def get_insight_avg_order_value_per_day(self):
-        query = """
-            SELECT DATE(order_date) AS order_day, AVG(total_amount) AS avg_order_value
-            FROM orders
-            GROUP BY DATE(order_date)
-            ORDER BY order_day;
+    @staticmethod
+    def filtered_specs(filters=None, names=None):
         """
-        chart_type = "line_chart"
-        description = "Average order value per day."
-        return query, chart_type, description
+        Return insight specs restricted by the given filters.
 
-    # 4. Total orders per month
-    def get_insight_orders_per_month(self):
-        query = """
-            SELECT DATE_FORMAT(order_date, '%Y-%m') AS order_month, COUNT(*) AS total_orders
-            FROM orders
-            GROUP BY DATE_FORMAT(order_date, '%Y-%m')
-            ORDER BY order_month;
+        Args:
+            filters (dict): Time window, granularity and dimension filters, see `filters.apply_filters`.
+            names (list): The insight names (defaults to every insight).
+
+        Returns:
+            dict: Insight name -> filtered spec.
         """
-        chart_type = "bar_chart"
-        description = "Total orders per month."
-        return query, chart_type, description
+        return {name: apply_filters(INSIGHT_SPECS[name], filters) for name in (names or INSIGHT_SPECS)}
 
-    # 5. Total revenue per month
-    def get_insight_revenue_per_month(self):
-        query = """
-            SELECT DATE_FORMAT(order_date, '%Y-%m') AS order_month, SUM(total_amount) AS total_revenue
-            FROM orders
-            GROUP BY DATE_FORMAT(order_date, '%Y-%m')
-            ORDER BY order_month;
+    def explain_insight(self, name, filters=None):
         """
-        chart_type = "bar_chart"
-        description = "Total revenue per month."
-        return query, chart_type, description
+        Capture the execution plan of an insight's standalone query and record it in the plan history.
 
-    # 6. Top 5 restaurants by order count
-    def get_insight_top_restaurants_by_orders(self):
-        query = """
-            SELECT restaurant_id, COUNT(*) AS orders_count
-            FROM orders
-            GROUP BY restaurant_id
-            ORDER BY orders_count DESC
-            LIMIT 5;
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+            filters (dict): Optional filters, see `filters.apply_filters`.
+
+        Returns:
+            dict: The plan summary, fingerprint and regression flag, see `PlanInspector.inspect`.
         """
-        chart_type = "bar_chart"
-        description = "Top 5 restaurants by order count."
-        return query, chart_type, description
+        spec = apply_filters(INSIGHT_SPECS[name], filters)
+        return PlanInspector(self.connection).inspect(name, build_query(spec), query_params(spec))
 
-    # 7. Top 5 restaurants by revenue
-    def get_insight_top_restaurants_by_revenue(self):
-        query = """
-            SELECT restaurant_id, SUM(total_amount) AS revenue
-            FROM orders
-            GROUP BY restaurant_id
-            ORDER BY revenue DESC
-            LIMIT 5;
+    def explain_insights(self, names=None, filters=None):
         """
-        chart_type = "bar_chart"
-        description = "Top 5 restaurants by revenue."
-        return query, chart_type, description
+        Capture and record the execution plans of several insights, e.g. after a schema or data change.
 
-    # 8. Orders distribution by cuisine type
-    def get_insight_orders_by_cuisine(self):
-        query = """
-            SELECT r.cuisine_type, COUNT(*) AS orders_count
-            FROM orders o
-            JOIN restaurants r ON o.restaurant_id = r.restaurant_id
-            GROUP BY r.cuisine_type;
+        Args:
+            names (list): The insight names (defaults to every insight).
+            filters (dict): Optional filters, see `filters.apply_filters`.
+
+        Returns:
+            dict: Insight name -> plan inspection, see `explain_insight`.
         """
-        chart_type = "bar_chart"
-        description = "Orders distribution by cuisine type."
-        return query, chart_type, description
+        return {name: self.explain_insight(name, filters) for name in (names or INSIGHT_SPECS)}
 
-    # 9. Average delivery time per restaurant
-    def get_insight_avg_delivery_time_per_restaurant(self):
-        query = """
-            SELECT restaurant_id, AVG(TIMESTAMPDIFF(MINUTE, order_date, delivery_time)) AS avg_delivery_time
-            FROM orders
-            WHERE status = 'delivered'
-            GROUP BY restaurant_id;
+    def _check_budget(self, names, sql, params, cost_budget):
+        _, summary = PlanInspector(self.connection).explain(sql, params)
+        if summary["query_cost"] > cost_budget:
+            self.logger.warning("Refusing insight(s) %s: estimated cost %.0f over budget %.0f", names,
+                                summary["query_cost"], cost_budget)
+            raise QueryBudgetExceeded(names, summary["query_cost"], cost_budget)
+
+    def fetch_insights(self, names=None, filters=None, cost_budget=None):
         """
-        chart_type = "bar_chart"
-        description = "Average delivery time per restaurant (in minutes)."
-        return query, chart_type, description
+        Return the results of several insights, serving them from the shared result cache where possible.
 
-    # 10. Delivery status distribution
-    def get_insight_delivery_status_distribution(self):
-        query = """
-            SELECT delivery_status, COUNT(*) AS count
-            FROM deliveries
-            GROUP BY delivery_status;
+        The missing insights are planned together, so insights sharing a source and grouping are computed in a
+        single pass whose result is fanned out and cached per insight.
+
+        Args:
+            names (list): The insight names (defaults to every insight).
+            filters (dict): Optional time window, granularity and dimension filters, see `filters.apply_filters`.
+            cost_budget (float): Optional maximum optimizer cost estimate (from EXPLAIN) of the queries to run.
+
+        Returns:
+            dict: Insight name -> result DataFrame (do not modify it in place).
+
+        Raises:
+            QueryBudgetExceeded: If a query that has to run is estimated to cost more than `cost_budget`.
         """
-        chart_type = "bar_chart"
-        description = "Distribution of delivery statuses."
-        return query, chart_type, description
+        names = list(names or INSIGHT_SPECS)
+        specs = self.filtered_specs(filters, names)
+        queries = {name: build_query(spec) for name, spec in specs.items()}
+        if any(set(tables_in_query(query)) & set(ROLLUP_TABLES) for query in queries.values()):
+            RollupManager(self.connection).refresh_if_stale()
 
-    # 11. Average feedback rating per restaurant
-    def get_insight_avg_feedback_rating_per_restaurant(self):
-        query = """
-            SELECT restaurant_id, AVG(feedback_rating) AS avg_feedback
-            FROM orders
-            GROUP BY restaurant_id;
+        keys = {name: result_cache.make_key(self.connection, name, query, query_params(specs[name]))
+                for name, query in queries.items()}
+        results = {}
+        for name in names:
+            cached = result_cache.get(keys[name])
+            if cached is not None:
+                results[name] = cached
+
+        missing = {name: specs[name] for name in names if name not in results}
+        for plan in plan_insights(missing):
+            self.logger.debug("Computing insight(s) %s in one pass", [name for name, _ in plan["insights"]])
+            if cost_budget is not None:
+                self._check_budget([name for name, _ in plan["insights"]], plan["sql"], plan["params"], cost_budget)
+            for name, result in fan_out(plan, self._fetch(plan["sql"], plan["params"])).items():
+                result_cache.put(keys[name], result)
+                results[name] = result
+        return {name: results[name] for name in names}
+
+    def cached_insight(self, name, filters=None):
         """
-        chart_type = "bar_chart"
-        description = "Average feedback rating per restaurant."
-        return query, chart_type, description
+        Return the cached result of an insight without querying the database.
 
-    # 12. Top 5 customers by order count
-    def get_insight_top_customers_by_orders(self):
-        query = """
-            SELECT customer_id, COUNT(*) AS orders_count
-            FROM orders
-            GROUP BY customer_id
-            ORDER BY orders_count DESC
-            LIMIT 5;
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+            filters (dict): Optional filters, see `filters.apply_filters`.
+
+        Returns:
+            pd.DataFrame: The cached result, or None if it is not cached.
         """
-        chart_type = "bar_chart"
-        description = "Top 5 customers by order count."
-        return query, chart_type, description
+        spec = apply_filters(INSIGHT_SPECS[name], filters)
+        return result_cache.get(result_cache.make_key(self.connection, name, build_query(spec), query_params(spec)))
 
-    # 13. Order status distribution
-    def get_insight_order_status_distribution(self):
-        query = """
-            SELECT status, COUNT(*) AS count
-            FROM orders
-            GROUP BY status;
+    def fetch_insight(self, name, filters=None, cost_budget=None):
         """
-        chart_type = "bar_chart"
-        description = "Order status distribution."
-        return query, chart_type, description
+        Return the result of one insight.
 
-    # 14. Average discount per payment mode
-    def get_insight_avg_discount_per_payment_mode(self):
-        query = """
-            SELECT payment_mode, AVG(discount_applied) AS avg_discount
-            FROM orders
-            GROUP BY payment_mode;
+        On a cache miss, the other insights computed in the same pass are fetched and cached along with it, so
+        switching to them afterwards needs no query.
+
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+            filters (dict): Optional filters, see `filters.apply_filters`.
+            cost_budget (float): Optional maximum estimated query cost, see `fetch_insights`.
+
+        Returns:
+            pd.DataFrame: The result (do not modify it in place).
         """
-        chart_type = "bar_chart"
-        description = "Average discount per payment mode."
-        return query, chart_type, description
+        for plan in plan_insights(self.filtered_specs(filters)):
+            siblings = [sibling for sibling, _ in plan["insights"]]
+            if name in siblings:
+                return self.fetch_insights(siblings, filters, cost_budget)[name]
+        raise KeyError(name)
+
+    def dimension_values(self, dimension):
+        """
+        Return the distinct values of a filter dimension, for filter controls.
+
+        Args:
+            dimension (str): One of `filters.FILTER_DIMENSIONS`.
+
+        Returns:
+            list: The sorted non-NULL values.
+        """
+        if dimension not in FILTER_DIMENSIONS:
+            raise ValueError(f"Unsupported filter dimension: {dimension}")
+        sql = f"SELECT DISTINCT {dimension} FROM orders WHERE {dimension} IS NOT NULL ORDER BY {dimension};"  # noqa: S608  # checked against FILTER_DIMENSIONS
+        return result_cache.get_or_compute(self.connection, f"{dimension}_values", sql,
+                                           lambda: self._fetch(sql))[dimension].tolist()
+
+    def histogram(self, source, expression, bins=20, width=None, method="fixed", condition=None):
+        """
+        Compute a histogram inside the database and return its bin counts, using the result cache if possible.
+
+        Args:
+            source (str): The FROM clause, e.g. a table name.
+            expression (str): The binned expression.
+            bins (int): The number of bins (ignored when `width` is given).
+            width (float): Optional fixed bin width, e.g. 1 for integer counts.
+            method (str): "fixed" for equal-width bins or "quantile" for equal-count bins.
+            condition (str): Optional SQL predicate on the source rows.
+
+        Returns:
+            pd.DataFrame: One row per non-empty bin, see `query_planner.histogram_query`.
+        """
+        sql = histogram_query(source, expression, bins, width, method, condition)
+        return result_cache.get_or_compute(self.connection, "histogram", sql,
+                                           lambda: self._fetch(sql))
+
+    @staticmethod
+    def _chart_query(spec, budget):
+        """Return the SQL and parameters reducing an insight to its chart's row budget inside the database."""
+        options = spec["downsample"]
+        query = build_query(spec)
+        if options["method"] == "line":
+            sql, params = bucketed_line_query(query, options["x"], options["y"], budget, budget * LTTB_OVERSAMPLING)
+        elif options["method"] == "scatter":
+            sql, params = binned_scatter_query(query, options["x"], options["y"], budget)
+        else:
+            sql, params = top_rows_query(query, spec.get("order_by"), budget)
+        # The insight query's own parameters come first, in its subquery.
+        return sql, (query_params(spec) or ()) + params
+
+    def cached_chart_data(self, name, row_budget=None, filters=None):
+        """
+        Return the cached chart data of an insight without querying the database.
+
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+            row_budget (int): Overrides the insight's row budget.
+            filters (dict): Optional filters, see `filters.apply_filters`.
+
+        Returns:
+            tuple: The chart data and the number of rows of the full result, or None if neither the chart data
+                nor the full result is cached.
+        """
+        spec = apply_filters(INSIGHT_SPECS[name], filters)
+        cached = self.cached_insight(name, filters)
+        if cached is not None:
+            return downsample_frame(cached, spec, row_budget), len(cached)
+        if not spec.get("downsample"):
+            return None
+        sql, params = self._chart_query(spec, row_budget or spec["downsample"]["row_budget"])
+        df = result_cache.get(result_cache.make_key(self.connection, f"{name}@chart", sql, params))
+        if df is None:
+            return None
+        return df.drop(columns="total_rows"), int(df["total_rows"].iloc[0]) if len(df) else 0
+
+    def fetch_chart_data(self, name, row_budget=None, filters=None, cost_budget=None):
+        """
+        Return the result of an insight reduced to the row budget of its chart, reducing it inside the database.
+
+        The reduction runs as one query over the insight query, which measures the result with window functions:
+        line series are averaged into x-range buckets and then thinned to the budget with LTTB; scatters are
+        aggregated into a grid of cells with a "points" count each; ranked results are cut at the budget.
+        Results within the budget come back whole (scatters with one point per row), as do insights without a
+        "downsample" entry. A cached full result is reduced in memory instead.
+
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+            row_budget (int): Overrides the insight's row budget.
+            filters (dict): Optional filters, see `filters.apply_filters`.
+            cost_budget (float): Optional maximum estimated query cost, see `fetch_insights`.
+
+        Returns:
+            tuple: The chart data and the number of rows of the full result.
+        """
+        cached = self.cached_chart_data(name, row_budget, filters)
+        if cached is not None:
+            return cached
+        spec = apply_filters(INSIGHT_SPECS[name], filters)
+        options = spec.get("downsample")
+        if not options:
+            df = self.fetch_insight(name, filters, cost_budget)
+            return df, len(df)
+
+        budget = row_budget or options["row_budget"]
+        sql, params = self._chart_query(spec, budget)
+        if cost_budget is not None:
+            self._check_budget([name], sql, params, cost_budget)
+        df = self._fetch(sql, params)
+        total_rows = int(df["total_rows"].iloc[0]) if len(df) else 0
+        if total_rows > budget:
+            self.logger.debug("Downsampled insight '%s' from %d rows to %d in the database", name, total_rows,
+                              len(df))
+        if options["method"] == "line" and len(df) > budget:
+            df = df.iloc[lttb(df[options["x"]].to_numpy(dtype=float), df[options["y"]].to_numpy(dtype=float),
+                              budget)].reset_index(drop=True)
+        result_cache.put(result_cache.make_key(self.connection, f"{name}@chart", sql, params), df)
+        return df.drop(columns="total_rows"), total_rows
+
+    def get_insight_total_orders_per_day(self):
+        return self.get_insight("total_orders_per_day")
+
+    def get_insight_total_revenue_per_day(self):
+        return self.get_insight("total_revenue_per_day")
+
+    def get_insight_avg_order_value_per_day(self):
+        return self.get_insight("avg_order_value_per_day")
+
+    def get_insight_orders_per_month(self):
+        return self.get_insight("orders_per_month")
+
+    def get_insight_revenue_per_month(self):
+        return self.get_insight("revenue_per_month")
+
+    def get_insight_top_restaurants_by_orders(self):
+        return self.get_insight("top_restaurants_by_orders")
+
+    def get_insight_top_restaurants_by_revenue(self):
+        return self.get_insight("top_restaurants_by_revenue")
+
+    def get_insight_orders_by_cuisine(self):
+        return self.get_insight("orders_by_cuisine")
+
+    def get_insight_avg_delivery_time_per_restaurant(self):
+        return self.get_insight("avg_delivery_time_per_restaurant")
+
+    def get_insight_delivery_status_distribution(self):
+        return self.get_insight("delivery_status_distribution")
+
+    def get_insight_avg_feedback_rating_per_restaurant(self):
+        return self.get_insight("avg_feedback_rating_per_restaurant")
+
+    def get_insight_top_customers_by_orders(self):
+        return self.get_insight("top_customers_by_orders")
+
+    def get_insight_order_status_distribution(self):
+        return self.get_insight("order_status_distribution")
+
+    def get_insight_avg_discount_per_payment_mode(self):
+        return self.get_insight("avg_discount_per_payment_mode")
 
-    # 15. Delivery fee distribution
     def get_insight_delivery_fee_distribution(self):
-        query = """
-            SELECT delivery_fee, COUNT(*) AS frequency
-            FROM deliveries
-            GROUP BY delivery_fee
-            ORDER BY delivery_fee;
-        """
-        chart_type = "bar_chart"
-        description = "Delivery fee distribution."
-        return query, chart_type, description
+        return self.get_insight("delivery_fee_distribution")
 
-    # 16. Average order value by customer type (premium vs non-premium)
     def get_insight_avg_order_value_by_customer_type(self):
-        query = """
-            SELECT c.is_premium, AVG(o.total_amount) AS avg_order_value
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.customer_id
-            GROUP BY c.is_premium;
-        """
-        chart_type = "bar_chart"
-        description = "Average order value by customer type (premium vs non-premium)."
-        return query, chart_type, description
+        return self.get_insight("avg_order_value_by_customer_type")
 
-    # 17. Daily customer sign-ups
     def get_insight_daily_customer_signups(self):
-        query = """
-            SELECT DATE(signup_date) AS signup_day, COUNT(*) AS signups
-            FROM customers
-            GROUP BY DATE(signup_date)
-            ORDER BY signup_day;
-        """
-        chart_type = "line_chart"
-        description = "Daily customer sign-ups."
-        return query, chart_type, description
+        return self.get_insight("daily_customer_signups")
 
-    # 18. Orders by payment mode
     def get_insight_orders_by_payment_mode(self):
-        query = """
-            SELECT payment_mode, COUNT(*) AS orders_count
-            FROM orders
-            GROUP BY payment_mode;
-        """
-        chart_type = "bar_chart"
-        description = "Orders by payment mode."
-        return query, chart_type, description
+        return self.get_insight("orders_by_payment_mode")
 
-    # 19. Average feedback rating per day
     def get_insight_avg_feedback_per_day(self):
-        query = """
-            SELECT DATE(order_date) AS order_day, AVG(feedback_rating) AS avg_feedback
-            FROM orders
-            GROUP BY DATE(order_date)
-            ORDER BY order_day;
-        """
-        chart_type = "line_chart"
-        description = "Average feedback rating per day."
-        return query, chart_type, description
+        return self.get_insight("avg_feedback_per_day")
 
-    # 20. Orders by customer location
     def get_insight_orders_by_customer_location(self):
-        query = """
-            SELECT c.location, COUNT(*) AS orders_count
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.customer_id
-            GROUP BY c.location
-            ORDER BY orders_count DESC;
-        """
-        chart_type = "bar_chart"
-        description = "Orders by customer location."
-        return query, chart_type, description
+        return self.get_insight("orders_by_customer_location")
 
-    # 21. Average delivery distance per order
     def get_insight_avg_delivery_distance_per_order(self):
-        query = """
-            SELECT order_id, AVG(distance) AS avg_distance
-            FROM deliveries
-            GROUP BY order_id;
-        """
-        chart_type = "line_chart"
-        description = "Average delivery distance per order."
-        return query, chart_type, description
+        return self.get_insight("avg_delivery_distance_per_order")
 
-    # 22. Top 5 delivery persons by number of deliveries
     def get_insight_top_delivery_persons_by_deliveries(self):
-        query = """
-            SELECT delivery_person_id, COUNT(*) AS total_deliveries
-            FROM deliveries
-            GROUP BY delivery_person_id
-            ORDER BY total_deliveries DESC
-            LIMIT 5;
-        """
-        chart_type = "bar_chart"
-        description = "Top 5 delivery persons by number of deliveries."
-        return query, chart_type, description
+        return self.get_insight("top_delivery_persons_by_deliveries")
 
-    # 23. Average feedback rating for delivery persons
     def get_insight_avg_delivery_rating_for_persons(self):
-        query = """
-            SELECT d.delivery_person_id, AVG(o.feedback_rating) AS avg_rating
-            FROM deliveries d
-            JOIN orders o ON d.order_id = o.order_id
-            GROUP BY d.delivery_person_id;
-        """
-        chart_type = "bar_chart"
-        description = "Average feedback rating for delivery persons."
-        return query, chart_type, description
+        return self.get_insight("avg_delivery_rating_for_persons")
 
-    # 24. Order delivery status ratio
     def get_insight_order_delivery_status_ratio(self):
-        query = """
-            SELECT status, COUNT(*) AS count
-            FROM orders
-            GROUP BY status;
-        """
-        chart_type = "bar_chart"
-        description = "Order delivery status ratio."
-        return query, chart_type, description
+        return self.get_insight("order_delivery_status_ratio")
 
-    # 25. Average difference between estimated and actual delivery time
     def get_insight_avg_delivery_time_difference(self):
-        query = """
-            SELECT order_id, (SUM(estimated_time) - SUM(delivery_time)) AS time_diff
-            FROM deliveries
-            GROUP BY order_id;
-        """
-        chart_type = "line_chart"
-        description = "Average difference (in minutes) between estimated and actual delivery time."
-        return query, chart_type, description
+        return self.get_insight("avg_delivery_time_difference")
 
-    # 26. Total revenue by restaurant cuisine type
     def get_insight_revenue_by_cuisine(self):
-        query = """
-            SELECT r.cuisine_type, SUM(o.total_amount) AS total_revenue
-            FROM orders o
-            JOIN restaurants r ON o.restaurant_id = r.restaurant_id
-            GROUP BY r.cuisine_type;
-        """
-        chart_type = "bar_chart"
-        description = "Total revenue by restaurant cuisine type."
-        return query, chart_type, description
+        return self.get_insight("revenue_by_cuisine")
 
-    # 27. Customer order frequency distribution
     def get_insight_customer_order_frequency(self):
-        query = """
-            SELECT customer_id, total_orders
-            FROM customers
-            ORDER BY total_orders DESC;
-        """
-        chart_type = "histogram"
-        description = "Customer order frequency distribution."
-        return query, chart_type, description
+        return self.get_insight("customer_order_frequency")
 
-    # 28. Correlation between order value and feedback
     def get_insight_order_value_vs_feedback(self):
-        query = """
-            SELECT total_amount, feedback_rating
-            FROM orders
-            WHERE feedback_rating IS NOT NULL;
-        """
-        chart_type = "scatter_chart"
-        description = "Correlation between order value and feedback rating (Scatter Chart)."
-        return query, chart_type, description
+        return self.get_insight("order_value_vs_feedback")
 
-    # 29. Comparison of on-time vs delayed deliveries
     def get_insight_delivery_success_vs_delay(self):
-        query = """
-            SELECT 
-                CASE 
-                    WHEN TIMESTAMPDIFF(MINUTE, order_date, delivery_time) <= 60 THEN 'On Time'
-                    ELSE 'Delayed'
-                END AS delivery_performance,
-                COUNT(*) AS count
-            FROM orders
-            WHERE status = 'delivered'
-            GROUP BY delivery_performance;
-        """
-        chart_type = "bar_chart"
-        description = "Comparison of on-time versus delayed deliveries."
-        return query, chart_type, description
+        return self.get_insight("delivery_success_vs_delay")
 
-    # 30. Daily average delivery time
     def get_insight_daily_avg_delivery_time(self):
-        query = """
-            SELECT DATE(order_date) AS order_day, AVG(TIMESTAMPDIFF(MINUTE, order_date, delivery_time)) AS avg_delivery_time
-            FROM orders
-            WHERE status = 'delivered'
-            GROUP BY DATE(order_date)
-            ORDER BY order_day;
-        """
-        chart_type = "line_chart"
-        description = "Daily average delivery time."
-        return query, chart_type, description
+        return self.get_insight("daily_avg_delivery_time")
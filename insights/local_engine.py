@@ -0,0 +1,680 @@
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from db.change_log import ChangeLog
+from db.columnar_fetch import fetch_dataframe
+from db.write_versions import write_versions
+from insights.insights_manager import INSIGHT_SPECS, InsightsManager
+from insights.result_cache import database_identity
+
+# Snapshot layout: primary key, loaded columns, int32 key columns and categorical columns per table.
+SNAPSHOT_TABLES = {
+    "orders": {
+        "primary_key": "order_id",
+        "columns": [
+            "order_id",
+            "customer_id",
+            "restaurant_id",
+            "order_date",
+            "delivery_time",
+            "status",
+            "total_amount",
+            "payment_mode",
+            "discount_applied",
+            "feedback_rating",
+        ],
+        "keys": ["order_id", "customer_id", "restaurant_id"],
+        "categorical": ["status", "payment_mode"],
+    },
+    "deliveries": {
+        "primary_key": "delivery_id",
+        "columns": [
+            "delivery_id",
+            "order_id",
+            "delivery_person_id",
+            "delivery_status",
+            "distance",
+            "delivery_time",
+            "estimated_time",
+            "delivery_fee",
+        ],
+        "keys": ["delivery_id", "order_id", "delivery_person_id"],
+        "categorical": ["delivery_status"],
+    },
+    "customers": {
+        "primary_key": "customer_id",
+        "columns": [
+            "customer_id",
+            "signup_date",
+            "is_premium",
+            "location",
+            "total_orders",
+        ],
+        "keys": ["customer_id"],
+        "categorical": ["location"],
+    },
+    "restaurants": {
+        "primary_key": "restaurant_id",
+        "columns": ["restaurant_id", "cuisine_type"],
+        "keys": ["restaurant_id"],
+        "categorical": ["cuisine_type"],
+    },
+}
+
+
+def _histogram(values, options):
+    """Bins a column like `query_planner.histogram_query` does in SQL."""
+    values = values.dropna().astype(float)
+    bins = int(options.get("bins", 20))
+    if options.get("method", "fixed") == "quantile":
+        ranked = values.sort_values(kind="stable").reset_index(drop=True)
+        # NTILE puts the remainder rows into the first bins.
+        sizes = np.full(bins, len(ranked) // bins) + (
+            np.arange(bins) < len(ranked) % bins
+        )
+        groups = ranked.groupby(np.repeat(np.arange(bins), sizes))
+        return pd.DataFrame(
+            {
+                "bin_start": groups.min(),
+                "bin_end": groups.max(),
+                "frequency": groups.size(),
+            }
+        ).reset_index(drop=True)
+    if options.get("width") is not None:
+        starts = np.floor(values / options["width"]) * options["width"]
+    else:
+        low = values.min()
+        width = (values.max() - low) / bins
+        index = (
+            np.floor((values - low) / width).clip(upper=bins - 1)
+            if width
+            else values * 0
+        )
+        starts = low + index * width
+    counts = starts.value_counts(sort=False).sort_index()
+    return pd.DataFrame(
+        {"bin_start": counts.index.to_numpy(), "frequency": counts.to_numpy()}
+    )
+
+
+def _delivered(frame):
+    # The data is stored as "Delivered"; the SQL filter matches it through the case-insensitive collation.
+    return frame["status"].str.lower() == "delivered"
+
+
+def _dated(frame):
+    return frame["order_date"].notna()
+
+
+# In-process equivalents of INSIGHT_SPECS: the frame, grouping columns, aggregates and row filter of every
+# insight. Aggregates are (alias, how, column) with how in "count", "sum", "mean" or "sum_difference" (two
+# columns). Aliases, ordering and limits match the SQL specs, so results are directly comparable. Histogram
+# insights name the binned column and take their bin options from the SQL spec.
+LOCAL_INSIGHTS = {
+    "total_orders_per_day": {
+        "frame": "orders",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("total_orders", "count", None)],
+        "filter": _dated,
+    },
+    "total_revenue_per_day": {
+        "frame": "orders",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("total_revenue", "sum", "total_amount")],
+        "filter": _dated,
+    },
+    "avg_order_value_per_day": {
+        "frame": "orders",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("avg_order_value", "mean", "total_amount")],
+        "filter": _dated,
+    },
+    "orders_per_month": {
+        "frame": "orders",
+        "group_by": [("order_month", "order_month")],
+        "aggregates": [("total_orders", "count", None)],
+        "filter": _dated,
+    },
+    "revenue_per_month": {
+        "frame": "orders",
+        "group_by": [("order_month", "order_month")],
+        "aggregates": [("total_revenue", "sum", "total_amount")],
+        "filter": _dated,
+    },
+    "top_restaurants_by_orders": {
+        "frame": "orders",
+        "group_by": [("restaurant_id", "restaurant_id")],
+        "aggregates": [("orders_count", "count", None)],
+    },
+    "top_restaurants_by_revenue": {
+        "frame": "orders",
+        "group_by": [("restaurant_id", "restaurant_id")],
+        "aggregates": [("revenue", "sum", "total_amount")],
+    },
+    "orders_by_cuisine": {
+        "frame": "orders_restaurants",
+        "group_by": [("cuisine_type", "cuisine_type")],
+        "aggregates": [("orders_count", "count", None)],
+    },
+    "avg_delivery_time_per_restaurant": {
+        "frame": "orders",
+        "group_by": [("restaurant_id", "restaurant_id")],
+        "aggregates": [("avg_delivery_time", "mean", "delivery_minutes")],
+        "filter": _delivered,
+    },
+    "delivery_status_distribution": {
+        "frame": "deliveries",
+        "group_by": [("delivery_status", "delivery_status")],
+        "aggregates": [("count", "count", None)],
+    },
+    "avg_feedback_rating_per_restaurant": {
+        "frame": "orders",
+        "group_by": [("restaurant_id", "restaurant_id")],
+        "aggregates": [("avg_feedback", "mean", "feedback_rating")],
+    },
+    "top_customers_by_orders": {
+        "frame": "orders",
+        "group_by": [("customer_id", "customer_id")],
+        "aggregates": [("orders_count", "count", None)],
+    },
+    "order_status_distribution": {
+        "frame": "orders",
+        "group_by": [("status", "status")],
+        "aggregates": [("count", "count", None)],
+    },
+    "avg_discount_per_payment_mode": {
+        "frame": "orders",
+        "group_by": [("payment_mode", "payment_mode")],
+        "aggregates": [("avg_discount", "mean", "discount_applied")],
+    },
+    "delivery_fee_distribution": {"frame": "deliveries", "histogram": "delivery_fee"},
+    "avg_order_value_by_customer_type": {
+        "frame": "orders_customers",
+        "group_by": [("is_premium", "is_premium")],
+        "aggregates": [("avg_order_value", "mean", "total_amount")],
+    },
+    "daily_customer_signups": {
+        "frame": "customers",
+        "group_by": [("signup_day", "signup_day")],
+        "aggregates": [("signups", "count", None)],
+    },
+    "orders_by_payment_mode": {
+        "frame": "orders",
+        "group_by": [("payment_mode", "payment_mode")],
+        "aggregates": [("orders_count", "count", None)],
+    },
+    "avg_feedback_per_day": {
+        "frame": "orders",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("avg_feedback", "mean", "feedback_rating")],
+        "filter": _dated,
+    },
+    "orders_by_customer_location": {
+        "frame": "orders_customers",
+        "group_by": [("location", "location")],
+        "aggregates": [("orders_count", "count", None)],
+    },
+    "avg_delivery_distance_per_order": {
+        "frame": "deliveries",
+        "group_by": [("order_id", "order_id")],
+        "aggregates": [("avg_distance", "mean", "distance")],
+    },
+    "top_delivery_persons_by_deliveries": {
+        "frame": "deliveries",
+        "group_by": [("delivery_person_id", "delivery_person_id")],
+        "aggregates": [("total_deliveries", "count", None)],
+    },
+    "avg_delivery_rating_for_persons": {
+        "frame": "deliveries_orders",
+        "group_by": [("delivery_person_id", "delivery_person_id")],
+        "aggregates": [("avg_rating", "mean", "feedback_rating")],
+    },
+    "order_delivery_status_ratio": {
+        "frame": "orders",
+        "group_by": [("status", "status")],
+        "aggregates": [("count", "count", None)],
+    },
+    "avg_delivery_time_difference": {
+        "frame": "deliveries",
+        "group_by": [("order_id", "order_id")],
+        "aggregates": [
+            ("time_diff", "sum_difference", ("estimated_time", "delivery_time"))
+        ],
+    },
+    "revenue_by_cuisine": {
+        "frame": "orders_restaurants",
+        "group_by": [("cuisine_type", "cuisine_type")],
+        "aggregates": [("total_revenue", "sum", "total_amount")],
+    },
+    "customer_order_frequency": {"frame": "customers", "histogram": "total_orders"},
+    "order_value_vs_feedback": {
+        "frame": "orders",
+        "columns": [
+            ("total_amount", "total_amount"),
+            ("feedback_rating", "feedback_rating"),
+        ],
+        "filter": lambda frame: frame["feedback_rating"].notna(),
+    },
+    "delivery_success_vs_delay": {
+        "frame": "orders",
+        "group_by": [("delivery_performance", "delivery_performance")],
+        "aggregates": [("count", "count", None)],
+        "filter": _delivered,
+    },
+    "daily_avg_delivery_time": {
+        "frame": "orders",
+        "group_by": [("order_day", "order_day")],
+        "aggregates": [("avg_delivery_time", "mean", "delivery_minutes")],
+        "filter": lambda frame: _dated(frame) & _delivered(frame),
+    },
+}
+
+
+class _Snapshot:
+    """The in-memory copy of the snapshot tables of one database, with its refresh watermarks."""
+
+    def __init__(self):
+        self.frames = {}
+        self.max_keys = {}
+        self.change_seq = 0
+        self.versions = None
+        self.checked_at = 0.0
+        self.derived = {}
+        self.results = {}
+        self.lock = threading.Lock()
+
+
+class LocalInsightsEngine:
+    """
+    Computes the insights in-process from columnar snapshots instead of sending every aggregation to MySQL.
+
+    The snapshots hold the orders, deliveries, customers and restaurants tables.
+
+    Snapshots are shared by all sessions connected to the same database. Key columns are stored as int32 and
+    low-cardinality text columns as categoricals. `refresh` appends rows above each table's loaded primary
+    key; tables with updates, deletes or bulk loads in the change log since the last refresh are reloaded
+    entirely. Without the change log only appended rows are seen, so call `reload` after edits.
+    """
+
+    _snapshots = {}
+    _snapshots_lock = threading.Lock()
+
+    def __init__(self, connection, min_refresh_interval: float = 5.0):
+        """
+        Initialize the engine.
+
+        Args:
+            connection (pymysql.connections.Connection): Active MySQL database connection used to load snapshots.
+            min_refresh_interval (float): Seconds during which a refresh is skipped if this process wrote nothing
+                to the snapshot tables.
+        """
+        self.connection = connection
+        self.min_refresh_interval = min_refresh_interval
+        with self._snapshots_lock:
+            self.snapshot = self._snapshots.setdefault(
+                database_identity(connection), _Snapshot()
+            )
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        Create an engine over in-memory tables instead of a database.
+
+        This serves e.g. as an embedded stand-in for MySQL in benchmarks. The snapshots never refresh.
+
+        Args:
+            frames (dict): Table name -> DataFrame holding at least the SNAPSHOT_TABLES columns, with datetime
+                date columns.
+
+        Returns:
+            LocalInsightsEngine: The engine.
+        """
+        engine = cls.__new__(cls)
+        engine.connection = None
+        engine.min_refresh_interval = math.inf
+        engine.snapshot = _Snapshot()
+        engine.logger = logging.getLogger(__name__)
+        for table_name, layout in SNAPSHOT_TABLES.items():
+            frame = cls._compact(frames[table_name][layout["columns"]].copy(), layout)
+            engine.snapshot.frames[table_name] = frame
+            engine.snapshot.max_keys[table_name] = (
+                int(frame[layout["primary_key"]].max()) if len(frame) else 0
+            )
+        return engine
+
+    @staticmethod
+    def _compact(frame, layout):
+        for column in layout["keys"]:
+            if frame[column].isna().any():
+                frame[column] = frame[column].astype("Int32")
+            else:
+                frame[column] = frame[column].astype(np.int32)
+        for column in layout["categorical"]:
+            frame[column] = frame[column].astype("category")
+        return frame
+
+    def _load(self, table_name, after_key=None):
+        layout = SNAPSHOT_TABLES[table_name]
+        sql = f"SELECT {', '.join(layout['columns'])} FROM {table_name}"  # noqa: S608  # SNAPSHOT_TABLES layout
+        params = None
+        if after_key is not None:
+            sql += f" WHERE {layout['primary_key']} > %s"
+            params = (after_key,)
+        frame = fetch_dataframe(
+            self.connection, sql + f" ORDER BY {layout['primary_key']};", params
+        )
+        return self._compact(frame, layout)
+
+    @staticmethod
+    def _append(old, new, layout):
+        if new.empty:
+            return old
+        if old.empty:
+            return new
+        columns = {}
+        for column in old.columns:
+            if column in layout["categorical"]:
+                columns[column] = union_categoricals(
+                    [old[column], new[column]], ignore_order=True
+                )
+            else:
+                columns[column] = pd.concat(
+                    [old[column], new[column]], ignore_index=True
+                )
+        return pd.DataFrame(columns)
+
+    def _tables_to_reload(self, change_log):
+        tables = set()
+        seq = self.snapshot.change_seq
+        while True:
+            changes, seq = change_log.changes_since(
+                seq,
+                list(SNAPSHOT_TABLES),
+                operations=["update", "upsert", "delete", "load"],
+            )
+            if not changes:
+                return tables, seq
+            tables.update(change["table_name"] for change in changes)
+
+    def refresh(self, force_reload: bool = False):
+        """
+        Brings the snapshots up to date with the database.
+
+        Args:
+            force_reload (bool): Reload every table entirely.
+
+        Returns:
+            dict: Table name -> "unchanged", "appended" or "reloaded".
+        """
+        snapshot = self.snapshot
+        if self.connection is None:
+            # Built from in-memory frames: there is nothing to refresh from.
+            return {table_name: "unchanged" for table_name in SNAPSHOT_TABLES}
+        versions = write_versions.snapshot(SNAPSHOT_TABLES)
+        with snapshot.lock:
+            if (
+                not force_reload
+                and snapshot.frames
+                and versions == snapshot.versions
+                and time.monotonic() - snapshot.checked_at < self.min_refresh_interval
+            ):
+                return {table_name: "unchanged" for table_name in SNAPSHOT_TABLES}
+
+            change_log = ChangeLog(self.connection)
+            reload_tables, change_seq = set(), snapshot.change_seq
+            if change_log.is_enabled():
+                reload_tables, change_seq = self._tables_to_reload(change_log)
+
+            status = {}
+            for table_name, layout in SNAPSHOT_TABLES.items():
+                frame = snapshot.frames.get(table_name)
+                if force_reload or frame is None or table_name in reload_tables:
+                    snapshot.frames[table_name] = self._load(table_name)
+                    status[table_name] = "reloaded"
+                else:
+                    new_rows = self._load(table_name, snapshot.max_keys[table_name])
+                    snapshot.frames[table_name] = self._append(frame, new_rows, layout)
+                    status[table_name] = "appended" if len(new_rows) else "unchanged"
+                keys = snapshot.frames[table_name][layout["primary_key"]]
+                snapshot.max_keys[table_name] = int(keys.max()) if len(keys) else 0
+
+            snapshot.change_seq = change_seq
+            snapshot.versions = versions
+            snapshot.checked_at = time.monotonic()
+            if any(value != "unchanged" for value in status.values()):
+                snapshot.derived = {}
+                snapshot.results = {}
+        self.logger.debug("Snapshot refresh: %s", status)
+        return status
+
+    def reload(self):
+        """
+        Reload every snapshot table entirely.
+
+        Returns:
+            dict: Table name -> "reloaded".
+        """
+        return self.refresh(force_reload=True)
+
+    def memory_usage(self):
+        """
+        Report the in-memory size of the snapshots.
+
+        Returns:
+            dict: Table name -> (rows, bytes).
+        """
+        return {
+            table_name: (
+                len(frame),
+                int(frame.memory_usage(index=True, deep=True).sum()),
+            )
+            for table_name, frame in self.snapshot.frames.items()
+        }
+
+    def _frame(self, name):
+        """Return a snapshot table or a derived (joined or enriched) frame, building it once per snapshot."""
+        derived = self.snapshot.derived
+        if name in derived:
+            return derived[name]
+        frames = self.snapshot.frames
+        if name == "orders":
+            frame = frames["orders"].copy(deep=False)
+            frame["order_day"] = frame["order_date"].dt.normalize()
+            frame["order_month"] = frame["order_date"].dt.to_period("M")
+            seconds = (frame["delivery_time"] - frame["order_date"]).dt.total_seconds()
+            frame["delivery_minutes"] = np.trunc(seconds / 60)
+            frame["delivery_performance"] = pd.Categorical(
+                np.where(frame["delivery_minutes"] <= 60, "On Time", "Delayed")
+            )
+        elif name == "customers":
+            frame = frames["customers"].copy(deep=False)
+            frame["signup_day"] = frame["signup_date"].dt.normalize()
+        elif name == "orders_restaurants":
+            frame = self._frame("orders").merge(
+                frames["restaurants"], on="restaurant_id", how="inner"
+            )
+        elif name == "orders_customers":
+            frame = self._frame("orders").merge(
+                frames["customers"][["customer_id", "is_premium", "location"]],
+                on="customer_id",
+                how="inner",
+            )
+        elif name == "deliveries_orders":
+            frame = frames["deliveries"].merge(
+                frames["orders"][["order_id", "feedback_rating"]],
+                on="order_id",
+                how="inner",
+            )
+        else:
+            frame = frames[name]
+        derived[name] = frame
+        return frame
+
+    def _compute(self, name):
+        local = LOCAL_INSIGHTS[name]
+        spec = INSIGHT_SPECS[name]
+        frame = self._frame(local["frame"])
+        if local.get("filter"):
+            frame = frame[local["filter"](frame)]
+
+        if local.get("histogram"):
+            result = _histogram(frame[local["histogram"]], spec["histogram"])
+        elif local.get("columns"):
+            result = frame[[column for _, column in local["columns"]]].set_axis(
+                [alias for alias, _ in local["columns"]], axis=1
+            )
+        else:
+            groups = frame.groupby(
+                [column for _, column in local["group_by"]],
+                dropna=False,
+                observed=True,
+                sort=False,
+            )
+            aggregates = {}
+            for alias, how, column in local["aggregates"]:
+                if how == "count":
+                    aggregates[alias] = groups.size()
+                elif how == "sum":
+                    aggregates[alias] = groups[column].sum(min_count=1)
+                elif how == "mean":
+                    aggregates[alias] = groups[column].mean()
+                elif how == "sum_difference":
+                    aggregates[alias] = groups[column[0]].sum(min_count=1) - groups[
+                        column[1]
+                    ].sum(min_count=1)
+                else:
+                    raise ValueError(f"Unsupported local aggregate: {how}")
+            result = pd.DataFrame(aggregates).reset_index()
+            result.columns = [alias for alias, _ in local["group_by"]] + list(
+                aggregates
+            )
+            for column in result.columns:
+                if isinstance(result[column].dtype, pd.PeriodDtype):
+                    result[column] = result[column].astype(str)
+
+        if spec.get("order_by"):
+            result = result.sort_values(
+                [alias for alias, _ in spec["order_by"]],
+                ascending=[ascending for _, ascending in spec["order_by"]],
+                kind="stable",
+                na_position="first" if spec["order_by"][0][1] else "last",
+            )
+        if spec.get("limit"):
+            result = result.head(int(spec["limit"]))
+        return result.reset_index(drop=True)
+
+    def fetch_insights(self, names=None):
+        """
+        Compute insights from the snapshots, refreshing them first.
+
+        Args:
+            names (list): The insight names (defaults to every insight).
+
+        Returns:
+            dict: Insight name -> result DataFrame (do not modify it in place).
+        """
+        self.refresh()
+        names = list(names or LOCAL_INSIGHTS)
+        with self.snapshot.lock:
+            for name in names:
+                if name not in self.snapshot.results:
+                    self.snapshot.results[name] = self._compute(name)
+            return {name: self.snapshot.results[name] for name in names}
+
+    def fetch_insight(self, name):
+        """
+        Compute one insight from the snapshots, refreshing them first.
+
+        Args:
+            name (str): The insight name, a key of INSIGHT_SPECS.
+
+        Returns:
+            pd.DataFrame: The result (do not modify it in place).
+        """
+        return self.fetch_insights([name])[name]
+
+    @staticmethod
+    def _normalize(frame, spec):
+        """Put a result into a canonical row order with comparable key values."""
+        if spec.get("limit"):
+            # Ties at the cut-off may be broken differently, so only the ranked values are compared.
+            return frame[[frame.columns[-1]]].reset_index(drop=True)
+        keys = [
+            alias for alias, _ in spec.get("group_by", []) + spec.get("columns", [])
+        ]
+        canonical = frame.copy()
+        for key in keys:
+            canonical[key] = (
+                canonical[key]
+                .astype(object)
+                .where(canonical[key].notna(), None)
+                .map(str)
+            )
+        return canonical.sort_values(keys, kind="stable").reset_index(drop=True)
+
+    def verify(self, names=None, tolerance: float = 1e-6):
+        """
+        Compare the in-process results with the SQL results of the same insights.
+
+        Args:
+            names (list): The insight names (defaults to every insight).
+            tolerance (float): Relative tolerance for numeric values.
+
+        Returns:
+            dict: Insight name -> list of mismatch descriptions (empty when the results agree).
+        """
+        names = list(names or LOCAL_INSIGHTS)
+        sql_results = InsightsManager(self.connection).fetch_insights(names)
+        local_results = self.fetch_insights(names)
+        report = {}
+        for name in names:
+            spec = INSIGHT_SPECS[name]
+            expected = self._normalize(sql_results[name], spec)
+            actual = self._normalize(local_results[name], spec)
+            problems = []
+            if len(expected) != len(actual):
+                problems.append(f"{len(actual)} rows instead of {len(expected)}")
+            elif list(expected.columns) != list(actual.columns):
+                problems.append(
+                    f"columns {list(actual.columns)} instead of {list(expected.columns)}"
+                )
+            else:
+                for column in expected.columns:
+                    for index, (want, got) in enumerate(
+                        zip(expected[column], actual[column], strict=True)
+                    ):
+                        if pd.isna(want) and pd.isna(got):
+                            continue
+                        try:
+                            equal = math.isclose(
+                                float(want),
+                                float(got),
+                                rel_tol=tolerance,
+                                abs_tol=tolerance,
+                            )
+                        except (TypeError, ValueError):
+                            equal = str(want) == str(got)
+                        if not equal:
+                            problems.append(
+                                f"{column} row {index}: {got!r} instead of {want!r}"
+                            )
+                            break
+            report[name] = problems
+        return report
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import logging
+
+import pymysql
+
+from insights.result_cache import database_identity
+
+PLAN_TABLE = "insight_plans"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised instead of running a query whose estimated cost is over the budget."""
+
+    def __init__(self, names, cost, budget):
+        super().__init__(
+            f"Estimated query cost {cost:,.0f} exceeds the budget of {budget:,.0f} "
+            f"for insight(s) {', '.join(names)}"
+        )
+        self.names = names
+        self.cost = cost
+        self.budget = budget
+
+
+def summarize_plan(plan):
+    """
+    Extract what matters for performance from an `EXPLAIN FORMAT=JSON` plan.
+
+    Args:
+        plan (dict): The parsed plan.
+
+    Returns:
+        dict: The "query_cost", the "estimated_rows" examined (summed over the tables), the per-table
+            "tables" (name, access type, key and rows examined per scan), the tables read with a "full_scans"
+            and whether a "filesort" or "temporary_table" is used.
+    """
+    summary = {"tables": [], "filesort": False, "temporary_table": False}
+
+    def walk(node):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+        if "table_name" in node and "access_type" in node:
+            summary["tables"].append(
+                {
+                    "table": node["table_name"],
+                    "access_type": node["access_type"],
+                    "key": node.get("key"),
+                    "rows": int(node.get("rows_examined_per_scan", 0)),
+                }
+            )
+        summary["filesort"] |= bool(node.get("using_filesort"))
+        summary["temporary_table"] |= bool(node.get("using_temporary_table"))
+        for value in node.values():
+            walk(value)
+
+    walk(plan)
+    summary["query_cost"] = float(
+        plan.get("query_block", {}).get("cost_info", {}).get("query_cost", 0)
+    )
+    summary["estimated_rows"] = sum(table["rows"] for table in summary["tables"])
+    summary["full_scans"] = [
+        table["table"] for table in summary["tables"] if table["access_type"] == "ALL"
+    ]
+    return summary
+
+
+def plan_fingerprint(summary):
+    """
+    Fingerprints the shape of a plan: table order, access types, keys, filesorts and temporary tables.
+
+    Row estimates and costs are left out, so the fingerprint only changes when the plan itself does.
+
+    Args:
+        summary (dict): A plan summary, see `summarize_plan`.
+
+    Returns:
+        str: A 16-character hexadecimal fingerprint.
+    """
+    shape = [
+        [table["table"], table["access_type"], table["key"]]
+        for table in summary["tables"]
+    ]
+    shape.append([summary["filesort"], summary["temporary_table"]])
+    return hashlib.sha1(json.dumps(shape).encode(), usedforsecurity=False).hexdigest()[
+        :16
+    ]
+
+
+class PlanInspector:
+    """
+    Captures the execution plans of insight queries and tracks them over time.
+
+    Every inspected plan is stored in `insight_plans` with its fingerprint, estimated cost and rows. The first
+    plan seen for a query becomes its baseline; a later plan with a different fingerprint (e.g. after an index
+    or the data distribution changed) is flagged as a regression until it is accepted as the new baseline.
+    """
+
+    _ensured = set()
+
+    def __init__(self, connection):
+        """
+        Initialize the inspector.
+
+        Args:
+            connection (pymysql.connections.Connection): Active connection to the MySQL database.
+        """
+        self.connection = connection
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def ensure_table(self):
+        """Create the plan history table, once per database and process."""
+        database_key = database_identity(self.connection)
+        if database_key in self._ensured:
+            return
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {PLAN_TABLE} (
+                        insight_name VARCHAR(128) NOT NULL,
+                        query_hash CHAR(40) NOT NULL,
+                        baseline_fingerprint CHAR(16) NOT NULL,
+                        fingerprint CHAR(16) NOT NULL,
+                        query_cost DOUBLE NOT NULL,
+                        estimated_rows BIGINT NOT NULL,
+                        plan_json MEDIUMTEXT NOT NULL,
+                        captured_at DATETIME(6) NOT NULL,
+                        PRIMARY KEY (insight_name, query_hash)
+                    );
+                """)
+            self.connection.commit()
+            self._ensured.add(database_key)
+        except pymysql.MySQLError as e:
+            self.logger.error("Error creating table '%s': %s", PLAN_TABLE, e)
+            raise e
+
+    def explain(self, sql, params=None):
+        """
+        Run `EXPLAIN FORMAT=JSON` on a query.
+
+        Args:
+            sql (str): The query.
+            params (tuple): The query parameters.
+
+        Returns:
+            tuple: The parsed plan and its summary (see `summarize_plan`).
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN FORMAT=JSON {sql}", params)
+                plan = json.loads(cursor.fetchone()[0])
+        except pymysql.MySQLError as e:
+            self.logger.error("Error explaining query: %s", e)
+            raise e
+        return plan, summarize_plan(plan)
+
+    def inspect(self, name, sql, params=None):
+        """
+        Explains an insight query and records the plan in the plan history.
+
+        Args:
+            name (str): The insight name.
+            sql (str): The insight query.
+            params (tuple): The query parameters. Queries differing only in parameter values share a history.
+
+        Returns:
+            dict: The plan summary with the parsed "plan", its "fingerprint", the "baseline_fingerprint" and
+                whether the plan "regressed" from the baseline.
+        """
+        self.ensure_table()
+        plan, summary = self.explain(sql, params)
+        fingerprint = plan_fingerprint(summary)
+        query_hash = hashlib.sha1(sql.encode(), usedforsecurity=False).hexdigest()
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {PLAN_TABLE} (insight_name, query_hash, baseline_fingerprint, "  # noqa: S608  # constant table name
+                    f"fingerprint, query_cost, estimated_rows, plan_json, captured_at) "
+                    f"VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(6)) ON DUPLICATE KEY UPDATE "
+                    f"fingerprint = VALUES(fingerprint), query_cost = VALUES(query_cost), "
+                    f"estimated_rows = VALUES(estimated_rows), plan_json = VALUES(plan_json), "
+                    f"captured_at = VALUES(captured_at);",
+                    (
+                        name,
+                        query_hash,
+                        fingerprint,
+                        fingerprint,
+                        summary["query_cost"],
+                        summary["estimated_rows"],
+                        json.dumps(plan),
+                    ),
+                )
+                cursor.execute(
+                    f"SELECT baseline_fingerprint FROM {PLAN_TABLE} "  # noqa: S608  # constant table name
+                    f"WHERE insight_name = %s AND query_hash = %s;",
+                    (name, query_hash),
+                )
+                baseline = cursor.fetchone()[0]
+            self.connection.commit()
+        except pymysql.MySQLError as e:
+            self.logger.error("Error recording the plan of insight '%s': %s", name, e)
+            raise e
+
+        if baseline != fingerprint:
+            self.logger.warning(
+                "Plan of insight '%s' changed from %s to %s",
+                name,
+                baseline,
+                fingerprint,
+            )
+        return dict(
+            summary,
+            plan=plan,
+            fingerprint=fingerprint,
+            baseline_fingerprint=baseline,
+            regressed=baseline != fingerprint,
+        )
+
+    def accept(self, name):
+        """
+        Accept the current plans of an insight as their new baselines.
+
+        Args:
+            name (str): The insight name.
+        """
+        self.ensure_table()
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {PLAN_TABLE} SET baseline_fingerprint = fingerprint WHERE insight_name = %s;",  # noqa: S608  # constant table name
+                    (name,),
+                )
+            self.connection.commit()
+        except pymysql.MySQLError as e:
+            self.logger.error("Error accepting the plan of insight '%s': %s", name, e)
+            raise e
+
+    def regressions(self):
+        """
+        List the insight queries whose latest plan differs from their baseline.
+
+        Returns:
+            list: Dictionaries with the insight name, both fingerprints, the estimated cost and rows, and when
+                the plan was captured.
+        """
+        self.ensure_table()
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT insight_name, baseline_fingerprint, fingerprint, query_cost, estimated_rows, "  # noqa: S608  # constant table name
+                    f"captured_at FROM {PLAN_TABLE} WHERE baseline_fingerprint <> fingerprint "
+                    f"ORDER BY insight_name;"
+                )
+                columns = [column[0] for column in cursor.description]
+                return [
+                    dict(zip(columns, row, strict=True)) for row in cursor.fetchall()
+                ]
+        except pymysql.MySQLError as e:
+            self.logger.error("Error listing plan regressions: %s", e)
+            raise e
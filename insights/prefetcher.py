@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, wait
+
+import pymysql
+
+from insights.insights_manager import InsightsManager
+from insights.query_runner import kill_query
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="insight-prefetch")
+
+
+class _Task:
+    """A speculative computation and the connection it is running on."""
+
+    def __init__(self):
+        self.future = None
+        self.thread_id = None
+        self.stopped = False
+        self.finished = False
+        self.lock = threading.Lock()
+
+
+class InsightPrefetcher:
+    """
+    Speculatively computes the insights a user is likely to open next, on background workers.
+
+    Every session keeps its own prefetcher: after an insight is rendered, the page asks it to compute the
+    neighbouring insights, whose results are parked in the prefetcher until the page takes them. Asking for a
+    new set of insights (e.g. after jumping elsewhere in the list) cancels the queued computations that are no
+    longer wanted and stops their running queries with `KILL QUERY`, so speculation never competes with what
+    the user is actually waiting for.
+    """
+
+    def __init__(self, pool, timeout_seconds: float = None):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            pool (ConnectionPool): The pool the computations take their connections from.
+            timeout_seconds (float): Optional execution time limit of the prefetch queries, which also bounds the
+                wait for a pooled connection.
+        """
+        self.pool = pool
+        self.timeout_seconds = timeout_seconds
+        # Key -> _Task, in the order the computations were requested.
+        self._tasks = {}
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def _work(self, task, compute):
+        connection = self.pool.acquire(self.timeout_seconds)
+        try:
+            with task.lock:
+                if task.stopped:
+                    # Cancelled while waiting for the connection: the query must not start at all.
+                    raise CancelledError()
+                task.thread_id = connection.thread_id()
+            return compute(InsightsManager(connection, self.timeout_seconds))
+        finally:
+            with task.lock:
+                # From now on the connection may serve another query, which must not be killed.
+                task.finished = True
+            self.pool.release(connection)
+
+    def _cancel(self, key, task):
+        if task.future.cancel():
+            return
+        with task.lock:
+            task.stopped = True
+            if task.thread_id is None or task.finished:
+                return
+            self.logger.debug("Cancelling prefetch of %s", key)
+            try:
+                kill_query(self.pool.connection_factory, task.thread_id)
+            except pymysql.MySQLError as e:
+                self.logger.warning("Error cancelling prefetch of %s: %s", key, e)
+
+    def retain(self, keys):
+        """
+        Cancel the pending computations and drop the results of every key but the given ones.
+
+        Args:
+            keys (iterable): The keys to keep.
+        """
+        keys = set(keys)
+        for key in [key for key in self._tasks if key not in keys]:
+            self._cancel(key, self._tasks.pop(key))
+
+    def prefetch(self, computations):
+        """
+        Start computing results in the background, cancelling every other pending computation.
+
+        Results already computed or in progress for the given keys are kept; all others are dropped.
+
+        Args:
+            computations (dict): Key -> callable taking an `InsightsManager` and returning the result, in order
+                of priority. Keys identify a result, see `take`.
+        """
+        self.retain(computations)
+        for key, compute in computations.items():
+            if key not in self._tasks:
+                task = _Task()
+                task.future = _executor.submit(self._work, task, compute)
+                self._tasks[key] = task
+
+    def take(self, key, on_wait=None, poll_interval: float = 0.25):
+        """
+        Return a prefetched result, waiting for it if its computation is running.
+
+        Args:
+            key: The key given to `prefetch`.
+            on_wait (callable): Optional callback taking the elapsed seconds, called while waiting.
+            poll_interval (float): Seconds between two calls of `on_wait`.
+
+        Returns:
+            The result, or None if it was not prefetched, was cancelled or failed (compute it as usual then).
+        """
+        task = self._tasks.get(key)
+        if task is None or task.future.cancelled():
+            return None
+        start = time.monotonic()
+        while not wait([task.future], timeout=poll_interval).done:
+            if on_wait is not None:
+                on_wait(time.monotonic() - start)
+        self._tasks.pop(key, None)
+        if task.future.exception() is not None:
+            self.logger.debug("Prefetch of %s failed: %s", key, task.future.exception())
+            return None
+        return task.future.result()
+
+    def cancel_all(self):
+        """Cancel every pending computation and drop the prefetched results."""
+        self.prefetch({})
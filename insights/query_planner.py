@@ -0,0 +1,341 @@
+AGGREGATE_FUNCTIONS = ("COUNT", "SUM", "AVG", "MIN", "MAX", "RATIO")
+
+
+def _aggregate_sql(function, argument, condition=None):
+    """
+    Render one aggregate, restricted to the rows matching `condition` when given.
+
+    Args:
+        function (str): One of AGGREGATE_FUNCTIONS, or None when `argument` is a complete SQL expression.
+        argument (str | tuple): The aggregated expression ("*" for COUNT(*)), or (numerator, denominator) for
+            RATIO, which computes SUM(numerator) / SUM(denominator).
+        condition (str): Optional SQL predicate turning the aggregate into a conditional aggregate.
+
+    Returns:
+        str: The SQL expression.
+    """
+    if function is None:
+        if condition:
+            raise ValueError("Raw aggregate expressions cannot be made conditional")
+        return argument
+    if function not in AGGREGATE_FUNCTIONS:
+        raise ValueError(f"Unsupported aggregate function: {function}")
+
+    def restrict(expression):
+        return (
+            f"CASE WHEN {condition} THEN {expression} END" if condition else expression
+        )
+
+    if function == "RATIO":
+        numerator, denominator = argument
+        return f"SUM({restrict(numerator)}) / NULLIF(SUM({restrict(denominator)}), 0)"
+    if function == "COUNT" and argument == "*":
+        return f"COUNT({restrict('1')})" if condition else "COUNT(*)"
+    return f"{function}({restrict(argument)})"
+
+
+def where_clause(spec):
+    """Return the WHERE predicate combining a spec's static filter and its parameterized "where" entry."""
+    predicates = [
+        predicate
+        for predicate in (spec.get("filter"), spec.get("where", (None,))[0])
+        if predicate
+    ]
+    if len(predicates) > 1:
+        return " AND ".join(f"({predicate})" for predicate in predicates)
+    return predicates[0] if predicates else None
+
+
+def query_params(spec):
+    """
+    Return the parameters of the query `build_query` builds for a spec.
+
+    Args:
+        spec (dict): The insight spec.
+
+    Returns:
+        tuple: The parameters, or None when the query takes none.
+    """
+    params = tuple(spec.get("where", (None, ()))[1])
+    if not params:
+        return None
+    options = spec.get("histogram")
+    if (
+        options
+        and options.get("method", "fixed") == "fixed"
+        and options.get("width") is None
+    ):
+        # The bin range subquery repeats the predicate.
+        return params * 2
+    return params
+
+
+def histogram_query(
+    source, expression, bins=20, width=None, method="fixed", condition=None
+):
+    """
+    Build a query computing a histogram inside the database, so only one row per bin is transferred.
+
+    Fixed-width bins either use an explicit `width` (bins start at multiples of it, e.g. 1 for integer counts)
+    or split the range between the smallest and largest value into `bins` equal parts; the range comes from a
+    one-row derived table joined to the values, so the histogram still takes a single round trip. Quantile
+    bins number the sorted values with NTILE and report each bin's value range, which keeps bins balanced on
+    skewed data.
+
+    Args:
+        source (str): The FROM clause.
+        expression (str): The binned expression; NULL values are left out.
+        bins (int): The number of bins (ignored when `width` is given).
+        width (float): Optional fixed bin width.
+        method (str): "fixed" or "quantile".
+        condition (str): Optional SQL predicate on the source rows.
+
+    Returns:
+        str: The query. Fixed-width histograms return (bin_start, frequency) rows, quantile histograms
+            (bin_start, bin_end, frequency) rows, both ordered by bin_start.
+    """
+    where = f"WHERE {expression} IS NOT NULL" + (
+        f" AND ({condition})" if condition else ""
+    )
+    if method == "quantile":
+        return (
+            f"SELECT MIN(value) AS bin_start, MAX(value) AS bin_end, COUNT(*) AS frequency "  # noqa: S608  # built from INSIGHT_SPECS
+            f"FROM (SELECT {expression} AS value, NTILE({int(bins)}) OVER (ORDER BY {expression}) AS bin "
+            f"FROM {source} {where}) AS ranked GROUP BY bin ORDER BY bin_start;"
+        )
+    if method != "fixed":
+        raise ValueError(f"Unsupported histogram method: {method}")
+    if width is not None:
+        return (
+            f"SELECT FLOOR({expression} / {width}) * {width} AS bin_start, COUNT(*) AS frequency "  # noqa: S608  # built from INSIGHT_SPECS
+            f"FROM {source} {where} GROUP BY bin_start ORDER BY bin_start;"
+        )
+    bins = int(bins)
+    return (
+        f"SELECT lo + bin * bin_width AS bin_start, COUNT(*) AS frequency "  # noqa: S608  # built from INSIGHT_SPECS
+        f"FROM (SELECT LEAST(COALESCE(FLOOR((value - lo) / NULLIF(bin_width, 0)), 0), {bins - 1}) AS bin, "
+        f"lo, bin_width FROM (SELECT {expression} AS value FROM {source} {where}) AS v "
+        f"CROSS JOIN (SELECT MIN({expression}) AS lo, (MAX({expression}) - MIN({expression})) / {bins} "
+        f"AS bin_width FROM {source} {where}) AS r) AS binned "
+        f"GROUP BY bin, lo, bin_width ORDER BY bin_start;"
+    )
+
+
+def build_query(spec):
+    """
+    Build the SQL of a single insight from its declarative spec.
+
+    A spec is a dictionary with:
+        - "source": the FROM clause (a table, optionally with joins).
+        - "group_by": (alias, expression) pairs of the grouping keys.
+        - "aggregates": (alias, function, argument) triples, see `_aggregate_sql`.
+        - "columns": (alias, expression) pairs selected without aggregation, for insights without aggregates.
+        - "filter": optional SQL predicate on the source rows.
+        - "order_by": optional (alias, ascending) pairs.
+        - "limit": optional maximum number of rows.
+        - "where": optional (predicate, parameters) pair with `%s` placeholders, e.g. a time window (see
+          `filters.apply_filters`); combined with "filter". The parameters come from `query_params`.
+        - "histogram": for distribution insights, the binned "expression" with the "bins", "width" and
+          "method" options of `histogram_query`; replaces the grouping, aggregates and ordering.
+
+    Args:
+        spec (dict): The insight spec.
+
+    Returns:
+        str: The query.
+    """
+    if spec.get("histogram"):
+        options = spec["histogram"]
+        return histogram_query(
+            spec["source"],
+            options["expression"],
+            options.get("bins", 20),
+            options.get("width"),
+            options.get("method", "fixed"),
+            where_clause(spec),
+        )
+    select = [
+        expression if expression == alias else f"{expression} AS {alias}"
+        for alias, expression in spec.get("group_by", []) + spec.get("columns", [])
+    ]
+    select += [
+        f"{_aggregate_sql(function, argument)} AS {alias}"
+        for alias, function, argument in spec.get("aggregates", [])
+    ]
+    sql = f"SELECT {', '.join(select)} FROM {spec['source']}"  # noqa: S608  # built from INSIGHT_SPECS
+    if where_clause(spec):
+        sql += f" WHERE {where_clause(spec)}"
+    if spec.get("group_by"):
+        sql += (
+            f" GROUP BY {', '.join(expression for _, expression in spec['group_by'])}"
+        )
+    if spec.get("order_by"):
+        sql += " ORDER BY " + ", ".join(
+            f"{alias} {'ASC' if ascending else 'DESC'}"
+            for alias, ascending in spec["order_by"]
+        )
+    if spec.get("limit"):
+        sql += f" LIMIT {int(spec['limit'])}"
+    return sql + ";"
+
+
+def _merge_key(spec):
+    if not spec.get("aggregates") or spec.get("columns"):
+        return None
+    where, params = spec.get("where", (None, ()))
+    return (
+        spec["source"],
+        tuple(expression for _, expression in spec.get("group_by", [])),
+        where,
+        tuple(params),
+    )
+
+
+def _has_raw_aggregates(spec):
+    return any(function is None for _, function, _ in spec["aggregates"])
+
+
+def _single_plan(name, spec):
+    return {
+        "sql": build_query(spec),
+        "params": query_params(spec),
+        "insights": [(name, None)],
+    }
+
+
+def _plan_group(members):
+    """Build the single-pass plan of insights sharing a source and grouping."""
+    filters = {spec.get("filter") for _, spec in members}
+    common_filter = filters.pop() if len(filters) == 1 else None
+    source = members[0][1]["source"]
+    group_by = members[0][1].get("group_by", [])
+    select = [
+        f"{expression} AS key_{index}" for index, (_, expression) in enumerate(group_by)
+    ]
+    aggregate_columns = {}
+    count_columns = {}
+
+    def column_for(sql_expression):
+        if sql_expression not in aggregate_columns:
+            aggregate_columns[sql_expression] = f"agg_{len(aggregate_columns)}"
+            select.append(f"{sql_expression} AS {aggregate_columns[sql_expression]}")
+        return aggregate_columns[sql_expression]
+
+    insights = []
+    for name, spec in members:
+        condition = None if common_filter is not None else spec.get("filter")
+        output = {
+            "keys": [
+                (f"key_{index}", alias)
+                for index, (alias, _) in enumerate(spec.get("group_by", []))
+            ],
+            "aggregates": [
+                (column_for(_aggregate_sql(function, argument, condition)), alias)
+                for alias, function, argument in spec["aggregates"]
+            ],
+            "count_column": None,
+            "order_by": spec.get("order_by", []),
+            "limit": spec.get("limit"),
+        }
+        if condition:
+            if condition not in count_columns:
+                count_columns[condition] = column_for(
+                    _aggregate_sql("COUNT", "*", condition)
+                )
+            output["count_column"] = count_columns[condition]
+        insights.append((name, output))
+
+    sql = f"SELECT {', '.join(select)} FROM {source}"  # noqa: S608  # built from INSIGHT_SPECS
+    where = where_clause(
+        {"filter": common_filter, "where": members[0][1].get("where", (None, ()))}
+    )
+    if where:
+        sql += f" WHERE {where}"
+    if group_by:
+        sql += f" GROUP BY {', '.join(expression for _, expression in group_by)}"
+    return {
+        "sql": sql + ";",
+        "params": query_params(members[0][1]),
+        "insights": insights,
+    }
+
+
+def plan_insights(specs):
+    """
+    Group insights that aggregate the same source by the same keys into single-pass query plans.
+
+    Within a group, aggregates are de-duplicated. When the insights use different filters, each filtered
+    aggregate becomes a conditional aggregate (`AGG(CASE WHEN filter THEN ... END)`) and a hidden
+    per-filter row count lets the fan-out drop groups that have no matching rows; a filter shared by every
+    insight of the group is applied in the WHERE clause instead. Insights with raw aggregate expressions
+    cannot be made conditional, so they are planned on their own when the filters of their group differ.
+    Ordering and limits are applied during the fan-out.
+
+    Args:
+        specs (dict): Insight name -> spec, see `build_query`.
+
+    Returns:
+        list: Plans, each a dictionary with the "sql" to run, its "params" and the "insights" it serves: a list of
+            (name, output) pairs where output describes how to cut the insight out of the result
+            (see `fan_out`).
+    """
+    groups = {}
+    plans = []
+    for name, spec in specs.items():
+        key = _merge_key(spec)
+        if key is None:
+            plans.append(_single_plan(name, spec))
+            continue
+        groups.setdefault(key, []).append((name, spec))
+
+    for members in groups.values():
+        if len({spec.get("filter") for _, spec in members}) > 1:
+            raw = [(name, spec) for name, spec in members if _has_raw_aggregates(spec)]
+            members = [
+                (name, spec) for name, spec in members if not _has_raw_aggregates(spec)
+            ]
+            for name, spec in raw:
+                plans.append(_single_plan(name, spec))
+            if not members:
+                continue
+        if len(members) == 1:
+            name, spec = members[0]
+            plans.append(_single_plan(name, spec))
+        else:
+            plans.append(_plan_group(members))
+    return plans
+
+
+def fan_out(plan, frame):
+    """
+    Cuts the result of a plan into the results of its insights.
+
+    Args:
+        plan (dict): A plan returned by `plan_insights`.
+        frame (pd.DataFrame): The result of running the plan's SQL.
+
+    Returns:
+        dict: Insight name -> result DataFrame, with the columns, order and row limit of the insight's own query.
+    """
+    results = {}
+    for name, output in plan["insights"]:
+        if output is None:
+            results[name] = frame
+            continue
+        result = frame
+        if output["count_column"]:
+            result = result[result[output["count_column"]] > 0]
+        columns = output["keys"] + output["aggregates"]
+        result = result[[column for column, _ in columns]].rename(columns=dict(columns))
+        if output["order_by"]:
+            # MySQL sorts NULLs first in ascending and last in descending order.
+            result = result.sort_values(
+                [alias for alias, _ in output["order_by"]],
+                ascending=[ascending for _, ascending in output["order_by"]],
+                kind="stable",
+                na_position="first" if output["order_by"][0][1] else "last",
+            )
+        if output["limit"]:
+            result = result.head(int(output["limit"]))
+        results[name] = result.reset_index(drop=True)
+    return results
@@ -0,0 +1,232 @@
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, wait
+
+import pymysql
+
+# MySQL errors of a statement stopped by `max_execution_time` and by `KILL QUERY`.
+ER_QUERY_TIMEOUT = 3024
+ER_QUERY_INTERRUPTED = 1317
+# Extra seconds the client waits past the server-side limit before killing the query itself.
+DEADLINE_GRACE_SECONDS = 1.0
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="insight-query")
+
+
+def with_max_execution_time(sql, timeout_seconds):
+    """
+    Add a `MAX_EXECUTION_TIME` optimizer hint to a query, so the server aborts it once the limit is reached.
+
+    Unlike `SET SESSION max_execution_time`, the hint is part of the statement and leaves no state behind on
+    pooled connections. MySQL only honours it on top-level SELECT statements; other statements are returned
+    unchanged.
+
+    Args:
+        sql (str): The query.
+        timeout_seconds (float): The execution time limit, or None for no limit.
+
+    Returns:
+        str: The query with the hint.
+    """
+    stripped = sql.lstrip()
+    if not timeout_seconds or stripped[:6].upper() != "SELECT":
+        return sql
+    return f"SELECT /*+ MAX_EXECUTION_TIME({max(1, int(timeout_seconds * 1000))}) */{stripped[6:]}"
+
+
+def is_timeout(error):
+    """Return whether a MySQL error reports a statement stopped by `max_execution_time`."""
+    return bool(error.args) and error.args[0] == ER_QUERY_TIMEOUT
+
+
+def kill_query(connection_factory, thread_id):
+    """
+    Stop the statement running on another connection, leaving that connection open.
+
+    Args:
+        connection_factory (callable): Opens the side connection the kill is issued on.
+        thread_id (int): The server thread id of the connection running the statement.
+    """
+    connection = connection_factory()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("KILL QUERY %s;", (int(thread_id),))
+    finally:
+        connection.close()
+
+
+class _RunningQuery:
+    """A queued or running query, which may be killed only while it holds its pooled connection."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.future = None
+        # Set once the worker holds a connection; None while the query is queued or waiting for one.
+        self.thread_id = None
+        self.stopped = False
+        self.finished = False
+        self.lock = threading.Lock()
+
+
+class QueryRunner:
+    """
+    Runs insight queries on pooled connections so they can be abandoned without blocking the caller.
+
+    The query runs on a worker thread, which takes its connection from the pool only once it starts, while the
+    caller waits in short steps, calling back between them. If the wait is interrupted (e.g. a Streamlit rerun
+    raising out of the callback), the client-side deadline passes, or a newer query is started for the same
+    owner, a query still queued is cancelled, one waiting for a connection gives up, and a running statement
+    is stopped with `KILL QUERY` from a side connection. The worker then hands its connection straight back to
+    the pool, and the server stops spending CPU on a result nobody will read.
+    """
+
+    _lock = threading.Lock()
+    # Owner -> the _RunningQuery currently running on the owner's behalf.
+    _running = {}
+
+    def __init__(
+        self, pool, timeout_seconds: float = None, poll_interval: float = 0.25
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            pool (ConnectionPool): The pool the queries take their connections from.
+            timeout_seconds (float): Optional execution time limit, which also bounds the wait for a pooled
+                connection; the client kills queries still running `DEADLINE_GRACE_SECONDS` after it, in case the
+                server-side limit did not apply.
+            poll_interval (float): Seconds between two calls of the waiting callback.
+        """
+        self.pool = pool
+        self.timeout_seconds = timeout_seconds
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def _work(self, query, compute):
+        connection = self.pool.acquire(self.timeout_seconds)
+        try:
+            with query.lock:
+                if query.stopped:
+                    # Abandoned while waiting for the connection: the statement must not start at all.
+                    raise CancelledError()
+                query.thread_id = connection.thread_id()
+            return compute(connection)
+        finally:
+            with query.lock:
+                # From now on the connection may serve another session's query, which must not be killed.
+                query.finished = True
+            # The connection is reusable once the statement has returned, killed or not.
+            self.pool.release(connection)
+
+    def _kill(self, query, reason):
+        if query.future.cancel():
+            return
+        # Holding the lock keeps the worker from releasing the connection while the kill is sent.
+        with query.lock:
+            query.stopped = True
+            if query.finished or query.thread_id is None:
+                return
+            self.logger.info(
+                "Killing query on connection %d (%s)", query.thread_id, reason
+            )
+            try:
+                kill_query(query.pool.connection_factory, query.thread_id)
+            except pymysql.MySQLError as e:
+                # The statement may have finished in the meantime.
+                self.logger.warning(
+                    "Error killing query on connection %d: %s", query.thread_id, e
+                )
+
+    def cancel(self, owner):
+        """
+        Stop the query running on behalf of an owner, if any.
+
+        Args:
+            owner (str): The owner given to `run`.
+        """
+        with self._lock:
+            query = self._running.pop(owner, None)
+        if query is not None:
+            self._kill(query, f"superseded for {owner}")
+
+    def run(self, compute, owner=None, on_wait=None):
+        """
+        Run a computation on a pooled connection and wait for its result.
+
+        Args:
+            compute (callable): Takes the connection and returns the result, e.g. a function calling
+                `InsightsManager(connection).fetch_insight(...)`.
+            owner (str): Optional owner of the query, e.g. a user session. Starting a query for an owner stops
+                the query still running for it, which a newer request has superseded.
+            on_wait (callable): Optional callback taking the elapsed seconds, called while the query runs.
+                Exceptions it raises abandon the query and are re-raised.
+
+        Returns:
+            The result of `compute`.
+
+        Raises:
+            TimeoutError: If the query ran past the execution time limit, or no pooled connection became free
+                within it.
+        """
+        if owner is not None:
+            self.cancel(owner)
+        query = _RunningQuery(self.pool)
+        query.future = _executor.submit(self._work, query, compute)
+        if owner is not None:
+            with self._lock:
+                self._running[owner] = query
+
+        start = time.monotonic()
+        deadline = (
+            start + self.timeout_seconds + DEADLINE_GRACE_SECONDS
+            if self.timeout_seconds
+            else None
+        )
+        timed_out = False
+        try:
+            while True:
+                if wait([query.future], timeout=self.poll_interval).done:
+                    try:
+                        return query.future.result()
+                    except CancelledError as e:
+                        if timed_out:
+                            raise TimeoutError(
+                                f"Query timed out after {self.timeout_seconds:g} seconds"
+                            ) from e
+                        raise e
+                    except pymysql.MySQLError as e:
+                        if is_timeout(e) or (
+                            timed_out and e.args and e.args[0] == ER_QUERY_INTERRUPTED
+                        ):
+                            raise TimeoutError(
+                                f"Query timed out after {self.timeout_seconds:g} seconds"
+                            ) from e
+                        raise e
+                elapsed = time.monotonic() - start
+                if (
+                    deadline is not None
+                    and not timed_out
+                    and start + elapsed >= deadline
+                ):
+                    timed_out = True
+                    self._kill(query, "deadline passed")
+                if on_wait is not None:
+                    on_wait(elapsed)
+        finally:
+            if owner is not None:
+                with self._lock:
+                    if self._running.get(owner) is query:
+                        del self._running[owner]
+            if not query.future.done():
+                self._kill(query, "abandoned")
@@ -0,0 +1,186 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from db.write_versions import write_versions
+
+TABLE_REFERENCE_PATTERN = re.compile(
+    r"\b(?:FROM|JOIN)\s+`?([A-Za-z_][A-Za-z0-9_]*)`?", re.IGNORECASE
+)
+
+
+def tables_in_query(sql):
+    """
+    Extract the names of the tables a query reads from its FROM and JOIN clauses.
+
+    Args:
+        sql (str): The query.
+
+    Returns:
+        list: The table names, in order of first appearance.
+    """
+    return list(dict.fromkeys(TABLE_REFERENCE_PATTERN.findall(sql)))
+
+
+def database_identity(connection):
+    """
+    Identify the database a connection points at, so results from different databases never mix.
+
+    Args:
+        connection (pymysql.connections.Connection): The connection.
+
+    Returns:
+        tuple: The host, port and database name.
+    """
+    return (
+        getattr(connection, "host", None),
+        getattr(connection, "port", None),
+        getattr(connection, "db", None),
+    )
+
+
+class ResultCache:
+    """
+    A thread-safe cache of insight result DataFrames, bounded by total size in bytes and by age.
+
+    Entries are keyed by the database, the insight name, its SQL and its parameters, together with the write
+    versions of the tables the SQL reads. Any write to one of those tables through this process therefore
+    makes the entry unreachable; writes from other processes are covered by the TTL. The least recently
+    used entries are evicted once `max_bytes` is exceeded.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl_seconds=600):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_bytes (int): Maximum total in-memory size of the cached DataFrames.
+            ttl_seconds (float): Number of seconds after which a cached result is considered stale.
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(connection, insight_name, sql, params=None):
+        """
+        Build the cache key of an insight result, including the write versions of the tables it reads.
+
+        Args:
+            connection (pymysql.connections.Connection): The connection the query runs on.
+            insight_name (str): The insight name.
+            sql (str): The insight SQL.
+            params (tuple | list | dict): The query parameters.
+
+        Returns:
+            tuple: The cache key.
+        """
+        if isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        elif params is not None:
+            params = tuple(params)
+        return (
+            database_identity(connection),
+            insight_name,
+            sql,
+            params,
+            write_versions.snapshot(tables_in_query(sql)),
+        )
+
+    def get(self, key):
+        """
+        Look up a cached result.
+
+        Args:
+            key (tuple): A key built by `make_key`.
+
+        Returns:
+            pd.DataFrame: The cached result (do not modify it in place), or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, frame):
+        """
+        Store a result, evicting the least recently used results beyond the size limit.
+
+        Args:
+            key (tuple): A key built by `make_key`.
+            frame (pd.DataFrame): The result to cache.
+        """
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), frame, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def get_or_compute(self, connection, insight_name, sql, compute, params=None):
+        """
+        Return a cached insight result, computing and caching it on a miss.
+
+        Args:
+            connection (pymysql.connections.Connection): The connection the query runs on.
+            insight_name (str): The insight name.
+            sql (str): The insight SQL.
+            compute (callable): Produces the result DataFrame on a miss.
+            params (tuple | list | dict): The query parameters.
+
+        Returns:
+            pd.DataFrame: The result (do not modify it in place).
+        """
+        key = self.make_key(connection, insight_name, sql, params)
+        frame = self.get(key)
+        if frame is None:
+            frame = compute()
+            self.put(key, frame)
+        return frame
+
+    def clear(self):
+        """Remove every cached result and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        Report the cache statistics.
+
+        Returns:
+            dict: The number of hits, misses and cached results, the cached bytes and the hit ratio.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "bytes": self.current_bytes,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Process-wide result cache shared by all Streamlit sessions.
+result_cache = ResultCache()
@@ -0,0 +1,459 @@
+import logging
+import math
+import threading
+import time
+
+import pymysql
+
+from db.change_log import ChangeLog
+from db.write_versions import write_versions
+from insights.result_cache import database_identity
+
+DAILY_ROLLUP_TABLE = "orders_daily"
+MONTHLY_ROLLUP_TABLE = "orders_monthly"
+ROLLUP_STATE_TABLE = "rollup_state"
+ROLLUP_TABLES = (DAILY_ROLLUP_TABLE, MONTHLY_ROLLUP_TABLE)
+
+# Measures kept per (day, status). Averages are derived as sum / count, so they can be re-aggregated.
+ROLLUP_MEASURES = (
+    "order_count",
+    "amount_count",
+    "amount_sum",
+    "rating_count",
+    "rating_sum",
+    "delivery_minutes_count",
+    "delivery_minutes_sum",
+)
+ORDER_AGGREGATES = """
+    COUNT(*), COUNT(total_amount), COALESCE(SUM(total_amount), 0),
+    COUNT(feedback_rating), COALESCE(SUM(feedback_rating), 0),
+    COUNT(TIMESTAMPDIFF(MINUTE, order_date, delivery_time)),
+    COALESCE(SUM(TIMESTAMPDIFF(MINUTE, order_date, delivery_time)), 0)
+"""
+# Order columns feeding the rollups; updates touching none of them leave the rollups unchanged.
+ROLLUP_SOURCE_COLUMNS = {
+    "order_date",
+    "status",
+    "total_amount",
+    "feedback_rating",
+    "delivery_time",
+}
+
+
+class RollupManager:
+    """
+    Maintains the `orders_daily` rollup and the `orders_monthly` rollup derived from it.
+
+    `orders_daily` holds the order measures per day and status.
+
+    `refresh` is incremental: orders above the stored `order_id` watermark are aggregated and added to their
+    days, and updates recorded in the change log since the stored sequence number cause only the affected
+    days to be recomputed. Changes whose previous values are unknown (deletes, bulk loads, updates that move
+    an order to another day, a truncated `orders` table) trigger a full rebuild instead. Orders without an
+    `order_date` are not rolled up, and a NULL status is stored as ''.
+
+    Without the change log only new orders are picked up; `check_consistency` compares the rollup with the
+    base table and `rebuild` repairs it.
+    """
+
+    _ensured = set()
+    _refreshed = {}
+    _refreshed_lock = threading.Lock()
+    REFRESH_INTERVAL_SECONDS = 30
+
+    def __init__(self, connection):
+        """
+        Initialize the RollupManager with an active MySQL database connection.
+
+        Args:
+            connection (pymysql.connections.Connection): Active connection to the MySQL database.
+        """
+        self.connection = connection
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def ensure_tables(self):
+        """Create the rollup and rollup state tables if they do not exist (checked once per database)."""
+        database_key = database_identity(self.connection)
+        if database_key in self._ensured:
+            return
+        measures = """
+                order_count BIGINT NOT NULL,
+                amount_count BIGINT NOT NULL,
+                amount_sum DOUBLE NOT NULL,
+                rating_count BIGINT NOT NULL,
+                rating_sum DOUBLE NOT NULL,
+                delivery_minutes_count BIGINT NOT NULL,
+                delivery_minutes_sum DOUBLE NOT NULL,
+        """
+        statements = [
+            f"""
+            CREATE TABLE IF NOT EXISTS {DAILY_ROLLUP_TABLE} (
+                order_day DATE NOT NULL,
+                status VARCHAR(255) NOT NULL,
+                {measures}
+                PRIMARY KEY (order_day, status)
+            );
+            """,
+            f"""
+            CREATE TABLE IF NOT EXISTS {MONTHLY_ROLLUP_TABLE} (
+                order_month CHAR(7) NOT NULL,
+                status VARCHAR(255) NOT NULL,
+                {measures}
+                PRIMARY KEY (order_month, status)
+            );
+            """,
+            f"""
+            CREATE TABLE IF NOT EXISTS {ROLLUP_STATE_TABLE} (
+                rollup_name VARCHAR(64) NOT NULL,
+                last_order_id BIGINT NOT NULL,
+                last_change_seq BIGINT NOT NULL,
+                refreshed_at DATETIME(6) NULL,
+                PRIMARY KEY (rollup_name)
+            );
+            """,
+            f"INSERT IGNORE INTO {ROLLUP_STATE_TABLE} (rollup_name, last_order_id, last_change_seq) "  # noqa: S608  # constant tables and measures
+            f"VALUES ('{DAILY_ROLLUP_TABLE}', -1, 0);",
+        ]
+        try:
+            with self.connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+            self.connection.commit()
+            self._ensured.add(database_key)
+            self.logger.info("Rollup tables are ready.")
+        except pymysql.MySQLError as e:
+            self.logger.error("Error creating rollup tables: %s", e)
+            raise e
+
+    def _daily_select(self, condition):
+        return (
+            f"SELECT DATE(order_date), COALESCE(status, ''), {ORDER_AGGREGATES} FROM orders "  # noqa: S608  # constant tables and measures
+            f"WHERE order_date IS NOT NULL AND {condition} "
+            f"GROUP BY DATE(order_date), COALESCE(status, '')"
+        )
+
+    def _rebuild_months(self, cursor, months=None):
+        """Recomputes `orders_monthly` from `orders_daily`, for the given months or entirely."""
+        sums = ", ".join(f"SUM({measure})" for measure in ROLLUP_MEASURES)
+        condition, values = "1 = 1", []
+        if months is not None:
+            months = sorted(months)
+            if not months:
+                return
+            condition = f"DATE_FORMAT(order_day, '%%Y-%%m') IN ({', '.join(['%s'] * len(months))})"
+            values = months
+            cursor.execute(
+                f"DELETE FROM {MONTHLY_ROLLUP_TABLE} "  # noqa: S608  # constant tables and measures
+                f"WHERE order_month IN ({', '.join(['%s'] * len(months))});",
+                months,
+            )
+        else:
+            cursor.execute(f"DELETE FROM {MONTHLY_ROLLUP_TABLE};")  # noqa: S608  # constant tables and measures
+        cursor.execute(
+            f"INSERT INTO {MONTHLY_ROLLUP_TABLE} (order_month, status, {', '.join(ROLLUP_MEASURES)}) "  # noqa: S608  # constant tables and measures
+            f"SELECT DATE_FORMAT(order_day, '%%Y-%%m'), status, {sums} FROM {DAILY_ROLLUP_TABLE} "
+            f"WHERE {condition} GROUP BY DATE_FORMAT(order_day, '%%Y-%%m'), status;",
+            values,
+        )
+
+    def _recompute_days(self, cursor, days, high_order_id):
+        placeholders = ", ".join(["%s"] * len(days))
+        cursor.execute(
+            f"DELETE FROM {DAILY_ROLLUP_TABLE} WHERE order_day IN ({placeholders});",  # noqa: S608  # constant tables and measures
+            list(days),
+        )
+        cursor.execute(
+            f"INSERT INTO {DAILY_ROLLUP_TABLE} (order_day, status, {', '.join(ROLLUP_MEASURES)}) "
+            + self._daily_select(
+                f"order_id <= %s AND DATE(order_date) IN ({placeholders})"
+            )
+            + ";",
+            [high_order_id, *days],
+        )
+
+    def _add_new_orders(self, cursor, low_order_id, high_order_id, skip_days):
+        """Aggregate orders in (low, high] and add them to their days, returning the days touched."""
+        condition, values = (
+            "order_id > %s AND order_id <= %s",
+            [low_order_id, high_order_id],
+        )
+        if skip_days:
+            condition += (
+                f" AND DATE(order_date) NOT IN ({', '.join(['%s'] * len(skip_days))})"
+            )
+            values.extend(skip_days)
+        cursor.execute(self._daily_select(condition) + ";", values)
+        rows = cursor.fetchall()
+        if not rows:
+            return set()
+        updates = ", ".join(
+            f"{measure} = {DAILY_ROLLUP_TABLE}.{measure} + new.{measure}"
+            for measure in ROLLUP_MEASURES
+        )
+        placeholders = "(" + ", ".join(["%s"] * (len(ROLLUP_MEASURES) + 2)) + ")"
+        cursor.execute(
+            f"INSERT INTO {DAILY_ROLLUP_TABLE} (order_day, status, {', '.join(ROLLUP_MEASURES)}) "  # noqa: S608  # constant tables and measures
+            f"VALUES {', '.join([placeholders] * len(rows))} AS new ON DUPLICATE KEY UPDATE {updates};",
+            [value for row in rows for value in row],
+        )
+        return {row[0] for row in rows}
+
+    def _pending_changes(self, change_log, last_change_seq, last_order_id):
+        """
+        Read the order changes recorded since the stored sequence number.
+
+        Inserts are not replayed: new orders are picked up by the order_id watermark. An insert with an
+        explicit order_id below the watermark is therefore only caught by `check_consistency`.
+
+        Returns:
+            tuple: The order ids whose days must be recomputed (None if a rebuild is needed) and the new
+                change sequence watermark.
+        """
+        order_ids = set()
+        needs_rebuild = False
+        while True:
+            changes, last_change_seq = change_log.changes_since(
+                last_change_seq,
+                ["orders"],
+                operations=["update", "upsert", "delete", "load"],
+            )
+            if not changes:
+                break
+            for change in changes:
+                by_order_id = (
+                    change["key_column"] == "order_id"
+                    and change["record_key"] is not None
+                )
+                if by_order_id and int(change["record_key"]) > last_order_id:
+                    continue  # not rolled up yet; picked up by the order_id watermark
+                if change["operation"] == "update" and change["payload"] is not None:
+                    columns = set(change["payload"])
+                    if not columns & (ROLLUP_SOURCE_COLUMNS | {"order_id"}):
+                        continue
+                    if by_order_id and not columns & {"order_date", "order_id"}:
+                        order_ids.add(int(change["record_key"]))
+                        continue
+                needs_rebuild = True
+        return (None if needs_rebuild else order_ids), last_change_seq
+
+    def _store_state(self, cursor, last_order_id, last_change_seq):
+        cursor.execute(
+            f"UPDATE {ROLLUP_STATE_TABLE} SET last_order_id = %s, last_change_seq = %s, "  # noqa: S608  # constant tables and measures
+            f"refreshed_at = NOW(6) WHERE rollup_name = %s;",
+            (last_order_id, last_change_seq, DAILY_ROLLUP_TABLE),
+        )
+
+    def _rebuild(self, cursor, high_order_id, last_change_seq):
+        cursor.execute(f"DELETE FROM {DAILY_ROLLUP_TABLE};")  # noqa: S608  # constant tables and measures
+        cursor.execute(
+            f"INSERT INTO {DAILY_ROLLUP_TABLE} (order_day, status, {', '.join(ROLLUP_MEASURES)}) "
+            + self._daily_select("order_id <= %s")
+            + ";",
+            (high_order_id,),
+        )
+        self._rebuild_months(cursor)
+        self._store_state(cursor, high_order_id, last_change_seq)
+
+    def refresh(self, force_rebuild: bool = False):
+        """
+        Brings the rollups up to date with the `orders` table.
+
+        Runs in one transaction holding a lock on the rollup state row, so concurrent refreshes queue up.
+
+        Args:
+            force_rebuild (bool): Recompute the rollups from scratch instead of incrementally.
+
+        Returns:
+            dict: The refresh mode ("unchanged", "incremental" or "rebuild"), the number of days recomputed or
+                touched by new orders, the new order_id watermark and the elapsed seconds.
+        """
+        start = time.monotonic()
+        self.ensure_tables()
+        change_log = ChangeLog(self.connection)
+        capture_enabled = change_log.is_enabled()
+        stats = {"mode": "unchanged", "days": 0}
+
+        try:
+            self.connection.begin()
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT last_order_id, last_change_seq FROM {ROLLUP_STATE_TABLE} "  # noqa: S608  # constant tables and measures
+                    f"WHERE rollup_name = %s FOR UPDATE;",
+                    (DAILY_ROLLUP_TABLE,),
+                )
+                last_order_id, last_change_seq = cursor.fetchone()
+                cursor.execute("SELECT COALESCE(MAX(order_id), 0) FROM orders;")
+                high_order_id = int(cursor.fetchone()[0])
+
+                order_ids, new_change_seq = set(), last_change_seq
+                rebuild = (
+                    force_rebuild or last_order_id < 0 or high_order_id < last_order_id
+                )
+                if not rebuild and capture_enabled:
+                    order_ids, new_change_seq = self._pending_changes(
+                        change_log, last_change_seq, last_order_id
+                    )
+                    rebuild = order_ids is None
+
+                if rebuild:
+                    self._rebuild(
+                        cursor,
+                        high_order_id,
+                        change_log.latest_sequence() if capture_enabled else 0,
+                    )
+                    stats["mode"] = "rebuild"
+                else:
+                    days = []
+                    if order_ids:
+                        cursor.execute(
+                            f"SELECT DISTINCT DATE(order_date) FROM orders WHERE order_date IS NOT NULL "  # noqa: S608  # constant tables and measures
+                            f"AND order_id IN ({', '.join(['%s'] * len(order_ids))});",
+                            sorted(order_ids),
+                        )
+                        days = sorted(row[0] for row in cursor.fetchall())
+                        if days:
+                            self._recompute_days(cursor, days, high_order_id)
+                    touched = set(days) | self._add_new_orders(
+                        cursor, last_order_id, high_order_id, days
+                    )
+                    self._rebuild_months(
+                        cursor, {day.strftime("%Y-%m") for day in touched}
+                    )
+                    if (
+                        touched
+                        or high_order_id != last_order_id
+                        or new_change_seq != last_change_seq
+                    ):
+                        self._store_state(cursor, high_order_id, new_change_seq)
+                    if touched:
+                        stats["mode"] = "incremental"
+                    stats["days"] = len(touched)
+            self.connection.commit()
+        except pymysql.MySQLError as e:
+            self.connection.rollback()
+            self.logger.error("Error refreshing rollups: %s", e)
+            raise e
+
+        if stats["mode"] != "unchanged":
+            for table_name in ROLLUP_TABLES:
+                write_versions.bump(table_name)
+        stats["last_order_id"] = high_order_id
+        stats["seconds"] = time.monotonic() - start
+        self.logger.info(
+            "Rollup refresh (%s): %d day(s) up to order %d in %.2fs",
+            stats["mode"],
+            stats["days"],
+            high_order_id,
+            stats["seconds"],
+        )
+        return stats
+
+    def refresh_if_stale(self):
+        """
+        Refresh the rollups unless they were refreshed recently and `orders` was not written to since.
+
+        `refresh` locks the rollup state row and reads the change log, so lookups of rollup insights call this
+        instead: writes made by this process are picked up on the next lookup, writes made by other processes
+        within `REFRESH_INTERVAL_SECONDS`.
+
+        Returns:
+            dict: The refresh statistics as returned by `refresh`, or None if the rollups were fresh.
+        """
+        database_key = database_identity(self.connection)
+        orders_version = write_versions.get("orders")
+        with self._refreshed_lock:
+            last = self._refreshed.get(database_key)
+        started = time.monotonic()
+        if (
+            last
+            and last[1] == orders_version
+            and started - last[0] < self.REFRESH_INTERVAL_SECONDS
+        ):
+            return None
+        stats = self.refresh()
+        with self._refreshed_lock:
+            self._refreshed[database_key] = (started, orders_version)
+        return stats
+
+    def rebuild(self):
+        """
+        Recomputes the rollups from scratch.
+
+        Returns:
+            dict: The refresh statistics, as returned by `refresh`.
+        """
+        return self.refresh(force_rebuild=True)
+
+    def check_consistency(self, tolerance: float = 1e-6):
+        """
+        Compare `orders_daily` with the same aggregates computed from the `orders` table.
+
+        Only the orders covered by the stored watermark are compared. This scans the base table, so it is meant
+        as a periodic check.
+
+        Args:
+            tolerance (float): Relative tolerance for the floating point sums.
+
+        Returns:
+            list: One dictionary per mismatch with the day, status, measure, rollup value and base value;
+                empty when the rollup is consistent.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT last_order_id FROM {ROLLUP_STATE_TABLE} WHERE rollup_name = %s;",  # noqa: S608  # constant tables and measures
+                    (DAILY_ROLLUP_TABLE,),
+                )
+                last_order_id = cursor.fetchone()[0]
+                cursor.execute(
+                    self._daily_select("order_id <= %s") + ";", (last_order_id,)
+                )
+                base = {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+                cursor.execute(
+                    f"SELECT order_day, status, {', '.join(ROLLUP_MEASURES)} FROM {DAILY_ROLLUP_TABLE};"  # noqa: S608  # constant tables and measures
+                )
+                rollup = {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+        except pymysql.MySQLError as e:
+            self.logger.error("Error checking rollup consistency: %s", e)
+            raise e
+
+        zeros = (0,) * len(ROLLUP_MEASURES)
+        mismatches = []
+        for day, status in sorted(base.keys() | rollup.keys()):
+            rollup_values = rollup.get((day, status), zeros)
+            base_values = base.get((day, status), zeros)
+            for measure, rollup_value, base_value in zip(
+                ROLLUP_MEASURES, rollup_values, base_values, strict=True
+            ):
+                if not math.isclose(
+                    float(rollup_value),
+                    float(base_value),
+                    rel_tol=tolerance,
+                    abs_tol=tolerance,
+                ):
+                    mismatches.append(
+                        {
+                            "order_day": day,
+                            "status": status,
+                            "measure": measure,
+                            "rollup": rollup_value,
+                            "base": base_value,
+                        }
+                    )
+        if mismatches:
+            self.logger.warning(
+                "Rollup '%s' has %d mismatching measure(s)",
+                DAILY_ROLLUP_TABLE,
+                len(mismatches),
+            )
+        return mismatches
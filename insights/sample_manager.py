@@ -0,0 +1,334 @@
+import logging
+import time
+
+import numpy as np
+import pymysql
+
+from db.change_log import ChangeLog
+from db.write_versions import write_versions
+
+SAMPLE_STATE_TABLE = "sample_state"
+# Base tables with a maintained sample, and their primary keys.
+SAMPLED_TABLES = {"orders": "order_id", "deliveries": "delivery_id"}
+DEFAULT_SAMPLE_SIZE = 100000
+
+
+def sample_table_name(table_name):
+    """Return the name of the sample table of a base table."""
+    return f"{table_name}_sample"
+
+
+class SampleManager:
+    """
+    Maintains a uniform reservoir sample of a base table in `<table>_sample`, for approximate insights.
+
+    `refresh` feeds the rows above the stored primary key watermark through reservoir sampling (Algorithm R),
+    so the sample stays a uniform sample of every row ingested so far while only new keys are read. Updates
+    and deletes recorded in the change log are applied to the sampled rows; bulk loads and truncated tables
+    trigger a rebuild that samples the whole table again.
+    """
+
+    def __init__(
+        self,
+        connection,
+        table_name,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+        seed: int = None,
+    ):
+        """
+        Initialize the SampleManager.
+
+        Args:
+            connection (pymysql.connections.Connection): Active connection to the MySQL database.
+            table_name (str): The base table, a key of SAMPLED_TABLES.
+            sample_size (int): Number of rows kept in the sample.
+            seed (int): Optional seed of the random generator, for reproducible samples.
+        """
+        if table_name not in SAMPLED_TABLES:
+            raise ValueError(f"Table '{table_name}' has no sample")
+        self.connection = connection
+        self.table_name = table_name
+        self.primary_key = SAMPLED_TABLES[table_name]
+        self.sample_table = sample_table_name(table_name)
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        if not self.logger.handlers:
+            ch = logging.StreamHandler()
+            ch.setLevel(logging.DEBUG)
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+            ch.setFormatter(formatter)
+            self.logger.addHandler(ch)
+
+    def ensure_table(self):
+        """Create the sample table (with the layout of the base table) and the sample state table."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.sample_table} LIKE {self.table_name};"
+                )
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {SAMPLE_STATE_TABLE} (
+                        table_name VARCHAR(64) NOT NULL,
+                        population BIGINT NOT NULL,
+                        last_key BIGINT NOT NULL,
+                        last_change_seq BIGINT NOT NULL,
+                        refreshed_at DATETIME(6) NULL,
+                        PRIMARY KEY (table_name)
+                    );
+                """)
+                cursor.execute(
+                    f"INSERT IGNORE INTO {SAMPLE_STATE_TABLE} (table_name, population, last_key, "  # noqa: S608  # tables from SAMPLED_TABLES
+                    f"last_change_seq) VALUES (%s, 0, -1, 0);",
+                    (self.table_name,),
+                )
+            self.connection.commit()
+        except pymysql.MySQLError as e:
+            self.logger.error(
+                "Error creating sample table '%s': %s", self.sample_table, e
+            )
+            raise e
+
+    def _copy_rows(self, cursor, keys):
+        for start in range(0, len(keys), 1000):
+            chunk = keys[start : start + 1000]
+            cursor.execute(
+                f"INSERT INTO {self.sample_table} SELECT * FROM {self.table_name} "  # noqa: S608  # tables from SAMPLED_TABLES
+                f"WHERE {self.primary_key} IN ({', '.join(['%s'] * len(chunk))});",
+                chunk,
+            )
+
+    def _delete_rows(self, cursor, keys):
+        for start in range(0, len(keys), 1000):
+            chunk = keys[start : start + 1000]
+            cursor.execute(
+                f"DELETE FROM {self.sample_table} "  # noqa: S608  # tables from SAMPLED_TABLES
+                f"WHERE {self.primary_key} IN ({', '.join(['%s'] * len(chunk))});",
+                chunk,
+            )
+
+    def _rebuild(self, cursor):
+        cursor.execute(
+            f"SELECT COUNT(*), COALESCE(MAX({self.primary_key}), 0) FROM {self.table_name};"  # noqa: S608  # tables from SAMPLED_TABLES
+        )
+        population, last_key = (int(value) for value in cursor.fetchone())
+        cursor.execute(f"DELETE FROM {self.sample_table};")  # noqa: S608  # tables from SAMPLED_TABLES
+        if population:
+            # A Bernoulli pass with some headroom, trimmed to the exact size, is a uniform sample in one scan.
+            fraction = min(1.0, 1.1 * self.sample_size / population)
+            cursor.execute(
+                f"INSERT INTO {self.sample_table} SELECT * FROM {self.table_name} "  # noqa: S608  # tables from SAMPLED_TABLES
+                f"WHERE {self.primary_key} <= %s AND RAND() < %s;",
+                (last_key, fraction),
+            )
+            cursor.execute(f"SELECT COUNT(*) FROM {self.sample_table};")  # noqa: S608  # tables from SAMPLED_TABLES
+            excess = int(cursor.fetchone()[0]) - self.sample_size
+            if excess > 0:
+                cursor.execute(
+                    f"DELETE FROM {self.sample_table} ORDER BY RAND() LIMIT %s;",  # noqa: S608  # tables from SAMPLED_TABLES
+                    (excess,),
+                )
+        return population, last_key
+
+    def _sample_new_keys(self, cursor, population, last_key, high_key):
+        """Run reservoir sampling over the keys in (last_key, high_key] and apply the result."""
+        cursor.execute(
+            f"SELECT {self.primary_key} FROM {self.table_name} "  # noqa: S608  # tables from SAMPLED_TABLES
+            f"WHERE {self.primary_key} > %s AND {self.primary_key} <= %s ORDER BY {self.primary_key};",
+            (last_key, high_key),
+        )
+        new_keys = [row[0] for row in cursor.fetchall()]
+        if not new_keys:
+            return population, 0
+        cursor.execute(f"SELECT {self.primary_key} FROM {self.sample_table};")  # noqa: S608  # tables from SAMPLED_TABLES
+        reservoir = [row[0] for row in cursor.fetchall()]
+        original = set(reservoir)
+
+        fill = max(0, min(self.sample_size - len(reservoir), len(new_keys)))
+        reservoir.extend(new_keys[:fill])
+        rest = np.asarray(new_keys[fill:])
+        if len(rest):
+            # Row number n (1-based over the population) replaces a random slot with probability k / n.
+            positions = population + fill + np.arange(1, len(rest) + 1)
+            slots = (self.rng.random(len(rest)) * positions).astype(np.int64)
+            for key, slot in zip(
+                rest[slots < self.sample_size].tolist(),
+                slots[slots < self.sample_size].tolist(),
+                strict=True,
+            ):
+                reservoir[slot] = key
+
+        final = set(reservoir)
+        self._delete_rows(cursor, sorted(original - final))
+        self._copy_rows(cursor, sorted(final - original))
+        return population + len(new_keys), len(new_keys)
+
+    def _apply_changes(self, cursor, change_log, last_change_seq):
+        """Apply updates and deletes since the stored sequence to the sampled rows, returning None to rebuild."""
+        updated, deleted = set(), set()
+        while True:
+            changes, last_change_seq = change_log.changes_since(
+                last_change_seq,
+                [self.table_name],
+                operations=["update", "upsert", "delete", "load"],
+            )
+            if not changes:
+                break
+            for change in changes:
+                if (
+                    change["key_column"] != self.primary_key
+                    or change["record_key"] is None
+                    or change["operation"] == "load"
+                ):
+                    return None, last_change_seq
+                key = int(change["record_key"])
+                (deleted if change["operation"] == "delete" else updated).add(key)
+
+        cursor.execute(f"SELECT {self.primary_key} FROM {self.sample_table};")  # noqa: S608  # tables from SAMPLED_TABLES
+        sampled = {row[0] for row in cursor.fetchall()}
+        refresh_keys = sorted((updated - deleted) & sampled)
+        self._delete_rows(cursor, sorted((deleted | updated) & sampled))
+        self._copy_rows(cursor, refresh_keys)
+        return len(deleted), last_change_seq
+
+    def refresh(self, force_rebuild: bool = False):
+        """
+        Brings the sample up to date with the base table, in one transaction.
+
+        Args:
+            force_rebuild (bool): Sample the whole table again instead of refreshing incrementally.
+
+        Returns:
+            dict: The refresh mode ("unchanged", "incremental" or "rebuild"), the population size, the number of
+                rows in the sample, the number of new rows seen and the elapsed seconds.
+        """
+        start = time.monotonic()
+        self.ensure_table()
+        change_log = ChangeLog(self.connection)
+        capture_enabled = change_log.is_enabled()
+        stats = {"mode": "unchanged", "new_rows": 0}
+
+        try:
+            self.connection.begin()
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT population, last_key, last_change_seq FROM {SAMPLE_STATE_TABLE} "  # noqa: S608  # tables from SAMPLED_TABLES
+                    f"WHERE table_name = %s FOR UPDATE;",
+                    (self.table_name,),
+                )
+                population, last_key, last_change_seq = (
+                    int(value) for value in cursor.fetchone()
+                )
+                cursor.execute(
+                    f"SELECT COALESCE(MAX({self.primary_key}), 0) FROM {self.table_name};"  # noqa: S608  # tables from SAMPLED_TABLES
+                )
+                high_key = int(cursor.fetchone()[0])
+
+                deleted, new_change_seq = 0, last_change_seq
+                rebuild = force_rebuild or last_key < 0 or high_key < last_key
+                if not rebuild and capture_enabled:
+                    deleted, new_change_seq = self._apply_changes(
+                        cursor, change_log, last_change_seq
+                    )
+                    rebuild = deleted is None
+
+                if rebuild:
+                    new_change_seq = (
+                        change_log.latest_sequence(self.table_name)
+                        if capture_enabled
+                        else 0
+                    )
+                    population, high_key = self._rebuild(cursor)
+                    stats["mode"] = "rebuild"
+                else:
+                    population, stats["new_rows"] = self._sample_new_keys(
+                        cursor, max(population - deleted, 0), last_key, high_key
+                    )
+                    population = max(population, 0)
+                    if (
+                        stats["new_rows"]
+                        or deleted
+                        or new_change_seq != last_change_seq
+                    ):
+                        stats["mode"] = "incremental"
+                if stats["mode"] != "unchanged":
+                    cursor.execute(
+                        f"UPDATE {SAMPLE_STATE_TABLE} SET population = %s, last_key = %s, "  # noqa: S608  # tables from SAMPLED_TABLES
+                        f"last_change_seq = %s, refreshed_at = NOW(6) WHERE table_name = %s;",
+                        (population, high_key, new_change_seq, self.table_name),
+                    )
+                cursor.execute(f"SELECT COUNT(*) FROM {self.sample_table};")  # noqa: S608  # tables from SAMPLED_TABLES
+                stats["sample_rows"] = int(cursor.fetchone()[0])
+            self.connection.commit()
+        except pymysql.MySQLError as e:
+            self.connection.rollback()
+            self.logger.error("Error refreshing sample '%s': %s", self.sample_table, e)
+            raise e
+
+        if stats["mode"] != "unchanged":
+            write_versions.bump(self.sample_table)
+        stats["population"] = population
+        stats["seconds"] = time.monotonic() - start
+        self.logger.info(
+            "Sample '%s' refresh (%s): %d of %d rows in %.2fs",
+            self.sample_table,
+            stats["mode"],
+            stats["sample_rows"],
+            population,
+            stats["seconds"],
+        )
+        return stats
+
+    def rebuild(self):
+        """
+        Sample the whole base table again.
+
+        Returns:
+            dict: The refresh statistics, as returned by `refresh`.
+        """
+        return self.refresh(force_rebuild=True)
+
+    def get_state(self):
+        """
+        Return the population size and the number of sampled rows.
+
+        Returns:
+            tuple: (population, sample rows); (0, 0) before the first refresh.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT population FROM {SAMPLE_STATE_TABLE} WHERE table_name = %s;",  # noqa: S608  # tables from SAMPLED_TABLES
+                    (self.table_name,),
+                )
+                result = cursor.fetchone()
+                if result is None:
+                    return 0, 0
+                cursor.execute(f"SELECT COUNT(*) FROM {self.sample_table};")  # noqa: S608  # tables from SAMPLED_TABLES
+                return int(result[0]), int(cursor.fetchone()[0])
+        except pymysql.MySQLError as e:
+            self.logger.error(
+                "Error reading the state of sample '%s': %s", self.sample_table, e
+            )
+            raise e
+
+
+def refresh_samples(connection, sample_size: int = DEFAULT_SAMPLE_SIZE):
+    """
+    Refresh the samples of every sampled table, e.g. after an ingest.
+
+    Args:
+        connection (pymysql.connections.Connection): Active connection to the MySQL database.
+        sample_size (int): Number of rows kept per sample.
+
+    Returns:
+        dict: Table name -> refresh statistics.
+    """
+    return {
+        table_name: SampleManager(connection, table_name, sample_size).refresh()
+        for table_name in SAMPLED_TABLES
+    }
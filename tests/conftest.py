@@ -0,0 +1,84 @@
+import pytest
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+        self.lastrowid = None
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def execute(self, sql, values=None):
+        if sql.startswith("DESCRIBE"):
+            self.description = (("Field",),)
+            self._unread = [(column,) for column in self.connection.columns]
+            return
+        self.connection.statements.append((sql, values))
+        if self.connection.error is not None:
+            raise self.connection.error
+        self.rowcount = (
+            self.connection.rowcount(sql, values)
+            if callable(self.connection.rowcount)
+            else self.connection.rowcount
+        )
+        self.lastrowid = self.connection.lastrowid
+        self.description = self.connection.description
+        rows = self.connection.rows
+        self._unread = list(rows(sql, values) if callable(rows) else rows)
+
+    def fetchall(self):
+        rows, self._unread = self._unread, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self._unread = self._unread[:size], self._unread[size:]
+        return rows
+
+    def fetchone(self):
+        return self._unread.pop(0) if self._unread else None
+
+
+class FakeConnection:
+    """
+    Records the statements and transaction calls of a pymysql connection.
+
+    `rows` and `rowcount` are the result of every statement, or callables computing
+    it from the SQL and values. `DESCRIBE` is answered from `columns` and not recorded.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.transactions = []
+        self.columns = ["customer_id", "name", "email"]
+        self.rows = []
+        self.description = None
+        self.rowcount = 0
+        self.lastrowid = None
+        self.error = None
+        self.open = True
+
+    def cursor(self, *args):
+        return FakeCursor(self)
+
+    def begin(self):
+        self.transactions.append("begin")
+
+    def commit(self):
+        self.transactions.append("commit")
+
+    def rollback(self):
+        self.transactions.append("rollback")
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def connection():
+    return FakeConnection()
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from insights.approximate import build_sample_query, estimate
+
+SPEC = {
+    "source": "orders",
+    "group_by": [("status", "status")],
+    "aggregates": [
+        ("orders", "COUNT", "*"),
+        ("revenue", "SUM", "total_amount"),
+        ("avg_amount", "AVG", "total_amount"),
+    ],
+    "order_by": [("orders", False)],
+}
+
+
+def sample_statistics(groups):
+    rows = []
+    for status, amounts in groups.items():
+        amounts = np.asarray(amounts, dtype=float)
+        rows.append(
+            {
+                "status": status,
+                "orders__n": len(amounts),
+                "revenue__n": len(amounts),
+                "revenue__s": amounts.sum(),
+                "revenue__q": (amounts**2).sum(),
+                "avg_amount__n": len(amounts),
+                "avg_amount__s": amounts.sum(),
+                "avg_amount__q": (amounts**2).sum(),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def test_build_sample_query_selects_sufficient_statistics():
+    sql = build_sample_query(SPEC, "orders_sample")
+    assert "COUNT(*) AS orders__n" in sql
+    assert "SUM((total_amount) * (total_amount)) AS revenue__q" in sql
+    assert sql.endswith("FROM orders_sample GROUP BY status;")
+
+
+def test_whole_table_sample_gives_exact_values_and_zero_width_intervals():
+    frame = sample_statistics({"Delivered": [10, 20, 30], "Pending": [5]})
+    result = estimate(SPEC, frame, population=4, sample_rows=4)
+    assert result["status"].tolist() == ["Delivered", "Pending"]
+    assert result["orders"].tolist() == [3, 1]
+    assert result["revenue"].tolist() == [60, 5]
+    assert result["avg_amount"].tolist() == [20, 5]
+    for alias in ("orders", "revenue"):
+        np.testing.assert_allclose(result[f"{alias}_ci_low"], result[alias])
+        np.testing.assert_allclose(result[f"{alias}_ci_high"], result[alias])
+
+
+def test_counts_and_sums_are_scaled_to_the_population():
+    frame = sample_statistics({"Delivered": [10, 20, 30, 40], "Pending": [5, 15]})
+    result = estimate(SPEC, frame, population=60, sample_rows=6).set_index("status")
+    assert result.loc["Delivered", "orders"] == pytest.approx(40)
+    assert result.loc["Delivered", "revenue"] == pytest.approx(1000)
+    assert result.loc["Delivered", "avg_amount"] == pytest.approx(25)
+    assert (
+        result.loc["Delivered", "orders_ci_low"]
+        < 40
+        < result.loc["Delivered", "orders_ci_high"]
+    )
+
+
+def test_average_of_a_single_row_has_no_interval():
+    result = estimate(
+        SPEC, sample_statistics({"Pending": [5]}), population=10, sample_rows=2
+    )
+    assert np.isnan(result["avg_amount_ci_low"].iloc[0])
+
+
+def test_limit_applies_after_ordering():
+    frame = sample_statistics({"a": [1], "b": [1, 2, 3], "c": [1, 2]})
+    result = estimate(dict(SPEC, limit=2), frame, population=6, sample_rows=6)
+    assert result["status"].tolist() == ["b", "c"]
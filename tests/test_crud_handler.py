@@ -0,0 +1,157 @@
+import pymysql
+import pytest
+
+from crud.crud_handler import CRUDHandler
+from crud.row_cache import row_count_cache
+
+
+def handler(connection, **kwargs):
+    return CRUDHandler(connection, "customers", capture_changes=False, **kwargs)
+
+
+def test_chunks_split_in_order():
+    assert list(CRUDHandler._chunks([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+
+
+def test_chunks_reject_non_positive_batch_size():
+    with pytest.raises(ValueError):
+        list(CRUDHandler._chunks([1], 0))
+
+
+def test_rows_must_share_columns(connection):
+    with pytest.raises(ValueError):
+        handler(connection).bulk_create_records([{"a": 1}, {"b": 2}])
+
+
+def test_bulk_create_writes_one_statement_and_transaction_per_chunk(connection):
+    connection.rowcount = lambda sql, values: len(values) // 2
+    rows = [
+        {"name": f"c{index}", "email": f"c{index}@example.com"} for index in range(5)
+    ]
+    assert handler(connection).bulk_create_records(rows, batch_size=2) == [2, 2, 1]
+    assert [sql for sql, _ in connection.statements] == [
+        "INSERT INTO customers (name, email) VALUES (%s, %s), (%s, %s);",
+        "INSERT INTO customers (name, email) VALUES (%s, %s), (%s, %s);",
+        "INSERT INTO customers (name, email) VALUES (%s, %s);",
+    ]
+    assert connection.statements[2][1] == ["c4", "c4@example.com"]
+    assert connection.transactions == ["begin", "commit"] * 3
+
+
+def test_bulk_create_applies_row_deltas_to_the_cached_count(connection):
+    row_count_cache.put("customers", 10)
+    connection.rowcount = 3
+    handler(connection).bulk_create_records(
+        [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    )
+    assert row_count_cache.get("customers") == 13
+    row_count_cache.invalidate_table("customers")
+
+
+def test_failed_chunk_is_rolled_back(connection):
+    connection.error = pymysql.MySQLError(1062, "Duplicate entry")
+    with pytest.raises(pymysql.MySQLError):
+        handler(connection).bulk_create_records([{"name": "a"}])
+    assert connection.transactions == ["begin", "rollback"]
+
+
+def test_bulk_update_uses_one_case_per_column(connection):
+    connection.rowcount = 2
+    updates = {1: {"name": "a", "email": "a@example.com"}, 2: {"name": "b"}}
+    assert handler(connection).bulk_update_records(
+        updates, id_column="customer_id"
+    ) == [2]
+    sql, values = connection.statements[0]
+    assert sql == (
+        "UPDATE customers SET email = CASE customer_id WHEN %s THEN %s ELSE email END, "
+        "name = CASE customer_id WHEN %s THEN %s WHEN %s THEN %s ELSE name END "
+        "WHERE customer_id IN (%s, %s);"
+    )
+    assert values == [1, "a@example.com", 1, "a", 2, "b", 1, 2]
+
+
+def test_bulk_delete_chunks_identifiers(connection):
+    connection.rowcount = lambda sql, values: len(values)
+    assert handler(connection).bulk_delete_records(
+        [1, 2, 3], id_column="customer_id", batch_size=2
+    ) == [2, 1]
+    assert connection.statements[1] == (
+        "DELETE FROM customers WHERE customer_id IN (%s);",
+        [3],
+    )
+
+
+def test_unmanaged_writes_join_the_callers_transaction_and_wait_for_its_commit(
+    connection,
+):
+    row_count_cache.put("customers", 10)
+    connection.rowcount = 1
+    crud = handler(connection, manage_transactions=False)
+    crud.bulk_create_records([{"name": "a"}])
+    assert connection.transactions == []
+    assert row_count_cache.get("customers") == 10
+    crud.apply_pending_writes()
+    assert row_count_cache.get("customers") == 11
+    row_count_cache.invalidate_table("customers")
+
+
+def test_bulk_upsert_updates_from_the_row_alias(connection):
+    connection.rowcount = 2
+    handler(connection).bulk_upsert_records(
+        [{"customer_id": 1, "name": "a"}], update_columns=["name"]
+    )
+    assert connection.statements[0][0] == (
+        "INSERT INTO customers (customer_id, name) VALUES (%s, %s) AS new "
+        "ON DUPLICATE KEY UPDATE name = new.name;"
+    )
+
+
+class RecordingChangeLog:
+    def __init__(self):
+        self.records = []
+
+    def is_enabled(self):
+        return True
+
+    def record(
+        self, table_name, operation, record_keys, key_column=None, payloads=None
+    ):
+        self.records.append((operation, record_keys))
+
+
+def capturing_handler(connection):
+    crud = handler(connection)
+    crud.change_log = RecordingChangeLog()
+    crud._primary_key_column = "customer_id"
+    return crud
+
+
+@pytest.mark.parametrize(
+    ("lock_mode", "keys"), [(1, [41, 42, 43]), (2, [None, None, None])]
+)
+def test_multi_row_insert_ids_are_logged_only_when_consecutive(
+    connection, lock_mode, keys
+):
+    connection.rowcount = 3
+    connection.lastrowid = 41
+    connection.rows = lambda sql, values: [(lock_mode,)] if "@@" in sql else []
+    crud = capturing_handler(connection)
+    crud.bulk_create_records([{"name": "a"}, {"name": "b"}, {"name": "c"}])
+    assert crud.change_log.records == [("insert", keys)]
+
+
+def test_single_row_insert_id_is_logged_without_checking_the_lock_mode(connection):
+    connection.rowcount = 1
+    connection.lastrowid = 7
+    crud = capturing_handler(connection)
+    crud.create_record({"name": "a"})
+    assert crud.change_log.records == [("insert", [7])]
+    assert not any("@@" in sql for sql, _ in connection.statements)
+
+
+def test_bulk_writes_reject_unknown_columns(connection):
+    with pytest.raises(ValueError):
+        handler(connection).bulk_update_records(
+            {1: {"name; DROP TABLE x": "a"}}, id_column="customer_id"
+        )
+    assert connection.statements == []
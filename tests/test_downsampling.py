@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from insights.downsampling import (
+    binned_scatter_query,
+    bucketed_line_query,
+    density_sample,
+    downsample_frame,
+    lttb,
+    top_rows_query,
+)
+
+
+def test_lttb_keeps_short_series():
+    np.testing.assert_array_equal(lttb(np.arange(5), np.arange(5), 10), np.arange(5))
+
+
+def test_lttb_selects_threshold_points_with_endpoints():
+    x = np.arange(1000, dtype=float)
+    selected = lttb(x, np.sin(x / 50), 100)
+    assert len(selected) == 100
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(500, dtype=float)
+    y = np.zeros(500)
+    y[237] = 100.0
+    assert 237 in lttb(x, y, 20)
+
+
+def test_density_sample_keeps_everything_within_budget():
+    np.testing.assert_array_equal(
+        density_sample(np.arange(10), np.arange(10), 10), np.arange(10)
+    )
+
+
+def test_density_sample_respects_budget_and_keeps_outliers():
+    rng = np.random.default_rng(1)
+    x = np.append(rng.normal(0, 1, 5000), 100.0)
+    y = np.append(rng.normal(0, 1, 5000), 100.0)
+    selected = density_sample(x, y, 200)
+    assert len(selected) <= 200
+    assert 5000 in selected
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_density_sample_is_deterministic():
+    rng = np.random.default_rng(2)
+    x, y = rng.random(3000), rng.random(3000)
+    np.testing.assert_array_equal(
+        density_sample(x, y, 100, seed=3), density_sample(x, y, 100, seed=3)
+    )
+
+
+def test_downsample_frame_without_options_returns_the_frame():
+    df = pd.DataFrame({"a": range(10)})
+    assert downsample_frame(df, {}) is df
+
+
+def test_downsample_frame_top_cuts_at_budget():
+    df = pd.DataFrame({"name": list("abcdef"), "value": range(6)})
+    result = downsample_frame(df, {"downsample": {"method": "top", "row_budget": 3}})
+    assert result["name"].tolist() == ["a", "b", "c"]
+
+
+def test_downsample_frame_line_sorts_by_x():
+    df = pd.DataFrame({"x": np.arange(100, 0, -1), "y": np.arange(100)})
+    spec = {"downsample": {"method": "line", "x": "x", "y": "y", "row_budget": 10}}
+    result = downsample_frame(df, spec)
+    assert len(result) == 10
+    assert result["x"].is_monotonic_increasing
+    assert result["x"].iloc[0] == 1 and result["x"].iloc[-1] == 100
+
+
+def test_bucketed_line_query_measures_and_buckets_in_one_query():
+    sql, params = bucketed_line_query("SELECT x, y FROM t;", "x", "y", 10, 40)
+    assert "FROM (SELECT x, y FROM t) AS insight" in sql
+    assert "COUNT(*) OVER () AS total_rows" in sql
+    assert params == (10, 40, 39)
+
+
+@pytest.mark.parametrize(("budget", "cells"), [(100, 10), (99, 9), (1, 1)])
+def test_binned_scatter_query_grid(budget, cells):
+    sql, params = binned_scatter_query("SELECT x, y FROM t;", "x", "y", budget)
+    assert "COUNT(*) AS points" in sql
+    assert "MIN(y) OVER () AS y_low" in sql
+    assert params == (budget, cells, cells - 1) * 2
+
+
+def test_top_rows_query_orders_outside_the_insight_query():
+    sql, params = top_rows_query(
+        "SELECT x, y FROM t ORDER BY y DESC;", [("y", False)], 5
+    )
+    assert sql.endswith(") AS insight ORDER BY y DESC LIMIT %s;")
+    assert params == (5,)
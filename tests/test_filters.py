@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+
+from insights.filters import apply_filters, time_bucket
+from insights.insights_manager import INSIGHT_SPECS
+from insights.query_planner import build_query, query_params
+
+JANUARY = {"start": datetime.date(2024, 1, 1), "end": datetime.date(2024, 2, 1)}
+
+
+def filtered(name, filters):
+    spec = apply_filters(INSIGHT_SPECS[name], filters)
+    return build_query(spec), query_params(spec)
+
+
+def test_no_filters_return_the_spec():
+    spec = INSIGHT_SPECS["total_orders_per_day"]
+    assert apply_filters(spec, None) is spec
+    assert apply_filters(spec, {"dimensions": {"status": []}}) is spec
+
+
+def test_unknown_dimension_is_rejected():
+    with pytest.raises(ValueError):
+        apply_filters(
+            INSIGHT_SPECS["total_orders_per_day"], {"dimensions": {"city": ["Pune"]}}
+        )
+
+
+def test_unknown_granularity_is_rejected():
+    with pytest.raises(ValueError):
+        time_bucket("order_date", "year")
+
+
+def test_day_aligned_window_stays_on_the_rollups():
+    sql, params = filtered("total_orders_per_day", JANUARY)
+    assert "FROM orders_daily WHERE order_day >= %s AND order_day < %s" in sql
+    assert params == (datetime.date(2024, 1, 1), datetime.date(2024, 2, 1))
+
+    sql, params = filtered("orders_per_month", JANUARY)
+    assert "FROM orders_monthly WHERE order_month >= %s AND order_month < %s" in sql
+    assert params == ("2024-01", "2024-02")
+
+
+def test_partial_month_window_moves_to_the_daily_rollup():
+    sql, params = filtered("orders_per_month", {"start": datetime.date(2024, 1, 5)})
+    assert sql.startswith(
+        "SELECT LEFT(order_day, 7) AS order_month, SUM(order_count) AS total_orders "
+        "FROM orders_daily WHERE order_day >= %s"
+    )
+    assert params == (datetime.date(2024, 1, 5),)
+
+
+def test_hourly_granularity_reads_the_orders_table():
+    sql, params = filtered("total_orders_per_day", {"granularity": "hour"})
+    assert (
+        "AS order_hour, COUNT(*) AS total_orders FROM orders WHERE order_date IS NOT NULL"
+        in sql
+    )
+    assert "ORDER BY order_hour ASC" in sql
+    assert params is None
+
+
+def test_rollup_dimension_stays_on_the_rollup():
+    sql, params = filtered(
+        "orders_per_month", {"dimensions": {"status": ["Delivered"]}}
+    )
+    assert "FROM orders_monthly WHERE status IN (%s)" in sql
+    assert params == ("Delivered",)
+
+
+def test_other_dimensions_read_the_orders_table():
+    sql, params = filtered(
+        "total_orders_per_day", {"dimensions": {"payment_mode": ["Card", "UPI"]}}
+    )
+    assert (
+        "FROM orders WHERE order_date IS NOT NULL AND payment_mode IN (%s, %s)" in sql
+    )
+    assert params == ("Card", "UPI")
+
+
+def test_deliveries_are_filtered_through_their_orders():
+    sql, params = filtered(
+        "delivery_fee_distribution",
+        {"start": datetime.date(2024, 1, 1), "dimensions": {"restaurant_id": [7]}},
+    )
+    assert (
+        "order_id IN (SELECT order_id FROM orders WHERE order_date >= %s AND restaurant_id IN (%s))"
+        in sql
+    )
+    assert params[:2] == (datetime.date(2024, 1, 1), 7)
+
+
+def test_dimensions_do_not_apply_to_customers():
+    sql, params = filtered(
+        "daily_customer_signups",
+        {"start": datetime.date(2024, 1, 1), "dimensions": {"status": ["Delivered"]}},
+    )
+    assert "FROM customers WHERE signup_date >= %s GROUP BY" in sql
+    assert params == (datetime.date(2024, 1, 1),)
@@ -0,0 +1,53 @@
+import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from insights.http_service import parse_filters, to_arrow
+
+
+def test_no_parameters_mean_no_filters():
+    assert parse_filters({}) is None
+    assert parse_filters({"format": ["json"]}) is None
+
+
+def test_parses_window_granularity_and_dimensions():
+    filters = parse_filters(
+        {
+            "start": ["2024-01-01"],
+            "end": ["2024-02-01T06:00:00"],
+            "granularity": ["week"],
+            "status": ["Delivered,Pending"],
+            "restaurant_id": ["1", "2,3"],
+        }
+    )
+    assert filters == {
+        "start": datetime.datetime(2024, 1, 1),
+        "end": datetime.datetime(2024, 2, 1, 6),
+        "granularity": "week",
+        "dimensions": {"status": ["Delivered", "Pending"], "restaurant_id": [1, 2, 3]},
+    }
+
+
+def test_last_repeated_bound_wins():
+    assert parse_filters({"start": ["2024-01-01", "2024-03-01"]})[
+        "start"
+    ] == datetime.datetime(2024, 3, 1)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [{"granularity": ["year"]}, {"start": ["yesterday"]}, {"restaurant_id": ["seven"]}],
+)
+def test_malformed_values_are_rejected(query):
+    with pytest.raises(ValueError):
+        parse_filters(query)
+
+
+def test_arrow_stream_reads_back_as_the_frame():
+    df = pd.DataFrame(
+        {"day": pd.to_datetime(["2024-01-01", "2024-01-02"]), "orders": [3, 5]}
+    )
+    table = pa.ipc.open_stream(to_arrow(df)).read_all()
+    pd.testing.assert_frame_equal(table.to_pandas(), df)
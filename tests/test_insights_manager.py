@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from insights.insights_manager import INSIGHT_SPECS, InsightsManager
+from insights.result_cache import result_cache
+
+
+@pytest.fixture
+def manager(connection, monkeypatch):
+    """Build an InsightsManager whose queries are answered by `manager.answer(sql, params)`."""
+    result_cache.clear()
+    manager = InsightsManager(connection)
+    manager.queries = []
+
+    def fetch(sql, params=None):
+        manager.queries.append((sql, params))
+        return manager.answer(sql, params)
+
+    monkeypatch.setattr(manager, "_fetch", fetch)
+    yield manager
+    result_cache.clear()
+
+
+def test_scatter_is_binned_in_one_query(manager):
+    manager.answer = lambda sql, params: pd.DataFrame(
+        {
+            "total_amount": [20.0, 300.0],
+            "feedback_rating": [4.0, 2.5],
+            "points": [60_000, 40_000],
+            "total_rows": [100_000, 100_000],
+        }
+    )
+    df, total_rows = manager.fetch_chart_data("order_value_vs_feedback")
+    assert total_rows == 100_000
+    assert df.columns.tolist() == ["total_amount", "feedback_rating", "points"]
+    assert len(manager.queries) == 1
+    sql, params = manager.queries[0]
+    assert "COUNT(*) AS points" in sql
+    budget = INSIGHT_SPECS["order_value_vs_feedback"]["downsample"]["row_budget"]
+    cells = math.isqrt(budget)
+    assert params == (budget, cells, cells - 1) * 2
+
+
+def test_line_is_bucketed_in_one_query_then_thinned(manager):
+    manager.answer = lambda sql, params: pd.DataFrame(
+        {
+            "order_id": np.arange(8000, dtype=float),
+            "avg_distance": np.random.default_rng(0).random(8000),
+            "total_rows": 1_000_000,
+        }
+    )
+    df, total_rows = manager.fetch_chart_data("avg_delivery_distance_per_order")
+    budget = INSIGHT_SPECS["avg_delivery_distance_per_order"]["downsample"][
+        "row_budget"
+    ]
+    assert total_rows == 1_000_000
+    assert len(df) == budget
+    assert len(manager.queries) == 1
+
+
+def test_chart_data_is_cached(manager):
+    manager.answer = lambda sql, params: pd.DataFrame(
+        {"order_id": [1.0, 2.0], "avg_distance": [1.0, 2.0], "total_rows": [2, 2]}
+    )
+    assert manager.cached_chart_data("avg_delivery_distance_per_order") is None
+    manager.fetch_chart_data("avg_delivery_distance_per_order")
+    df, total_rows = manager.fetch_chart_data("avg_delivery_distance_per_order")
+    assert (len(df), total_rows) == (2, 2)
+    assert len(manager.queries) == 1
+    assert manager.cached_chart_data("avg_delivery_distance_per_order")[1] == 2
+
+
+def test_cached_full_result_is_reduced_in_memory(manager, monkeypatch):
+    whole = pd.DataFrame({"order_id": [1, 2, 3], "avg_distance": [1.0, 2.0, 3.0]})
+    monkeypatch.setattr(manager, "cached_insight", lambda name, filters=None: whole)
+    df, total_rows = manager.fetch_chart_data("avg_delivery_distance_per_order")
+    assert df is whole and total_rows == 3
+    assert manager.queries == []
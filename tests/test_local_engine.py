@@ -0,0 +1,36 @@
+import pandas as pd
+
+from insights.local_engine import _delivered, _histogram
+
+
+def test_fixed_width_bins_span_the_range():
+    result = _histogram(pd.Series([0.0, 1.0, 2.0, 9.0, 10.0, None]), {"bins": 5})
+    assert result["bin_start"].tolist() == [0.0, 2.0, 8.0]
+    assert result["frequency"].tolist() == [2, 1, 2]
+
+
+def test_explicit_width_bins_start_at_multiples():
+    result = _histogram(pd.Series([1, 1, 2, 4]), {"width": 2})
+    assert result.to_dict("list") == {
+        "bin_start": [0.0, 2.0, 4.0],
+        "frequency": [2, 1, 1],
+    }
+
+
+def test_constant_values_fall_into_one_bin():
+    result = _histogram(pd.Series([3.0, 3.0]), {"bins": 4})
+    assert result.to_dict("list") == {"bin_start": [3.0], "frequency": [2]}
+
+
+def test_quantile_bins_put_the_remainder_first():
+    result = _histogram(pd.Series(range(10)), {"bins": 3, "method": "quantile"})
+    assert result.to_dict("list") == {
+        "bin_start": [0.0, 4.0, 7.0],
+        "bin_end": [3.0, 6.0, 9.0],
+        "frequency": [4, 3, 3],
+    }
+
+
+def test_delivered_matches_any_case():
+    frame = pd.DataFrame({"status": ["Delivered", "delivered", "Pending", None]})
+    assert _delivered(frame).tolist() == [True, True, False, False]
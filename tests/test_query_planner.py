@@ -0,0 +1,149 @@
+import pandas as pd
+import pytest
+
+from insights.query_planner import (
+    _aggregate_sql,
+    build_query,
+    fan_out,
+    plan_insights,
+    query_params,
+    where_clause,
+)
+
+ORDERS_BY_STATUS = {
+    "source": "orders",
+    "group_by": [("status", "status")],
+    "aggregates": [("order_count", "COUNT", "*")],
+    "order_by": [("order_count", False)],
+    "limit": 5,
+}
+
+
+def test_build_query():
+    assert build_query(ORDERS_BY_STATUS) == (
+        "SELECT status, COUNT(*) AS order_count FROM orders GROUP BY status "
+        "ORDER BY order_count DESC LIMIT 5;"
+    )
+
+
+def test_build_query_combines_filter_and_where():
+    spec = dict(
+        ORDERS_BY_STATUS,
+        filter="total_amount > 0",
+        where=("order_date >= %s", ("2024-01-01",)),
+    )
+    assert where_clause(spec) == "(total_amount > 0) AND (order_date >= %s)"
+    assert " WHERE (total_amount > 0) AND (order_date >= %s) GROUP BY" in build_query(
+        spec
+    )
+    assert query_params(spec) == ("2024-01-01",)
+
+
+def test_query_params_without_where():
+    assert query_params(ORDERS_BY_STATUS) is None
+
+
+def test_fixed_histogram_repeats_parameters_for_the_range_subquery():
+    spec = {
+        "source": "orders",
+        "histogram": {"expression": "total_amount", "bins": 10},
+        "where": ("order_date >= %s", ("2024-01-01",)),
+    }
+    sql = build_query(spec)
+    assert sql.count("order_date >= %s") == 2
+    assert query_params(spec) == ("2024-01-01", "2024-01-01")
+
+
+def test_histogram_with_width_and_quantiles():
+    width = build_query(
+        {"source": "orders", "histogram": {"expression": "rating", "width": 1}}
+    )
+    assert "FLOOR(rating / 1) * 1 AS bin_start" in width
+    quantile = build_query(
+        {
+            "source": "orders",
+            "histogram": {"expression": "rating", "bins": 4, "method": "quantile"},
+        }
+    )
+    assert "NTILE(4)" in quantile
+
+
+@pytest.mark.parametrize(
+    ("function", "argument", "condition", "expected"),
+    [
+        ("COUNT", "*", None, "COUNT(*)"),
+        ("COUNT", "*", "a = 1", "COUNT(CASE WHEN a = 1 THEN 1 END)"),
+        ("SUM", "x", "a = 1", "SUM(CASE WHEN a = 1 THEN x END)"),
+        ("RATIO", ("x", "y"), None, "SUM(x) / NULLIF(SUM(y), 0)"),
+    ],
+)
+def test_aggregate_sql(function, argument, condition, expected):
+    assert _aggregate_sql(function, argument, condition) == expected
+
+
+def test_aggregate_sql_rejects_conditional_raw_expressions():
+    with pytest.raises(ValueError):
+        _aggregate_sql(None, "SUM(x) - SUM(y)", "a = 1")
+
+
+def test_plan_insights_merges_shared_groupings_with_conditional_aggregates():
+    specs = {
+        "orders": {
+            "source": "orders",
+            "group_by": [("day", "DATE(order_date)")],
+            "aggregates": [("orders", "COUNT", "*")],
+        },
+        "delivered": {
+            "source": "orders",
+            "group_by": [("day", "DATE(order_date)")],
+            "aggregates": [("delivered", "COUNT", "*")],
+            "filter": "status = 'Delivered'",
+        },
+    }
+    plans = plan_insights(specs)
+    assert len(plans) == 1
+    assert "COUNT(CASE WHEN status = 'Delivered' THEN 1 END)" in plans[0]["sql"]
+
+    columns = {
+        name: [column for column, _ in output["aggregates"]]
+        for name, output in plans[0]["insights"]
+    }
+    count_column = dict(plans[0]["insights"])["delivered"]["count_column"]
+    frame = pd.DataFrame(
+        {
+            "key_0": ["2024-01-01", "2024-01-02"],
+            columns["orders"][0]: [3, 2],
+            columns["delivered"][0]: [1, 0],
+            count_column: [1, 0],
+        }
+    )
+    results = fan_out(plans[0], frame)
+    assert results["orders"].to_dict("list") == {
+        "day": ["2024-01-01", "2024-01-02"],
+        "orders": [3, 2],
+    }
+    assert results["delivered"].to_dict("list") == {
+        "day": ["2024-01-01"],
+        "delivered": [1],
+    }
+
+
+def test_plan_insights_keeps_different_groupings_apart():
+    specs = {
+        "a": ORDERS_BY_STATUS,
+        "b": dict(
+            ORDERS_BY_STATUS, group_by=[("payment_mode", "payment_mode")], order_by=[]
+        ),
+    }
+    assert len(plan_insights(specs)) == 2
+
+
+def test_fan_out_orders_and_limits():
+    plan = plan_insights({"a": ORDERS_BY_STATUS, "b": dict(ORDERS_BY_STATUS, limit=1)})[
+        0
+    ]
+    columns = dict(plan["insights"])["a"]["aggregates"]
+    frame = pd.DataFrame({"key_0": ["x", "y", "z"], columns[0][0]: [1, 3, 2]})
+    results = fan_out(plan, frame)
+    assert results["a"]["status"].tolist() == ["y", "z", "x"]
+    assert results["b"]["status"].tolist() == ["y"]
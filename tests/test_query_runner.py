@@ -0,0 +1,98 @@
+import threading
+
+import pymysql
+import pytest
+
+from insights import query_runner
+from insights.query_runner import ER_QUERY_INTERRUPTED, QueryRunner
+
+
+class FakePooledConnection:
+    def __init__(self, thread_id):
+        self._thread_id = thread_id
+
+    def thread_id(self):
+        return self._thread_id
+
+
+class FakePool:
+    """Hands out numbered connections, optionally only once `available` is set."""
+
+    connection_factory = None
+
+    def __init__(self):
+        self.available = threading.Event()
+        self.available.set()
+        self.released = []
+        self.returned = threading.Event()
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def acquire(self, timeout=None):
+        if not self.available.wait(timeout):
+            raise TimeoutError(
+                f"No pooled connection became available within {timeout} seconds"
+            )
+        with self.lock:
+            self.count += 1
+            return FakePooledConnection(self.count)
+
+    def release(self, connection):
+        with self.lock:
+            self.released.append(connection.thread_id())
+        self.returned.set()
+
+
+@pytest.fixture
+def killed(monkeypatch):
+    killed = []
+    monkeypatch.setattr(
+        query_runner, "kill_query", lambda factory, thread_id: killed.append(thread_id)
+    )
+    return killed
+
+
+def test_a_query_past_its_deadline_is_killed(killed, monkeypatch):
+    monkeypatch.setattr(query_runner, "DEADLINE_GRACE_SECONDS", 0.05)
+    interrupted = threading.Event()
+
+    def slow(connection):
+        interrupted.wait(5)
+        raise pymysql.OperationalError(
+            ER_QUERY_INTERRUPTED, "Query execution was interrupted"
+        )
+
+    def interrupt_once_killed(elapsed):
+        if killed:
+            interrupted.set()
+
+    runner = QueryRunner(FakePool(), timeout_seconds=0.05, poll_interval=0.02)
+    with pytest.raises(TimeoutError):
+        runner.run(slow, on_wait=interrupt_once_killed)
+    assert killed == [1]
+
+
+def test_a_query_abandoned_while_waiting_for_a_connection_never_runs(killed):
+    pool = FakePool()
+    pool.available.clear()
+    ran = []
+
+    def abandon(elapsed):
+        raise KeyboardInterrupt
+
+    runner = QueryRunner(pool, timeout_seconds=5, poll_interval=0.02)
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(ran.append, on_wait=abandon)
+    pool.available.set()
+    assert pool.returned.wait(5)
+    assert ran == []
+    assert killed == []
+    assert pool.released == [1]
+
+
+def test_no_free_connection_within_the_timeout_raises(killed):
+    pool = FakePool()
+    pool.available.clear()
+    runner = QueryRunner(pool, timeout_seconds=0.05, poll_interval=0.02)
+    with pytest.raises(TimeoutError, match="No pooled connection"):
+        runner.run(lambda connection: 1)
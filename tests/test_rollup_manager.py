@@ -0,0 +1,55 @@
+import pytest
+
+from db.write_versions import write_versions
+from insights.rollup_manager import ROLLUP_MEASURES, RollupManager
+
+
+@pytest.fixture
+def rollups(connection, monkeypatch):
+    """Build a RollupManager whose refreshes are counted instead of run."""
+    monkeypatch.setattr(RollupManager, "_refreshed", {})
+    rollups = RollupManager(connection)
+    rollups.refreshes = 0
+
+    def refresh():
+        rollups.refreshes += 1
+        return {"mode": "unchanged"}
+
+    monkeypatch.setattr(rollups, "refresh", refresh)
+    return rollups
+
+
+def test_fresh_rollups_are_not_refreshed_again(rollups):
+    assert rollups.refresh_if_stale() == {"mode": "unchanged"}
+    assert rollups.refresh_if_stale() is None
+    assert rollups.refreshes == 1
+
+
+def test_writes_to_orders_trigger_a_refresh(rollups):
+    rollups.refresh_if_stale()
+    write_versions.bump("orders")
+    rollups.refresh_if_stale()
+    assert rollups.refreshes == 2
+
+
+def test_rollups_are_refreshed_after_the_interval(rollups, monkeypatch):
+    monkeypatch.setattr(RollupManager, "REFRESH_INTERVAL_SECONDS", 0)
+    rollups.refresh_if_stale()
+    rollups.refresh_if_stale()
+    assert rollups.refreshes == 2
+
+
+def test_new_orders_are_added_through_the_row_alias(connection):
+    day = ("2024-01-01", "Delivered", *[1] * len(ROLLUP_MEASURES))
+    connection.rows = lambda sql, values: [day] if sql.startswith("SELECT") else []
+    with connection.cursor() as cursor:
+        days = RollupManager(connection)._add_new_orders(cursor, 0, 10, [])
+    assert days == {"2024-01-01"}
+    sql, values = connection.statements[-1]
+    assert "VALUES(" not in sql
+    updates = ", ".join(
+        f"{measure} = orders_daily.{measure} + new.{measure}"
+        for measure in ROLLUP_MEASURES
+    )
+    assert sql.endswith(f"AS new ON DUPLICATE KEY UPDATE {updates};")
+    assert values == list(day)
@@ -0,0 +1,115 @@
+import datetime
+import os
+import time
+
+import pandas as pd
+import pymysql
+import pytest
+from pymysql.constants import FIELD_TYPE
+
+from crud.table_exporter import ExportJobManager, TableExporter
+from crud.table_importer import TableImporter
+
+ROWS = [
+    (1, "Asha", 250.5, datetime.datetime(2024, 1, 2, 10, 30)),
+    (2, None, None, None),
+    (3, "Ravi", 99.0, datetime.datetime(2024, 3, 4, 8, 0)),
+]
+DESCRIPTION = [
+    ("order_id", FIELD_TYPE.LONG),
+    ("name", FIELD_TYPE.VAR_STRING),
+    ("total_amount", FIELD_TYPE.NEWDECIMAL),
+    ("order_date", FIELD_TYPE.DATETIME),
+]
+COLUMNS = {
+    "order_id": {
+        "Field": "order_id",
+        "Type": "int",
+        "Null": "NO",
+        "Default": None,
+        "Extra": "",
+    },
+    "name": {
+        "Field": "name",
+        "Type": "varchar(50)",
+        "Null": "YES",
+        "Default": None,
+        "Extra": "",
+    },
+    "total_amount": {
+        "Field": "total_amount",
+        "Type": "decimal(10,2)",
+        "Null": "YES",
+        "Default": None,
+        "Extra": "",
+    },
+    "order_date": {
+        "Field": "order_date",
+        "Type": "datetime",
+        "Null": "YES",
+        "Default": None,
+        "Extra": "",
+    },
+}
+
+
+@pytest.mark.parametrize("compression", [None, "snappy", "zstd"])
+def test_parquet_export_imports_back_unchanged(
+    connection, monkeypatch, tmp_path, compression
+):
+    connection.rows, connection.description = ROWS, DESCRIPTION
+    path = str(tmp_path / "orders.parquet")
+    stats = TableExporter(connection, "orders", chunk_size=2).export(
+        path, "parquet", compression
+    )
+    assert stats["rows"] == 3
+    assert pd.read_parquet(path)["order_id"].tolist() == [1, 2, 3]
+
+    inserted = []
+
+    def insert(sql, values):
+        if sql.startswith("INSERT"):
+            inserted.append(values)
+        return len(values) // len(COLUMNS)
+
+    connection.rows, connection.rowcount = [], insert
+    connection.columns = list(COLUMNS)
+    importer = TableImporter(connection, "orders")
+    monkeypatch.setattr(importer, "map_columns", lambda file_columns: (COLUMNS, []))
+    assert importer.import_file(path, file_format="parquet")["rows_loaded"] == 3
+    assert [
+        tuple(values[index : index + 4])
+        for values in inserted
+        for index in range(0, len(values), 4)
+    ] == ROWS
+
+
+def wait_for(jobs, job_id):
+    for _ in range(500):
+        job = jobs.status(job_id)
+        if job is None or job["state"] != "running":
+            return job
+        time.sleep(0.01)
+    raise AssertionError("export did not finish")
+
+
+def test_discarded_exports_delete_their_file(connection, tmp_path):
+    connection.rows, connection.description = ROWS, DESCRIPTION
+    jobs = ExportJobManager(str(tmp_path))
+    job_id = jobs.start(lambda: connection, "orders")
+    path = wait_for(jobs, job_id)["path"]
+    assert os.path.exists(path)
+    jobs.discard(job_id)
+    assert jobs.status(job_id) is None
+    assert not os.path.exists(path)
+
+
+def test_failed_and_expired_exports_delete_their_file(connection, tmp_path):
+    connection.rows, connection.description = ROWS, DESCRIPTION
+    jobs = ExportJobManager(str(tmp_path), retention_seconds=0)
+    done = wait_for(jobs, jobs.start(lambda: connection, "orders"))
+    connection.error = pymysql.OperationalError(2013, "Lost connection")
+    failed = wait_for(jobs, jobs.start(lambda: connection, "orders"))
+    assert failed["state"] == "failed"
+    assert os.listdir(tmp_path) == []
+    assert not os.path.exists(done["path"])
@@ -0,0 +1,71 @@
+import io
+
+import pymysql
+
+from crud.table_importer import TableImporter
+
+COLUMNS = {
+    "name": {
+        "Field": "name",
+        "Type": "varchar(20)",
+        "Null": "NO",
+        "Default": None,
+        "Extra": "",
+    },
+    "email": {
+        "Field": "email",
+        "Type": "varchar(20)",
+        "Null": "YES",
+        "Default": None,
+        "Extra": "",
+    },
+}
+
+
+def importer(connection, monkeypatch):
+    importer = TableImporter(connection, "customers")
+    monkeypatch.setattr(importer, "map_columns", lambda file_columns: (COLUMNS, []))
+    return importer
+
+
+def test_load_data_writes_unquoted_null_for_missing_values(connection, monkeypatch):
+    written = []
+
+    def read_file(sql, values):
+        if sql.startswith("LOAD DATA"):
+            with open(values[0], encoding="utf-8") as loaded_file:
+                written.append(loaded_file.read())
+        return 3
+
+    connection.rowcount = read_file
+    source = io.StringIO('name,email\na,\nNULL,b\\c\n"say ""hi""",x@example.com\n')
+    stats = importer(connection, monkeypatch).import_file(source, method="load_data")
+    assert stats["rows_loaded"] == 3
+    assert written == ['"a",NULL\n"NULL","b\\c"\n"say ""hi""","x@example.com"\n']
+    assert connection.transactions == ["begin", "commit"]
+
+
+def test_rows_the_database_rejects_go_to_the_error_file(
+    connection, monkeypatch, tmp_path
+):
+    def insert(sql, values):
+        if "taken@example.com" in values:
+            raise pymysql.IntegrityError(
+                1062, "Duplicate entry 'taken@example.com' for key 'email'"
+            )
+        return len(values) // 2
+
+    connection.rowcount = insert
+    rows = [f"c{index},c{index}@example.com" for index in range(5)]
+    rows[3] = "c3,taken@example.com"
+    source = io.StringIO("name,email\n" + "\n".join(rows) + "\n")
+    error_path = tmp_path / "rejected.csv"
+    stats = importer(connection, monkeypatch).import_file(
+        source, error_path=str(error_path)
+    )
+    assert (stats["rows_loaded"], stats["rows_rejected"]) == (4, 1)
+    assert error_path.read_text().splitlines() == [
+        "name,email,_error",
+        "c3,taken@example.com,Duplicate entry 'taken@example.com' for key 'email'; ",
+    ]
+    assert connection.transactions.count("commit") == 3
@@ -0,0 +1,82 @@
+import pymysql
+import pytest
+
+from crud.row_cache import row_count_cache
+from crud.unit_of_work import GroupCommitter, UnitOfWork, order_tables_by_dependency
+
+
+def test_referenced_tables_come_first():
+    dependencies = {"orders": {"customers", "restaurants"}, "deliveries": {"orders"}}
+    order = order_tables_by_dependency(
+        ["deliveries", "orders", "customers", "restaurants"], dependencies
+    )
+    assert order.index("customers") < order.index("orders") < order.index("deliveries")
+    assert order.index("restaurants") < order.index("orders")
+
+
+def test_cycles_keep_their_order():
+    assert order_tables_by_dependency(["a", "b"], {"a": {"b"}, "b": {"a"}}) == [
+        "a",
+        "b",
+    ]
+
+
+def test_commit_writes_in_one_transaction_and_updates_counts_afterwards(connection):
+    row_count_cache.put("customers", 10)
+    connection.rowcount = 2
+    with UnitOfWork(connection, dependencies={}) as uow:
+        uow.create("customers", {"name": "a"})
+        uow.create("customers", {"name": "b"})
+        uow.delete("customers", 7, id_column="customer_id")
+    assert connection.transactions == ["begin", "commit"]
+    writes = [
+        sql.split()[0] for sql, _ in connection.statements if not sql.startswith("SHOW")
+    ]
+    assert writes == ["INSERT", "DELETE"]
+    assert row_count_cache.get("customers") == 10
+    row_count_cache.invalidate_table("customers")
+
+
+def test_failed_flush_rolls_back_any_error(connection):
+    uow = UnitOfWork(connection, dependencies={})
+    uow.begin()
+    uow.create("customers", {"name": "a"})
+    uow.create("customers", {"name": "b", "email": "b@example.com"})
+    uow._handler = lambda table_name: (_ for _ in ()).throw(KeyError(table_name))
+    with pytest.raises(KeyError):
+        uow.commit()
+    assert connection.transactions == ["begin", "rollback"]
+
+
+def test_rolled_back_writes_leave_no_count_delta(connection):
+    row_count_cache.put("customers", 10)
+    connection.rowcount = 1
+    uow = UnitOfWork(connection, dependencies={})
+    uow.create("customers", {"name": "a"})
+    uow.flush()
+    assert row_count_cache.get("customers") == 10
+    uow.rollback()
+    assert row_count_cache.get("customers") is None
+
+
+def test_a_failing_write_does_not_fail_the_rest_of_its_group(connection):
+    def insert(sql, values):
+        if values and "taken@example.com" in values:
+            raise pymysql.IntegrityError(1062, "Duplicate entry 'taken@example.com'")
+        return 1
+
+    connection.rowcount = insert
+    committer = GroupCommitter(lambda: connection, max_batch=3, max_delay=5)
+    futures = [
+        committer.submit("create", "customers", {"email": email})
+        for email in ("a@example.com", "taken@example.com", "b@example.com")
+    ]
+    committer.close()
+    assert futures[0].result() == futures[2].result() == 1
+    with pytest.raises(pymysql.IntegrityError):
+        futures[1].result()
+    group, alone = (
+        ["begin", "rollback"],
+        ["begin", "commit", "begin", "rollback", "begin", "commit"],
+    )
+    assert connection.transactions == group + alone